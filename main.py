@@ -6,6 +6,10 @@ Ejecuta el pipeline completo:
 1. Extraer bandas + repertorio (API) - filtra por sellos al extraer
 2. Filtrar por YouTube (solo underground)
 3. Extraer links de descarga (API)
+4. Descargar y organizar
+
+En modo flujo las etapas se solapan: cada release pasa a la siguiente
+apenas está listo (ver modules/pipeline_flujo.py).
 
 Uso:
     python main.py
@@ -41,7 +45,10 @@ ARCHIVOS_LIMPIAR = [
     'data/releases_mainstream.txt',
     'data/repertorio_con_links.json',
     'data/links_descarga.txt',
-    'data/discografia_detalle.txt'
+    'data/discografia_detalle.txt',
+    'data/extraccion_journal.jsonl',
+    # Sin él, la próxima extracción es completa (si no, los pendientes bajo el cursor se pierden)
+    'data/cursor_generos.json'
 ]
 
 
@@ -189,6 +196,26 @@ def seleccionar_tipos_disco():
     return [1, 2]
 
 
+def preguntar_modo_extraccion():
+    """Pregunta si la extracción es incremental o un re-escaneo completo"""
+    print("\n🔄 ¿Modo de extracción?")
+    print("  i) Incremental: solo posts nuevos desde la última corrida")
+    print("  c) Completo: re-escanear todos los géneros")
+
+    opcion = input("Opción [i]: ").strip().lower() or 'i'
+    return opcion == 'c'
+
+
+def preguntar_modo_pipeline():
+    """Pregunta si las etapas corren en secuencia o solapadas"""
+    print("\n🌊 ¿Modo del pipeline?")
+    print("  f) En flujo: YouTube, links y descargas arrancan con los primeros releases")
+    print("  s) Secuencial: cada paso termina antes de empezar el siguiente")
+
+    opcion = input("Opción [f]: ").strip().lower() or 'f'
+    return opcion != 's'
+
+
 def preguntar_headless():
     """Pregunta si ejecutar navegador sin ventana"""
     print("\n🌐 ¿Ejecutar navegador en modo invisible?")
@@ -221,13 +248,20 @@ def pausa_entre_modulos(segundos=5):
     time.sleep(segundos)
 
 
-def ejecutar_pipeline(tipos_permitidos, headless=True, reanudar=False):
+def ejecutar_pipeline(tipos_permitidos, headless=True, reanudar=False, completo=False,
+                      links_primero=None):
     """Ejecuta los 3 módulos en secuencia.
 
     Si reanudar=True, solo salta la extracción inicial cuando ya existe
     `data/repertorio.json`. El filtro de YouTube y la extracción de links
-    siempre se recalculan.
+    siempre se recalculan. Con completo=True la extracción ignora los
+    cursores por género y re-escanea todo. Con links_primero=True los links
+    se piden antes del filtro YouTube y solo los releases con algún link
+    vivo pasan por el navegador (None = LINKS_PRIMERO del entorno).
     """
+    if links_primero is None:
+        from modules.utils import LINKS_ANTES_DE_YOUTUBE
+        links_primero = LINKS_ANTES_DE_YOUTUBE
 
     # Crear directorio data si no existe
     os.makedirs('data', exist_ok=True)
@@ -236,7 +270,10 @@ def ejecutar_pipeline(tipos_permitidos, headless=True, reanudar=False):
     paso_actual = 1
 
     # === MÓDULO 1: BANDAS + REPERTORIO (optimizado) ===
-    if reanudar and _paso_completado('data/repertorio.json'):
+    # Si quedó un journal de extracción, la extracción se cortó a mitad:
+    # se re-ejecuta y continúa cada género desde su último offset.
+    if reanudar and _paso_completado('data/repertorio.json') \
+            and not _paso_completado('data/extraccion_journal.jsonl'):
         logger.info(f"\n⏭️  PASO {paso_actual}/{total_pasos}: EXTRACCIÓN — ya completado, saltando")
     else:
         logger.info("\n" + "=" * 60)
@@ -245,7 +282,7 @@ def ejecutar_pipeline(tipos_permitidos, headless=True, reanudar=False):
 
         try:
             from modules.extraer_bandas import run as extraer_bandas
-            extraer_bandas(tipos_permitidos=tipos_permitidos, verbose=True)
+            extraer_bandas(tipos_permitidos=tipos_permitidos, verbose=True, completo=completo)
         except Exception as e:
             logger.error(f"Error en extracción: {e}")
             return False
@@ -254,6 +291,9 @@ def ejecutar_pipeline(tipos_permitidos, headless=True, reanudar=False):
 
     paso_actual += 1
 
+    if links_primero:
+        return _links_y_filtro_youtube(paso_actual, total_pasos, headless)
+
     # === MÓDULO 2: FILTRO YOUTUBE ===
     logger.info("\n" + "=" * 60)
     logger.info(f"📦 PASO {paso_actual}/{total_pasos}: FILTRO YOUTUBE")
@@ -287,6 +327,76 @@ def ejecutar_pipeline(tipos_permitidos, headless=True, reanudar=False):
     return True
 
 
+def _links_y_filtro_youtube(paso_actual, total_pasos, headless):
+    """Pasos 2 y 3 con los links primero: el navegador solo ve releases descargables"""
+    # === LINKS (sobre todo el repertorio) ===
+    logger.info("\n" + "=" * 60)
+    logger.info(f"📦 PASO {paso_actual}/{total_pasos}: EXTRACCIÓN DE LINKS")
+    logger.info("=" * 60)
+
+    try:
+        from modules.extraer_links import run as extraer_links
+        extraer_links(verbose=True, input_file='data/repertorio.json')
+    except Exception as e:
+        logger.error(f"Error en extracción de links: {e}")
+        return False
+
+    paso_actual += 1
+
+    # === FILTRO YOUTUBE (solo releases con links vivos) ===
+    logger.info("\n" + "=" * 60)
+    logger.info(f"📦 PASO {paso_actual}/{total_pasos}: FILTRO YOUTUBE")
+    logger.info("=" * 60)
+
+    try:
+        from modules.filtrar_youtube import run as filtrar_yt
+        from modules.extraer_links import cargar_repertorio, guardar_resultados
+        filtrar_yt(
+            headless=headless,
+            verbose=True,
+            input_file='data/repertorio_con_links.json',
+            solo_con_links=True
+        )
+        # La descarga lee repertorio_con_links.json: dejar solo los aprobados
+        guardar_resultados(cargar_repertorio('data/repertorio_filtrado.json'), verbose=True)
+    except Exception as e:
+        logger.error(f"Error en filtro YouTube: {e}")
+        return False
+
+    return True
+
+
+def ejecutar_pipeline_flujo(tipos_permitidos, headless=True, reanudar=False, completo=False):
+    """Ejecuta extracción, filtro, links y descarga solapados (modules.pipeline_flujo).
+
+    Con reanudar=True y la extracción ya completa, el pipeline se alimenta
+    desde `data/repertorio.json` en vez de volver a extraer.
+    """
+    os.makedirs('data', exist_ok=True)
+
+    usar_repertorio = reanudar and _paso_completado('data/repertorio.json') \
+        and not _paso_completado('data/extraccion_journal.jsonl')
+
+    try:
+        from modules.descargar_y_organizar import verificar_dependencias as verificar_deps_descarga
+        from modules.pipeline_flujo import run as pipeline_flujo
+
+        descargar = verificar_deps_descarga()
+        if not descargar:
+            logger.warning("Faltan dependencias de descarga: el pipeline termina en los links")
+
+        return pipeline_flujo(
+            tipos_permitidos=tipos_permitidos,
+            headless=headless,
+            completo=completo,
+            usar_repertorio=usar_repertorio,
+            descargar=descargar,
+        )
+    except Exception as e:
+        logger.error(f"Error en el pipeline en flujo: {e}")
+        return False
+
+
 def ejecutar_descarga(verbose=True):
     """Ejecuta el módulo de descarga y organización"""
     logger.info("\n" + "=" * 60)
@@ -383,6 +493,12 @@ def main():
     tipos_nombres = [TIPOS_DISCO.get(t, str(t)) for t in tipos_permitidos]
     print(f"\n✓ Tipos seleccionados: {', '.join(tipos_nombres)}")
 
+    # Preguntar modo de extracción
+    completo = preguntar_modo_extraccion()
+
+    # Preguntar modo del pipeline
+    en_flujo = preguntar_modo_pipeline()
+
     # Preguntar modo headless
     headless = preguntar_headless()
 
@@ -394,7 +510,12 @@ def main():
     print("📋 CONFIGURACIÓN:")
     print(f"   Tipos: {', '.join(tipos_nombres)}")
     print(f"   Modo: {'Invisible' if headless else 'Visible'}")
-    print("   Filtro YouTube: Revalidar todo (sin caché)")
+    print(f"   Extracción: {'Completa' if completo else 'Incremental'}")
+    print(f"   Pipeline: {'En flujo (etapas solapadas)' if en_flujo else 'Secuencial'}")
+    from modules.utils import LINKS_ANTES_DE_YOUTUBE
+    if LINKS_ANTES_DE_YOUTUBE:
+        print("   Orden: links antes de YouTube (sin links vivos no se busca; LINKS_PRIMERO=0 para desactivar)")
+    print("   Filtro YouTube: reutiliza veredictos vigentes de la caché (YT_CACHE=0 para revalidar todo)")
     if reanudar:
         print("   Reanudar: solo saltará la extracción inicial si ya existe repertorio")
     print("-" * 40)
@@ -404,18 +525,29 @@ def main():
         print("Cancelado.")
         sys.exit(0)
 
-    # Ejecutar pipeline de extracción
-    exito = ejecutar_pipeline(
-        tipos_permitidos,
-        headless=headless,
-        reanudar=reanudar
-    )
+    if en_flujo:
+        # Extracción, filtro, links y descarga solapados
+        exito = ejecutar_pipeline_flujo(
+            tipos_permitidos,
+            headless=headless,
+            reanudar=reanudar,
+            completo=completo
+        )
+    else:
+        # Ejecutar pipeline de extracción
+        exito = ejecutar_pipeline(
+            tipos_permitidos,
+            headless=headless,
+            reanudar=reanudar,
+            completo=completo
+        )
 
     if exito:
         mostrar_resumen()
 
-        # Ejecutar descarga automáticamente
-        ejecutar_descarga(verbose=True)
+        # Ejecutar descarga automáticamente (en flujo ya se descargó)
+        if not en_flujo:
+            ejecutar_descarga(verbose=True)
 
         print("\n🎸 ¡Proceso completado!")
     else:
@@ -1099,6 +1099,15 @@ def detectar_tipo_link(url):
         return 'direct'
 
 
+def tiene_links_vivos(release):
+    """True si el release tiene al menos un link que no sea de un servicio muerto"""
+    return any(
+        detectar_tipo_link(link.get('url', '')) != 'dead'
+        for link in release.get('download_links') or []
+        if link.get('url')
+    )
+
+
 def descargar_mega(url, destino, password=None, verbose=True):
     """
     Descarga un archivo de Mega.nz usando megadl
@@ -2265,6 +2274,143 @@ def procesar_release(release, destino_base=DESTINO_BASE, temp_dir=TEMP_DIR, verb
     return False, "Todos los links fallaron (definitivo)", None
 
 
+class ResultadosDescarga:
+    """Contadores y persistencia de los resultados de procesar_release.
+
+    Lo comparten los workers de descarga (run y el pipeline en flujo):
+    registra descargados, fallidos y la cola de Mega pendientes con un lock.
+    """
+
+    def __init__(self, descargados, fallidos, mega_pendientes, verbose=True):
+        self.descargados = descargados
+        self.fallidos = fallidos
+        self.mega_pendientes = mega_pendientes
+        self.mega_pendientes_ids = set()
+        for r in mega_pendientes:
+            pid = str(r.get('post_id', '')).strip()
+            if pid:
+                self.mega_pendientes_ids.add(pid)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.exitosos = 0
+        self.fallidos_count = 0
+        self.fallidos_definitivos = 0   # marcados [PERM], no se reintentarán
+        self.fallidos_temporales = 0    # expirarán a 30 días
+        self.fallidos_servicio_caido = 0  # circuit breaker activo, sin guardar
+        self.fallidos_parciales = 0     # descarga incompleta, sin guardar
+        self.omitidos = 0
+        self.pendientes = 0
+        self.total_bytes = 0
+
+    def registrar(self, release, exito, mensaje, info):
+        with self.lock:
+            if exito:
+                if mensaje in ["Ya existe", "Ya descargado", "Fallido previo"]:
+                    self.omitidos += 1
+                else:
+                    self.exitosos += 1
+                    if info:
+                        guardar_descargado(info['post_id'], info['band'], info['album'])
+                        self.descargados.add(info['post_id'])
+                        if info.get('bytes'):
+                            self.total_bytes += info['bytes']
+            else:
+                if mensaje == "Mega pendiente":
+                    release_mega = info
+                    if release_mega:
+                        pid = str(release_mega.get('post_id', '')).strip()
+                        if pid and pid not in self.mega_pendientes_ids:
+                            self.mega_pendientes.append(release_mega)
+                            self.mega_pendientes_ids.add(pid)
+                            self.pendientes += 1
+                            if self.verbose:
+                                logger.info("⏳ Encolado para reintento Mega")
+                else:
+                    self.fallidos_count += 1
+                    if mensaje == "Descarga parcial":
+                        self.fallidos_parciales += 1
+                    elif "temporalmente caído" in mensaje.lower():
+                        # No persistimos: el circuit breaker se reabre y vamos a reintentar.
+                        self.fallidos_servicio_caido += 1
+                    else:
+                        # "(definitivo)" en mensaje → marcar como permanente
+                        # cualquier otro motivo → temporal (expira a 30 días)
+                        es_perm = "definitivo" in mensaje.lower()
+                        if es_perm:
+                            self.fallidos_definitivos += 1
+                        else:
+                            self.fallidos_temporales += 1
+                        guardar_fallido(release, self.fallidos, motivo=mensaje, permanente=es_perm)
+
+    def registrar_error(self):
+        """Excepción inesperada fuera de procesar_release"""
+        with self.lock:
+            self.fallidos_count += 1
+
+    def vaciar_pendientes(self):
+        with self.lock:
+            self.mega_pendientes.clear()
+            self.mega_pendientes_ids.clear()
+
+    def encolar_pendiente(self, r):
+        """Agrega un release a la cola Mega de forma idempotente."""
+        with self.lock:
+            pid = str(r.get('post_id', '')).strip()
+            if not pid or pid in self.mega_pendientes_ids:
+                return False
+            mr = _crear_release_mega(r)
+            if not mr:
+                return False
+            self.mega_pendientes.append(mr)
+            self.mega_pendientes_ids.add(pid)
+            return True
+
+    def quitar_pendiente(self, r):
+        """Saca un release de la cola Mega (se va a procesar ahora)"""
+        pid = str(r.get('post_id', '')).strip()
+        with self.lock:
+            if pid in self.mega_pendientes_ids:
+                self.mega_pendientes_ids.discard(pid)
+                self.mega_pendientes[:] = [m for m in self.mega_pendientes
+                                           if str(m.get('post_id', '')).strip() != pid]
+
+    def progreso(self):
+        return f"✓{self.exitosos} ⏭️{self.omitidos} ✗{self.fallidos_count}"
+
+    def mostrar_resumen(self, destino_base):
+        logger.info("=" * 60)
+        logger.info("📊 RESUMEN")
+        logger.info("=" * 60)
+        logger.info(f"✓ Exitosos: {self.exitosos}")
+        logger.info(f"⏭️ Omitidos (ya existían): {self.omitidos}")
+        logger.info(f"✗ Fallidos: {self.fallidos_count}")
+        if self.fallidos_definitivos:
+            logger.info(f"   └─ 🪦 definitivos [PERM] (no se reintentarán): {self.fallidos_definitivos}")
+        if self.fallidos_temporales:
+            logger.info(f"   └─ 🔄 temporales (reintento en 30 días): {self.fallidos_temporales}")
+        if self.fallidos_servicio_caido:
+            logger.info(f"   └─ 🚧 por servicio caído (no persistido): {self.fallidos_servicio_caido}")
+        if self.fallidos_parciales:
+            logger.info(f"   └─ ✂️  descarga parcial (no persistido): {self.fallidos_parciales}")
+
+        # Servicios que el circuit breaker bloqueó durante esta corrida
+        bloqueados = circuit_breaker.services_in_cooldown()
+        if bloqueados:
+            logger.info("🚧 Servicios en cooldown:")
+            for svc, restante in bloqueados:
+                mins, segs = divmod(restante, 60)
+                logger.info(f"   └─ {svc}: {mins}m {segs}s restantes")
+
+        if self.mega_pendientes:
+            logger.info(f"⏳ Pendientes Mega: {len(self.mega_pendientes)} (guardados en {MEGA_PENDIENTES_FILE})")
+        if self.total_bytes > 0:
+            if self.total_bytes >= 1024 * 1024 * 1024:
+                logger.info(f"📦 Total descargado: {self.total_bytes / (1024**3):.1f} GB")
+            else:
+                logger.info(f"📦 Total descargado: {self.total_bytes / (1024**2):.1f} MB")
+        logger.info(f"📁 Archivos en: {destino_base}")
+
+
 def run(destino_base=DESTINO_BASE, verbose=True, limit=None):
     """
     Ejecuta el proceso de descarga y organización.
@@ -2302,11 +2448,6 @@ def run(destino_base=DESTINO_BASE, verbose=True, limit=None):
 
     # Cargar cola de Mega pendientes
     mega_pendientes = cargar_mega_pendientes()
-    mega_pendientes_ids = set()
-    for r in mega_pendientes:
-        pid = str(r.get('post_id', '')).strip()
-        if pid:
-            mega_pendientes_ids.add(pid)
     if verbose and mega_pendientes:
         logger.info(f"⏳ {len(mega_pendientes)} releases con Mega pendientes (reanudarán cuando termine el cooldown)")
 
@@ -2346,59 +2487,8 @@ def run(destino_base=DESTINO_BASE, verbose=True, limit=None):
         logger.info(f"  → {len(releases_no_mega)} con links no-Mega (paralelo)")
         logger.info(f"  → {len(releases_solo_mega)} solo Mega (secuencial)")
 
-    # Thread-safe counters and locks
-    exitosos = 0
-    fallidos_count = 0
-    fallidos_definitivos = 0   # marcados [PERM], no se reintentarán
-    fallidos_temporales = 0    # expirarán a 30 días
-    fallidos_servicio_caido = 0  # circuit breaker activo, sin guardar
-    fallidos_parciales = 0     # descarga incompleta, sin guardar
-    omitidos = 0
-    pendientes = 0
-    total_bytes = 0
-    write_lock = threading.Lock()
-
-    def _handle_result(release, exito, mensaje, info):
-        nonlocal exitosos, fallidos_count, omitidos, pendientes, total_bytes
-        nonlocal fallidos_definitivos, fallidos_temporales, fallidos_servicio_caido, fallidos_parciales
-        with write_lock:
-            if exito:
-                if mensaje in ["Ya existe", "Ya descargado", "Fallido previo"]:
-                    omitidos += 1
-                else:
-                    exitosos += 1
-                    if info:
-                        guardar_descargado(info['post_id'], info['band'], info['album'])
-                        descargados.add(info['post_id'])
-                        if info.get('bytes'):
-                            total_bytes += info['bytes']
-            else:
-                if mensaje == "Mega pendiente":
-                    release_mega = info
-                    if release_mega:
-                        pid = str(release_mega.get('post_id', '')).strip()
-                        if pid and pid not in mega_pendientes_ids:
-                            mega_pendientes.append(release_mega)
-                            mega_pendientes_ids.add(pid)
-                            pendientes += 1
-                            if verbose:
-                                logger.info("⏳ Encolado para reintento Mega")
-                else:
-                    fallidos_count += 1
-                    if mensaje == "Descarga parcial":
-                        fallidos_parciales += 1
-                    elif "temporalmente caído" in mensaje.lower():
-                        # No persistimos: el circuit breaker se reabre y vamos a reintentar.
-                        fallidos_servicio_caido += 1
-                    else:
-                        # "(definitivo)" en mensaje → marcar como permanente
-                        # cualquier otro motivo → temporal (expira a 30 días)
-                        es_perm = "definitivo" in mensaje.lower()
-                        if es_perm:
-                            fallidos_definitivos += 1
-                        else:
-                            fallidos_temporales += 1
-                        guardar_fallido(release, fallidos, motivo=mensaje, permanente=es_perm)
+    resultados = ResultadosDescarga(descargados, fallidos, mega_pendientes, verbose)
+    _handle_result = resultados.registrar
 
     # === Fase 1: Descargas paralelas (no-Mega) ===
     if releases_no_mega:
@@ -2427,15 +2517,14 @@ def run(destino_base=DESTINO_BASE, verbose=True, limit=None):
                         release, (exito, mensaje, info) = future.result()
                         _handle_result(release, exito, mensaje, info)
 
-                        with write_lock:
+                        with resultados.lock:
                             procesados[0] += 1
                             if verbose and procesados[0] % 5 == 0:
                                 logger.info(f"📊 Progreso: {procesados[0]}/{len(releases_no_mega)} - "
-                                           f"✓{exitosos} ⏭️{omitidos} ✗{fallidos_count}")
+                                           f"{resultados.progreso()}")
 
                     except Exception as e:
-                        with write_lock:
-                            fallidos_count += 1
+                        resultados.registrar_error()
                         if verbose:
                             logger.error(f"Error inesperado: {e}")
 
@@ -2451,20 +2540,8 @@ def run(destino_base=DESTINO_BASE, verbose=True, limit=None):
     # Reseteamos la cola: lo que NO se procese (cooldown, interrupt, fallo
     # con "Mega pendiente") se re-encolará abajo. Los que se procesen con
     # éxito quedan fuera de la cola implícitamente.
-    mega_pendientes.clear()
-    mega_pendientes_ids.clear()
-
-    def _encolar_pendiente(r):
-        """Agrega un release a la cola Mega de forma idempotente."""
-        pid = str(r.get('post_id', '')).strip()
-        if not pid or pid in mega_pendientes_ids:
-            return False
-        mr = _crear_release_mega(r)
-        if not mr:
-            return False
-        mega_pendientes.append(mr)
-        mega_pendientes_ids.add(pid)
-        return True
+    resultados.vaciar_pendientes()
+    _encolar_pendiente = resultados.encolar_pendiente
 
     if all_mega:
         # Cortocircuito: si Mega ya está en cooldown, no iteramos 675 veces
@@ -2511,7 +2588,7 @@ def run(destino_base=DESTINO_BASE, verbose=True, limit=None):
                     _cleanup_playwright()
                     return
                 except Exception as e:
-                    fallidos_count += 1
+                    resultados.registrar_error()
                     if verbose:
                         logger.error(f"Error inesperado: {e}")
 
@@ -2539,37 +2616,7 @@ def run(destino_base=DESTINO_BASE, verbose=True, limit=None):
 
     # Resumen
     if verbose:
-        logger.info("=" * 60)
-        logger.info("📊 RESUMEN")
-        logger.info("=" * 60)
-        logger.info(f"✓ Exitosos: {exitosos}")
-        logger.info(f"⏭️ Omitidos (ya existían): {omitidos}")
-        logger.info(f"✗ Fallidos: {fallidos_count}")
-        if fallidos_definitivos:
-            logger.info(f"   └─ 🪦 definitivos [PERM] (no se reintentarán): {fallidos_definitivos}")
-        if fallidos_temporales:
-            logger.info(f"   └─ 🔄 temporales (reintento en 30 días): {fallidos_temporales}")
-        if fallidos_servicio_caido:
-            logger.info(f"   └─ 🚧 por servicio caído (no persistido): {fallidos_servicio_caido}")
-        if fallidos_parciales:
-            logger.info(f"   └─ ✂️  descarga parcial (no persistido): {fallidos_parciales}")
-
-        # Servicios que el circuit breaker bloqueó durante esta corrida
-        bloqueados = circuit_breaker.services_in_cooldown()
-        if bloqueados:
-            logger.info("🚧 Servicios en cooldown:")
-            for svc, restante in bloqueados:
-                mins, segs = divmod(restante, 60)
-                logger.info(f"   └─ {svc}: {mins}m {segs}s restantes")
-
-        if mega_pendientes:
-            logger.info(f"⏳ Pendientes Mega: {len(mega_pendientes)} (guardados en {MEGA_PENDIENTES_FILE})")
-        if total_bytes > 0:
-            if total_bytes >= 1024 * 1024 * 1024:
-                logger.info(f"📦 Total descargado: {total_bytes / (1024**3):.1f} GB")
-            else:
-                logger.info(f"📦 Total descargado: {total_bytes / (1024**2):.1f} MB")
-        logger.info(f"📁 Archivos en: {destino_base}")
+        resultados.mostrar_resumen(destino_base)
 
 
 def verificar_dependencias():
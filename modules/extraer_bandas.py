@@ -12,14 +12,18 @@ import requests
 import os
 import json
 import time
+import asyncio
+import sqlite3
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 from modules.utils import (
     BASE_URL, API_URL, DELAY_BASE_429, MAX_BACKOFF_429,
-    BANDAS_FILE, REPERTORIO_FILE, FALLIDOS_FILE,
+    BANDAS_FILE, REPERTORIO_FILE, FALLIDOS_FILE, CURSOR_GENEROS_FILE, JOURNAL_EXTRACCION_FILE,
+    API_CAPACIDADES_FILE, ARCHIVO_POSTS_FILE,
     cargar_env, crear_sesion_autenticada, cargar_sellos_blacklist,
-    delay_con_jitter,
+    limitador_api, peticion_api, espera_rate_limit, cache_http, crear_sesion_thread, sesion_api,
 )
 
 # Thread-local storage para sesiones HTTP
@@ -29,11 +33,8 @@ _thread_local = threading.local()
 def _get_thread_session(session_data):
     """Obtiene o crea una sesión HTTP para el thread actual"""
     if not hasattr(_thread_local, 'session'):
-        session = requests.Session()
-        session.headers.update(session_data['headers'])
-        for cookie in session_data['cookies']:
-            session.cookies.set(cookie['name'], cookie['value'])
-        _thread_local.session = session
+        # Sesión con cache condicional (ETag/Last-Modified o TTL) en disco
+        _thread_local.session = crear_sesion_thread(session_data)
     return _thread_local.session
 
 
@@ -41,7 +42,8 @@ def _preparar_session_data(session):
     """Prepara datos de sesión para crear copias thread-local"""
     return {
         'headers': dict(session.headers),
-        'cookies': [{'name': k, 'value': v} for k, v in session.cookies.items()]
+        'cookies': [{'name': k, 'value': v} for k, v in session.cookies.items()],
+        'generacion': getattr(session, 'generacion_sesion', 0),
     }
 
 # Configuración
@@ -49,9 +51,21 @@ OUTPUT_BANDAS = BANDAS_FILE
 OUTPUT_REPERTORIO = REPERTORIO_FILE
 
 # Configuración de rate limiting (ajustable)
-DELAY_ENTRE_PAGINAS = 1.0      # Segundos entre cada página de resultados
 MAX_RETRIES_429 = None         # None = infinito, nunca rendirse
 
+# Concurrencia adaptativa (AIMD) de la paginación
+CONCURRENCIA_INICIAL = 3       # Requests en vuelo al arrancar
+CONCURRENCIA_MINIMA = 1
+CONCURRENCIA_MAXIMA = 12
+FACTOR_AIMD = 0.5              # Recorte multiplicativo ante un 429
+VENTANA_PAGINAS_PARALELAS = 4  # Páginas de un mismo género en paralelo si el offset es predecible
+
+# Filtro del lado del servidor en /posts/filter (se detecta qué acepta la API)
+PARAMS_TIPO_CANDIDATOS = [('types', 'csv'), ('types', 'lista'), ('type', 'csv'), ('type', 'lista')]
+PARAMS_TAMANO_CANDIDATOS = ['limit', 'pageSize', 'perPage']
+TAMANO_PAGINA_PEDIDO = 100
+CAPACIDADES_TTL_DIAS = 7
+
 # Tipos de disco
 # Nota: La API usa ID 9 como alias de EP (mismo tipo que ID 2)
 TIPOS_DISCO = {
@@ -153,6 +167,78 @@ def _es_fecha(s):
         return False
 
 
+def _leer_archivo_cursores():
+    if not os.path.exists(CURSOR_GENEROS_FILE):
+        return {}
+    try:
+        with open(CURSOR_GENEROS_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def cargar_cursores():
+    """Carga el high-water mark por género de la última extracción completa.
+
+    Formato: {genre_id: {'post_id': int, 'release_date': [...], 'fecha': 'YYYY-MM-DD HH:MM:SS'}}
+    """
+    return {int(k): v for k, v in _leer_archivo_cursores().items()
+            if k.isdigit() and isinstance(v, dict)}
+
+
+def cargar_filtros_cursor():
+    """Fallidos y blacklist de sellos con los que se filtró hasta el cursor
+    ({'fallidos': [...], 'sellos': [...]}, vacío si no se guardaron)"""
+    filtros = _leer_archivo_cursores().get('_filtros')
+    return filtros if isinstance(filtros, dict) else {}
+
+
+def guardar_cursores(cursores, filtros=None):
+    """Guarda los cursores por género (escritura atómica). `filtros`
+    (fallidos y sellos vigentes) permite detectar después los posts que
+    quedaron debajo del cursor y ya no se filtrarían (ver filtros_liberados)."""
+    os.makedirs(os.path.dirname(CURSOR_GENEROS_FILE), exist_ok=True)
+    data = {str(k): v for k, v in sorted(cursores.items())}
+    if filtros is not None:
+        data['_filtros'] = filtros
+    tmp = f"{CURSOR_GENEROS_FILE}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, CURSOR_GENEROS_FILE)
+
+
+def filtros_liberados(filtros_cursor, fallidos_posts, sellos_blacklist):
+    """
+    Posts que el modo incremental ya no vuelve a ver: estaban filtrados cuando
+    se avanzó el cursor y hoy pasarían (fallidos vencidos a los 30 días,
+    sellos quitados de la blacklist).
+
+    Returns:
+        tuple: (post_ids liberados, sellos liberados), ambos sets
+    """
+    post_ids = set(filtros_cursor.get('fallidos') or []) - set(fallidos_posts)
+    sellos = set(filtros_cursor.get('sellos') or []) - set(sellos_blacklist)
+    return post_ids, sellos
+
+
+def _post_id_num(post_id):
+    """postId como entero (None si no es numérico)"""
+    try:
+        return int(post_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fecha_mayor(a, b):
+    """Compara dos releaseDate ([año, mes, día], con posibles None)"""
+    def clave(fecha):
+        if not isinstance(fecha, (list, tuple)):
+            fecha = [fecha]
+        return [x if isinstance(x, int) else 0 for x in fecha]
+    return clave(a) > clave(b)
+
+
 def post_en_blacklist(post, sellos_blacklist):
     """Verifica si un post está en un sello problemático"""
     labels = post.get('label', [])
@@ -165,173 +251,892 @@ def post_en_blacklist(post, sellos_blacklist):
     return False, None
 
 
-def extraer_posts_genero(session_data, genre_id, genre_name, sellos_blacklist, tipos_permitidos,
-                         descargados=None, fallidos_posts=None, verbose=True):
-    """
-    Extrae TODOS los posts de un género, filtrando por sello y descargados al vuelo
+class ExtraccionGenero:
+    """Acumula releases, bandas y contadores de un género página a página.
+
+    Separa el procesamiento de posts de la forma de obtener las páginas, para
+    que las páginas recién descargadas y las re-leídas del journal pasen por
+    exactamente los mismos filtros.
     """
-    session = _get_thread_session(session_data)
-    releases = []
-    bandas_encontradas = {}
-    posts_total = 0
-    posts_filtrados_sello = 0
-    posts_filtrados_descargados = 0
-    posts_filtrados_fallidos = 0
-    offset = None
-    retries_429 = 0
-    retries_error = 0
-    max_retries_error = 5
 
-    if descargados is None:
-        descargados = set()
-    if fallidos_posts is None:
-        fallidos_posts = set()
+    def __init__(self, genre_name, sellos_blacklist, tipos_permitidos,
+                 descargados=None, fallidos_posts=None, cursor=None):
+        self.genre_name = genre_name
+        self.sellos_blacklist = sellos_blacklist
+        self.tipos_permitidos = tipos_permitidos
+        self.descargados = descargados if descargados is not None else set()
+        self.fallidos_posts = fallidos_posts if fallidos_posts is not None else set()
+        self.releases = []
+        self.bandas = {}
+        self.posts_total = 0
+        self.paginas = 0
+        self.filtrados_sello = 0
+        self.filtrados_descargados = 0
+        self.filtrados_fallidos = 0
+        self.cursor_post_id = _post_id_num((cursor or {}).get('post_id'))
+        self.max_post_id = self.cursor_post_id
+        self.max_release_date = (cursor or {}).get('release_date')
+
+    @property
+    def incremental(self):
+        return self.cursor_post_id is not None
+
+    def procesar_pagina(self, posts):
+        """Filtra y acumula los posts de una página. Retorna cuántos son nuevos (sobre el cursor)."""
+        nuevos_en_pagina = 0
+        self.paginas += 1
+        for post in posts:
+            self.posts_total += 1
+            post_id = post.get('postId')
+
+            # High-water mark: postId más alto y fecha de release más reciente
+            post_id_num = _post_id_num(post_id)
+            if post_id_num is not None and (self.max_post_id is None or post_id_num > self.max_post_id):
+                self.max_post_id = post_id_num
+            release_date = post.get('releaseDate')
+            if release_date and (self.max_release_date is None or _fecha_mayor(release_date, self.max_release_date)):
+                self.max_release_date = release_date
+
+            # Ya visto en una corrida anterior (modo incremental)
+            if self.incremental and post_id_num is not None and post_id_num <= self.cursor_post_id:
+                continue
+            nuevos_en_pagina += 1
 
-    while True:
-        try:
-            params = {'genres': genre_id}
-            if offset is not None:
-                params['offset'] = offset
-
-            r = session.get(
-                f"{API_URL}/posts/filter",
-                params=params,
-                timeout=30
-            )
+            # Filtrar por ya descargados
+            if str(post_id) in self.descargados:
+                self.filtrados_descargados += 1
+                continue
 
-            # Manejar rate limiting - NUNCA rendirse
-            if r.status_code == 429:
-                retries_429 += 1
-                wait_time = min(DELAY_BASE_429 * retries_429, MAX_BACKOFF_429)
-                if verbose:
-                    print(f"    ⏳ Rate limited (intento {retries_429}), esperando {wait_time}s...")
-                time.sleep(wait_time)
+            # Filtrar por posts fallidos
+            if str(post_id) in self.fallidos_posts:
+                self.filtrados_fallidos += 1
                 continue
 
-            if r.status_code == 404:
-                break
-            if r.status_code != 200:
-                retries_error += 1
-                if retries_error > max_retries_error:
-                    if verbose:
-                        print(f"    ⚠️ Error {r.status_code} persistente, continuando...")
+            # Filtrar por sello problemático
+            en_blacklist, sello = post_en_blacklist(post, self.sellos_blacklist)
+            if en_blacklist:
+                self.filtrados_sello += 1
+                continue
+
+            # Filtrar por tipo de disco
+            type_ids = post.get('type', [])
+            if self.tipos_permitidos:
+                if not any(tid in self.tipos_permitidos for tid in type_ids):
+                    continue
+            album = post.get('album', 'Unknown')
+            year = post.get('releaseDate', [None])[0] if post.get('releaseDate') else None
+
+            # Obtener tipo
+            tipo = "Release"
+            tipo_id = None
+            for tid in type_ids:
+                if tid in TIPOS_DISCO:
+                    tipo = TIPOS_DISCO[tid]
+                    tipo_id = tid
                     break
-                time.sleep(5)
+
+            # Procesar bandas - recolectar todas del post
+            bands = post.get('bands', [])
+            band_names = []
+            band_ids = []
+            for band in bands:
+                if isinstance(band, dict):
+                    band_name = band.get('name', '')
+                    band_id = band.get('bandId')
+                else:
+                    band_name = str(band)
+                    band_id = None
+
+                if band_name:
+                    band_names.append(band_name)
+                if band_id is not None:
+                    band_ids.append(band_id)
+
+                if band_name and band_name not in self.bandas:
+                    self.bandas[band_name] = {
+                        'bandId': band_id,
+                        'name': band_name,
+                        'found_in_genre': self.genre_name
+                    }
+
+            # Un solo release por post con todas las bandas
+            self.releases.append({
+                'band': ' / '.join(band_names) if band_names else 'Unknown',
+                'band_id': band_ids[0] if band_ids else None,
+                'band_ids': band_ids,
+                'album': album,
+                'year': year,
+                'type': tipo,
+                'type_id': tipo_id,
+                'post_id': post_id,
+                'post_url': f"{BASE_URL}/posts/{post_id}"
+            })
+
+        return nuevos_en_pagina
+
+    def cursor_nuevo(self):
+        """High-water mark a persistir cuando el género se recorrió completo"""
+        if self.max_post_id is None:
+            return None
+        return {
+            'post_id': self.max_post_id,
+            'release_date': self.max_release_date,
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'paginas': self.paginas,
+            'posts': self.posts_total,
+        }
+
+    def resultado(self, completo):
+        """Tupla de retorno de extraer_posts_genero"""
+        return (self.releases, self.bandas, self.posts_total, self.filtrados_sello,
+                self.filtrados_descargados, self.filtrados_fallidos,
+                self.cursor_nuevo() if completo else None)
+
+
+class JournalExtraccion:
+    """Journal append-only de páginas descargadas (thread-safe).
+
+    Cada línea es un JSON:
+      {"cabecera": {"modo": ..., "cursores": {...}, "tipos": [...], "params": {...}}}
+      {"genre_id": g, "offset": o, "next": n, "has_more": bool, "posts": [...]}
+      {"genre_id": g, "offset": o, "next": n, "has_more": bool, "post_ids": [...]}
+      {"genre_id": g, "done": true}
+
+    Con `archivo` (ArchivoPosts, donde la página ya quedó guardada) solo se
+    anotan los post_ids y al re-leer los posts salen del archivo: el cuerpo
+    de cada página no se escribe dos veces. Si falta alguno, el género se
+    vuelve a pedir entero.
+
+    Si la extracción se corta (crash, Ctrl-C, tormenta de 429), la siguiente
+    corrida re-procesa las páginas guardadas y continúa cada género desde su
+    último offset confirmado. Se borra al guardar repertorio.json.
+
+    Las páginas solo valen para la corrida que las escribió: con otro modo
+    (completo / incremental), otros cursores u otro filtro, "página sin
+    posts nuevos" significa otra cosa. Por eso abrir() descarta el journal
+    si su cabecera no coincide.
+
+    Las escrituras hacen fsync: desde el event loop van por run_in_executor.
+    """
+
+    def __init__(self, path=JOURNAL_EXTRACCION_FILE, archivo=None):
+        self.path = path
+        self.archivo = archivo
+        self._lock = threading.Lock()
+        self._cola_revisada = False
+
+    def _append(self, entrada):
+        linea = json.dumps(entrada, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            prefijo = ''
+            if not self._cola_revisada:
+                # Si el corte anterior dejó una línea a medias, no pegarle la nueva
+                self._cola_revisada = True
+                if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                    with open(self.path, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            prefijo = '\n'
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(prefijo + linea + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def registrar_pagina(self, genre_id, offset, data):
+        entrada = {
+            'genre_id': genre_id,
+            'offset': offset,
+            'next': data.get('offset'),
+            'has_more': bool(data.get('hasMore', False)),
+        }
+        posts = data.get('posts', [])
+        if self.archivo is not None and all(p.get('postId') is not None for p in posts):
+            entrada['post_ids'] = [str(p['postId']) for p in posts]
+        else:
+            entrada['posts'] = posts
+        self._append(entrada)
+
+    def registrar_fin(self, genre_id):
+        self._append({'genre_id': genre_id, 'done': True})
+
+    def abrir(self, cabecera, verbose=True):
+        """
+        Prepara el journal para una corrida descrita por `cabecera`. Retorna
+        las páginas a re-procesar (ver cargar); un journal de otra corrida
+        (o sin cabecera) se descarta entero.
+        """
+        cabecera = json.loads(json.dumps(cabecera))  # Misma forma que al releerla (claves str)
+        estado = {}
+        if self.existe():
+            estado, guardada = self._leer()
+            if guardada != cabecera:
+                if verbose:
+                    print("⚠️  El journal es de una corrida con otro modo, cursor o filtro: se descarta")
+                self.limpiar()
+                estado = {}
+        if not self.existe():
+            self._append({'cabecera': cabecera})
+        return estado
+
+    def cargar(self):
+        """Re-lee el journal: {genre_id: {'paginas': [posts, ...], 'next', 'has_more', 'done'}}"""
+        return self._leer()[0]
+
+    def _leer(self):
+        """(estado por género, cabecera o None)"""
+        estado = {}
+        cabecera = None
+        incompletos = set()
+        if not os.path.exists(self.path):
+            return estado, cabecera
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entrada = json.loads(line)
+                    if 'cabecera' in entrada:
+                        cabecera = entrada['cabecera']
+                        continue
+                    genre_id = int(entrada['genre_id'])
+                except (ValueError, KeyError, TypeError):
+                    # Última línea truncada por un corte a mitad de escritura
+                    continue
+                if genre_id in incompletos:
+                    continue
+                g = estado.setdefault(genre_id, {'paginas': [], 'next': None, 'has_more': True, 'done': False})
+                if entrada.get('done'):
+                    g['done'] = True
+                    continue
+                posts = entrada.get('posts', [])
+                if 'post_ids' in entrada:
+                    posts = self.archivo.posts_por_id(entrada['post_ids']) if self.archivo is not None else None
+                    if posts is None:
+                        # La página no está en el archivo: el género se pide de nuevo
+                        incompletos.add(genre_id)
+                        del estado[genre_id]
+                        continue
+                g['paginas'].append(posts)
+                g['next'] = entrada.get('next')
+                g['has_more'] = entrada.get('has_more', False)
+        return estado, cabecera
+
+    def existe(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def limpiar(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def tipos_query(tipos_permitidos):
+    """IDs de tipo a pedir a la API (EP tiene alias 9)"""
+    tipos = set(tipos_permitidos or [])
+    if 2 in tipos:
+        tipos.add(9)
+    return sorted(tipos)
+
+
+def _valor_param_tipos(formato, tipos):
+    return ','.join(str(t) for t in tipos) if formato == 'csv' else list(tipos)
+
+
+def _cargar_capacidades():
+    if not os.path.exists(API_CAPACIDADES_FILE):
+        return None
+    try:
+        with open(API_CAPACIDADES_FILE, 'r', encoding='utf-8') as f:
+            capacidades = json.load(f)
+        if time.time() - capacidades.get('ts', 0) > CAPACIDADES_TTL_DIAS * 86400:
+            return None
+        return capacidades
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _guardar_capacidades(capacidades):
+    os.makedirs(os.path.dirname(API_CAPACIDADES_FILE), exist_ok=True)
+    with open(API_CAPACIDADES_FILE, 'w', encoding='utf-8') as f:
+        json.dump(capacidades, f, indent=2, ensure_ascii=False)
+
+
+def detectar_capacidades_filtro(session, genre_ids, tipos_permitidos, verbose=True):
+    """
+    Detecta si /posts/filter acepta filtro por tipo y un tamaño de página mayor.
+
+    - Tipo: se compara la primera página de un género con y sin el parámetro
+      candidato. Se acepta si la página filtrada solo trae los tipos pedidos y
+      la página sin filtrar traía otros (si no, la prueba no es concluyente y
+      se intenta con el siguiente género).
+    - Tamaño de página: se acepta el primer parámetro que devuelva más posts
+      que la página por defecto.
+
+    El resultado se cachea en data/api_capacidades.json (CAPACIDADES_TTL_DIAS).
+
+    Returns:
+        dict: {'tipos': {'param', 'formato'} | None,
+               'tamano_pagina': {'param', 'valor'} | None, 'ts': float}
+    """
+    capacidades = _cargar_capacidades()
+    if capacidades is not None:
+        return capacidades
+
+    def primera_pagina(genre_id, extra):
+        params = {'genres': genre_id}
+        params.update(extra)
+        r = peticion_api(session, f"{API_URL}/posts/filter", params=params, timeout=30)
+        if r.status_code != 200:
+            raise ConnectionError(f"status {r.status_code}")
+        return r.json().get('posts', [])
+
+    tipos = set(tipos_query(tipos_permitidos))
+    capacidades = {'tipos': None, 'tamano_pagina': None, 'ts': time.time()}
+    concluyente = False
+
+    try:
+        for genre_id in genre_ids[:3]:
+            base = primera_pagina(genre_id, {})
+            if not base:
                 continue
 
-            # Reset contadores en éxito
-            retries_429 = 0
-            retries_error = 0
-            data = r.json()
-            posts = data.get('posts', [])
+            if capacidades['tamano_pagina'] is None:
+                for param in PARAMS_TAMANO_CANDIDATOS:
+                    if len(primera_pagina(genre_id, {param: TAMANO_PAGINA_PEDIDO})) > len(base):
+                        capacidades['tamano_pagina'] = {'param': param, 'valor': TAMANO_PAGINA_PEDIDO}
+                        break
 
-            if not posts:
+            if not tipos or all(set(p.get('type', [])) & tipos for p in base):
+                continue  # Nada que descartar en esta página: no se puede distinguir
+
+            concluyente = True
+            for param, formato in PARAMS_TIPO_CANDIDATOS:
+                filtrada = primera_pagina(genre_id, {param: _valor_param_tipos(formato, sorted(tipos))})
+                if filtrada and all(set(p.get('type', [])) & tipos for p in filtrada):
+                    capacidades['tipos'] = {'param': param, 'formato': formato}
+                    break
+            break
+
+    except (requests.RequestException, ConnectionError, ValueError) as e:
+        if verbose:
+            print(f"  ⚠️ No se pudo detectar el filtro del servidor ({e}), se filtra localmente")
+        return {'tipos': None, 'tamano_pagina': None, 'ts': time.time()}
+
+    # Solo cachear si la prueba de tipos fue concluyente (o no había tipos que filtrar)
+    if concluyente or not tipos:
+        _guardar_capacidades(capacidades)
+
+    return capacidades
+
+
+def params_filtro_servidor(capacidades, tipos_permitidos):
+    """Parámetros extra para /posts/filter según las capacidades detectadas"""
+    params = {}
+    if capacidades.get('tipos') and tipos_permitidos:
+        cap = capacidades['tipos']
+        params[cap['param']] = _valor_param_tipos(cap['formato'], tipos_query(tipos_permitidos))
+    if capacidades.get('tamano_pagina'):
+        cap = capacidades['tamano_pagina']
+        params[cap['param']] = cap['valor']
+    return params
+
+
+def _cursor_vigente(cursor, tipos_permitidos):
+    """
+    Un cursor guardado con filtro de tipo en el servidor solo vale para esos
+    tipos: si ahora se piden otros, el género se recorre completo.
+    """
+    if not cursor:
+        return None
+    if cursor.get('tipos') and not set(tipos_query(tipos_permitidos)) <= set(cursor['tipos']):
+        return None
+    return cursor
+
+
+class ControlAIMD:
+    """Límite de concurrencia adaptativo para la paginación (AIMD, como TCP).
+
+    - Additive increase: +1 request en vuelo por cada ventana de `limite`
+      respuestas 200 seguidas.
+    - Multiplicative decrease: ante un 429 el límite se multiplica por
+      FACTOR_AIMD y todas las tareas hacen una pausa común.
+
+    Así la extracción se estabiliza en el ritmo más alto que tolera el
+    servidor en lugar de un delay fijo ajustado a mano.
+    """
+
+    def __init__(self, inicial=CONCURRENCIA_INICIAL, minimo=CONCURRENCIA_MINIMA,
+                 maximo=CONCURRENCIA_MAXIMA, factor=FACTOR_AIMD):
+        self.limite = inicial
+        self.minimo = minimo
+        self.maximo = maximo
+        self.factor = factor
+        self.en_vuelo = 0
+        self.limite_pico = inicial
+        self.requests = 0
+        self.rate_limits = 0
+        self.tiempo_backoff = 0.0
+        self._exitos = 0
+        self._racha_429 = 0
+        self._pausa_hasta = 0.0
+        self._cond = None
+
+    async def __aenter__(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        # Pausa global activa (429 reciente): nadie sale hasta que termine
+        while True:
+            espera = self._pausa_hasta - time.monotonic()
+            if espera <= 0:
                 break
+            await asyncio.sleep(espera)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.en_vuelo < self.limite)
+            self.en_vuelo += 1
+            self.requests += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self.en_vuelo -= 1
+            self._cond.notify_all()
+        return False
+
+    def exito(self):
+        """Respuesta 200: crecimiento aditivo (salvo que el limitador compartido
+        ya sea el cuello de botella: más requests en vuelo solo harían cola)"""
+        self._racha_429 = 0
+        if limitador_api.saturado():
+            self._exitos = 0
+            return
+        self._exitos += 1
+        if self._exitos >= self.limite and self.limite < self.maximo:
+            self.limite += 1
+            self._exitos = 0
+            self.limite_pico = max(self.limite_pico, self.limite)
+
+    def rate_limited(self, espera=None):
+        """Respuesta 429: recorte multiplicativo. Retorna segundos a esperar.
+
+        `espera` es la penalización global que fijó el limitador compartido
+        (Retry-After o backoff); sin ella se usa el backoff lineal local.
+        """
+        self.rate_limits += 1
+        ahora = time.monotonic()
+        if ahora < self._pausa_hasta:
+            # Mismo episodio (requests que ya estaban en vuelo): no recortar otra vez
+            return self._pausa_hasta - ahora
+        self._racha_429 += 1
+        self._exitos = 0
+        self.limite = max(self.minimo, int(self.limite * self.factor))
+        if not espera:
+            espera = min(DELAY_BASE_429 * self._racha_429, MAX_BACKOFF_429)
+        self._pausa_hasta = ahora + espera
+        self.tiempo_backoff += espera
+        return espera
+
+
+def _paso_offset(offset_pedido, offset_siguiente):
+    """Diferencia entre offsets consecutivos si ambos son enteros (None si es opaco)"""
+    def entero(valor):
+        if isinstance(valor, bool):
+            return None
+        if isinstance(valor, int):
+            return valor
+        if isinstance(valor, str) and valor.isdigit():
+            return int(valor)
+        return None
+
+    pedido = entero(offset_pedido)
+    siguiente = entero(offset_siguiente)
+    if pedido is None or siguiente is None or siguiente <= pedido:
+        return None
+    return siguiente - pedido
+
+
+def _pedir_pagina(session_data, genre_id, offset, params_extra=None):
+    """GET /posts/filter (bloqueante, corre en el executor con sesión thread-local)"""
+    session = _get_thread_session(session_data)
+    params = {'genres': genre_id}
+    if params_extra:
+        params.update(params_extra)
+    if offset is not None:
+        params['offset'] = offset
+    return peticion_api(
+        session,
+        f"{API_URL}/posts/filter",
+        params=params,
+        timeout=30
+    )
 
-            for post in posts:
-                posts_total += 1
-                post_id = post.get('postId')
 
-                # Filtrar por ya descargados
-                if str(post_id) in descargados:
-                    posts_filtrados_descargados += 1
-                    continue
+async def _paginar_genero(executor, control, session_data, genre_id, genre_name, sellos_blacklist,
+                          tipos_permitidos, descargados=None, fallidos_posts=None, verbose=True,
+                          cursor=None, journal=None, reanudacion=None, progreso=None,
+                          params_extra=None, archivo=None):
+    """Pagina un género completo. Cada request pasa por el ControlAIMD compartido.
 
-                # Filtrar por posts fallidos
-                if str(post_id) in fallidos_posts:
-                    posts_filtrados_fallidos += 1
+    `params_extra` se agrega a cada GET (filtro de tipo / tamaño de página
+    del lado del servidor, ver detectar_capacidades_filtro).
+
+    Con `archivo` (ArchivoPosts) cada página se guarda cruda para poder
+    re-filtrar sin red.
+
+    `progreso` (dict con 'paginas') se incrementa por cada página descargada,
+    para calcular el ETA global.
+    """
+    loop = asyncio.get_running_loop()
+    acumulado = ExtraccionGenero(genre_name, sellos_blacklist, tipos_permitidos,
+                                 descargados, fallidos_posts, cursor)
+    offset = None
+    max_retries_error = 5
+    completo = False
+
+    if reanudacion:
+        nuevos = 0
+        for posts in reanudacion['paginas']:
+            nuevos = acumulado.procesar_pagina(posts)
+        offset = reanudacion['next']
+        if reanudacion['done'] or not reanudacion['has_more'] or offset is None \
+                or (acumulado.incremental and reanudacion['paginas'] and nuevos == 0):
+            completo = True
+        if verbose:
+            print(f"    ↩️ {genre_name}: {len(reanudacion['paginas'])} páginas re-leídas del journal")
+
+    if completo:
+        if journal is not None and not reanudacion['done']:
+            await loop.run_in_executor(None, journal.registrar_fin, genre_id)
+        return acumulado.resultado(completo)
+
+    async def pedir(offset_pedido):
+        """Una página con reintentos. Retorna ('ok', data), ('fin', None) o ('error', None)."""
+        retries_error = 0
+        while True:
+            try:
+                async with control:
+                    r = await loop.run_in_executor(executor, _pedir_pagina, session_data, genre_id,
+                                                   offset_pedido, params_extra)
+
+                # Manejar rate limiting - NUNCA rendirse
+                if r.status_code == 429:
+                    wait_time = control.rate_limited(espera_rate_limit(r))
+                    if verbose:
+                        print(f"    ⏳ Rate limited ({genre_name}), concurrencia → {control.limite}, "
+                              f"esperando {wait_time:.0f}s...")
+                    await asyncio.sleep(wait_time)
                     continue
 
-                # Filtrar por sello problemático
-                en_blacklist, sello = post_en_blacklist(post, sellos_blacklist)
-                if en_blacklist:
-                    posts_filtrados_sello += 1
+                if r.status_code == 404:
+                    return 'fin', None
+                if r.status_code != 200:
+                    retries_error += 1
+                    if retries_error > max_retries_error:
+                        if verbose:
+                            print(f"    ⚠️ Error {r.status_code} persistente, continuando...")
+                        return 'error', None
+                    await asyncio.sleep(5)
                     continue
 
-                # Filtrar por tipo de disco
-                type_ids = post.get('type', [])
-                if tipos_permitidos:
-                    if not any(tid in tipos_permitidos for tid in type_ids):
-                        continue
-                album = post.get('album', 'Unknown')
-                year = post.get('releaseDate', [None])[0] if post.get('releaseDate') else None
-
-                # Obtener tipo
-                tipo = "Release"
-                tipo_id = None
-                for tid in type_ids:
-                    if tid in TIPOS_DISCO:
-                        tipo = TIPOS_DISCO[tid]
-                        tipo_id = tid
-                        break
+                control.exito()
+                return 'ok', r.json()
 
-                # Procesar bandas - recolectar todas del post
-                bands = post.get('bands', [])
-                band_names = []
-                band_ids = []
-                for band in bands:
-                    if isinstance(band, dict):
-                        band_name = band.get('name', '')
-                        band_id = band.get('bandId')
-                    else:
-                        band_name = str(band)
-                        band_id = None
-
-                    if band_name:
-                        band_names.append(band_name)
-                    if band_id is not None:
-                        band_ids.append(band_id)
-
-                    if band_name and band_name not in bandas_encontradas:
-                        bandas_encontradas[band_name] = {
-                            'bandId': band_id,
-                            'name': band_name,
-                            'found_in_genre': genre_name
-                        }
-
-                # Un solo release por post con todas las bandas
-                releases.append({
-                    'band': ' / '.join(band_names) if band_names else 'Unknown',
-                    'band_id': band_ids[0] if band_ids else None,
-                    'band_ids': band_ids,
-                    'album': album,
-                    'year': year,
-                    'type': tipo,
-                    'type_id': tipo_id,
-                    'post_id': post_id,
-                    'post_url': f"{BASE_URL}/posts/{post_id}"
-                })
+            except (requests.RequestException, TimeoutError, json.JSONDecodeError, KeyError) as e:
+                retries_error += 1
+                if retries_error > max_retries_error:
+                    if verbose:
+                        print(f"    ⚠️ Error de conexión persistente: {e}")
+                    return 'error', None
+                wait_time = retries_error * 5
+                if verbose:
+                    print(f"    ⚠️ Error de conexión, reintentando en {wait_time}s...")
+                await asyncio.sleep(wait_time)
+
+    # Aprendizaje del offset: si la API devuelve offsets enteros con un paso
+    # constante (p.ej. 1, 2, 3...), las próximas páginas son predecibles y se
+    # piden VENTANA_PAGINAS_PARALELAS a la vez. Si el offset es opaco (token,
+    # paso irregular) se sigue en modo serie. En incremental siempre en serie:
+    # se corta en la primera página sin posts nuevos.
+    stride = None
+    pasos = []
+    terminado = False
+
+    while not terminado:
+        if stride is not None and not acumulado.incremental:
+            lote = [int(offset) + i * stride for i in range(VENTANA_PAGINAS_PARALELAS)]
+        else:
+            lote = [offset]
+
+        respuestas = await asyncio.gather(*(pedir(o) for o in lote))
+
+        for offset_pedido, (estado, data) in zip(lote, respuestas):
+            if estado == 'fin':
+                completo = True
+                terminado = True
+                break
+            if estado == 'error':
+                terminado = True
+                break
+
+            posts = data.get('posts', [])
+            if not posts:
+                completo = True
+                terminado = True
+                break
+
+            nuevos_en_pagina = acumulado.procesar_pagina(posts)
+            if archivo is not None:
+                archivo.guardar_pagina(genre_id, genre_name, posts)
+            if journal is not None:
+                # fsync fuera del event loop; se espera para que la página quede confirmada
+                await loop.run_in_executor(None, journal.registrar_pagina, genre_id, offset_pedido, data)
+            if progreso is not None:
+                progreso['paginas'] += 1
+
+            # Modo incremental: página sin posts nuevos → ya alcanzamos lo visto
+            if acumulado.incremental and nuevos_en_pagina == 0:
+                completo = True
+                terminado = True
+                break
 
             # Verificar si hay más páginas
             if not data.get('hasMore', False):
+                completo = True
+                terminado = True
                 break
 
             offset = data.get('offset')
             if offset is None:
+                completo = True
+                terminado = True
                 break
 
-            delay_con_jitter(DELAY_ENTRE_PAGINAS)
-
-        except (requests.RequestException, TimeoutError, json.JSONDecodeError, KeyError) as e:
-            retries_error += 1
-            if retries_error > max_retries_error:
+            paso = _paso_offset(offset_pedido, offset)
+            if stride is None:
+                pasos.append(paso)
+                if len(pasos) >= 2 and pasos[-1] is not None and pasos[-1] == pasos[-2]:
+                    stride = paso
+                    if verbose and not acumulado.incremental:
+                        print(f"    🔀 {genre_name}: offset predecible (paso {stride}), "
+                              f"{VENTANA_PAGINAS_PARALELAS} páginas en paralelo")
+            elif paso != stride:
+                # El offset dejó de ser predecible: descartar el resto del lote y seguir en serie
+                stride = None
+                pasos = []
                 if verbose:
-                    print(f"    ⚠️ Error de conexión persistente: {e}")
+                    print(f"    ↪️ {genre_name}: offset irregular, vuelta a paginación en serie")
                 break
-            wait_time = retries_error * 5
-            if verbose:
-                print(f"    ⚠️ Error de conexión, reintentando en {wait_time}s...")
-            time.sleep(wait_time)
 
-    return (releases, bandas_encontradas, posts_total, posts_filtrados_sello,
-            posts_filtrados_descargados, posts_filtrados_fallidos)
+    if completo and journal is not None:
+        await loop.run_in_executor(None, journal.registrar_fin, genre_id)
 
+    return acumulado.resultado(completo)
 
-def extraer_todo(session, generos, sellos_blacklist, tipos_permitidos,
-                 descargados=None, fallidos_posts=None, verbose=True):
+
+class ArchivoPosts:
+    """Archivo local de posts crudos (JSON completo de la API, comprimido con zlib).
+
+    SQLite indexado por post_id + tabla de pertenencia post/género. Permite
+    reconstruir repertorio.json con otra blacklist de sellos, otros tipos o
+    nuevos descargados/fallidos sin volver a recorrer la API (ver refiltrar).
     """
-    Extrae todos los posts y bandas, filtrando al vuelo (3 géneros en paralelo)
+
+    def __init__(self, path=ARCHIVO_POSTS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS posts (
+                post_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                actualizado REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS post_generos (
+                post_id TEXT NOT NULL,
+                genre_id INTEGER NOT NULL,
+                genre_name TEXT,
+                PRIMARY KEY (post_id, genre_id)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                clave TEXT PRIMARY KEY,
+                valor TEXT
+            );
+        """)
+        self._conn.commit()
+
+    def guardar_pagina(self, genre_id, genre_name, posts):
+        """Guarda (o actualiza) los posts crudos de una página"""
+        ahora = time.time()
+        filas = []
+        generos = []
+        for post in posts:
+            post_id = post.get('postId')
+            if post_id is None:
+                continue
+            blob = zlib.compress(json.dumps(post, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            filas.append((str(post_id), blob, ahora))
+            generos.append((str(post_id), genre_id, genre_name))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO posts VALUES (?, ?, ?)", filas)
+            self._conn.executemany("INSERT OR IGNORE INTO post_generos VALUES (?, ?, ?)", generos)
+            self._conn.commit()
+
+    def registrar_tipos_filtrados(self, tipos):
+        """Tipos con los que se filtró en el servidor (None = se archivó todo)"""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('tipos_filtrados', ?)",
+                               (json.dumps(tipos),))
+            self._conn.commit()
+
+    def tipos_filtrados(self):
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM meta WHERE clave = 'tipos_filtrados'").fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def contar(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def posts_por_id(self, post_ids):
+        """Posts crudos en el orden de `post_ids` (None si falta alguno)"""
+        post_ids = [str(p) for p in post_ids]
+        with self._lock:
+            filas = self._conn.execute(
+                f"SELECT post_id, data FROM posts WHERE post_id IN ({','.join('?' * len(post_ids))})",
+                post_ids
+            ).fetchall() if post_ids else []
+        por_id = {post_id: blob for post_id, blob in filas}
+        if any(p not in por_id for p in post_ids):
+            return None
+        return [json.loads(zlib.decompress(por_id[p])) for p in post_ids]
+
+    def posts_de_genero(self, genre_id):
+        """Posts crudos de un género, del más nuevo al más viejo"""
+        with self._lock:
+            filas = self._conn.execute("""
+                SELECT p.data FROM posts p JOIN post_generos g ON g.post_id = p.post_id
+                WHERE g.genre_id = ?
+                ORDER BY CAST(p.post_id AS INTEGER) DESC
+            """, (genre_id,)).fetchall()
+        return [json.loads(zlib.decompress(blob)) for (blob,) in filas]
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def recuperar_liberados(archivo, generos, post_ids, sellos, sellos_blacklist, tipos_permitidos,
+                        descargados, fallidos_posts):
+    """
+    Re-filtra desde el archivo local los posts que quedaron debajo del cursor
+    y hoy pasan los filtros (ver filtros_liberados), sin tocar la red.
+
+    Returns:
+        tuple: (releases, bandas)
+    """
+    releases = []
+    bandas = {}
+    vistos = set()
+    for genre_id, genre_name in generos:
+        liberados = []
+        for post in archivo.posts_de_genero(genre_id):
+            labels = post.get('label', [])
+            if isinstance(labels, str):
+                labels = [labels]
+            if str(post.get('postId')) in post_ids or any(str(l).strip().lower() in sellos for l in labels):
+                liberados.append(post)
+        if not liberados:
+            continue
+        acumulado = ExtraccionGenero(genre_name, sellos_blacklist, tipos_permitidos,
+                                     descargados, fallidos_posts)
+        acumulado.procesar_pagina(liberados)
+        for nombre, info in acumulado.bandas.items():
+            bandas.setdefault(nombre, info)
+        for release in acumulado.releases:
+            if release['post_id'] not in vistos:
+                vistos.add(release['post_id'])
+                releases.append(release)
+    return releases, list(bandas.values())
+
+
+def extraer_posts_genero(session_data, genre_id, genre_name, sellos_blacklist, tipos_permitidos,
+                         descargados=None, fallidos_posts=None, verbose=True, cursor=None,
+                         journal=None, reanudacion=None):
+    """
+    Extrae TODOS los posts de un género, filtrando por sello y descargados al vuelo
+
+    Si se pasa `cursor` (high-water mark de la corrida anterior), los posts con
+    postId <= cursor['post_id'] se omiten y la paginación se corta en la primera
+    página que no trae ningún post nuevo.
+
+    Con `journal` cada página se registra antes de seguir paginando; con
+    `reanudacion` (estado del género según JournalExtraccion.cargar) primero
+    se re-procesan las páginas ya guardadas y se continúa desde su offset.
+
+    Returns:
+        tuple: (releases, bandas, posts_total, filtrados_sello, filtrados_descargados,
+                filtrados_fallidos, cursor_nuevo). `cursor_nuevo` es None si el
+                género no se pudo recorrer completo (no se debe avanzar el cursor).
     """
+    async def _extraer():
+        with ThreadPoolExecutor(max_workers=VENTANA_PAGINAS_PARALELAS) as executor:
+            return await _paginar_genero(
+                executor, ControlAIMD(inicial=1, maximo=VENTANA_PAGINAS_PARALELAS), session_data, genre_id, genre_name,
+                sellos_blacklist, tipos_permitidos, descargados, fallidos_posts, verbose,
+                cursor=cursor, journal=journal, reanudacion=reanudacion
+            )
+
+    return asyncio.run(_extraer())
+
+
+def _formatear_duracion(segundos):
+    """'1h 05m', '12m 30s', '45s'"""
+    segundos = int(max(0, segundos))
+    horas, resto = divmod(segundos, 3600)
+    mins, segs = divmod(resto, 60)
+    if horas:
+        return f"{horas}h {mins:02d}m"
+    if mins:
+        return f"{mins}m {segs:02d}s"
+    return f"{segs}s"
+
+
+def planificar_generos(generos, cursores, incremental=False):
+    """
+    Ordena los géneros para minimizar el tiempo total (LPT: el más largo primero)
+
+    La duración estimada de cada género (en páginas) sale de, en orden:
+      1. incremental con cursor: 1 página (se corta al llegar a lo visto)
+      2. páginas medidas en el último recorrido completo
+      3. sin medición: el promedio de los géneros medidos (1 si no hay ninguno)
+
+    Ningún género se salta: la columna "Articulos" de generos_activos.txt es
+    fija, así que no dice si un género cambió. En incremental el cursor de
+    postId ya corta cada género en su primera página sin posts nuevos.
+
+    Returns:
+        tuple: (generos_ordenados, {genre_id: paginas_estimadas})
+    """
+    medidas = [c['paginas_completo'] for c in cursores.values() if c.get('paginas_completo')]
+    promedio = max(1, round(sum(medidas) / len(medidas))) if medidas else 1
+
+    estimaciones = {}
+    for genre_id, _ in generos:
+        cursor = cursores.get(genre_id) or {}
+        if incremental and cursor.get('post_id') is not None:
+            estimaciones[genre_id] = 1
+        else:
+            estimaciones[genre_id] = cursor.get('paginas_completo') or promedio
+
+    # sort estable: a igual estimación se respeta el orden del archivo
+    ordenados = sorted(generos, key=lambda g: estimaciones[g[0]], reverse=True)
+    return ordenados, estimaciones
+
+
+async def extraer_todo_async(session, generos, sellos_blacklist, tipos_permitidos,
+                             descargados=None, fallidos_posts=None, verbose=True,
+                             cursores=None, incremental=False, journal=None, control=None,
+                             filtro_servidor=None, archivo=None, al_liberar=None):
+    """Versión asyncio de extraer_todo (ver su docstring)"""
     session_data = _preparar_session_data(session)
 
     todos_releases = []
@@ -341,66 +1146,178 @@ def extraer_todo(session, generos, sellos_blacklist, tipos_permitidos,
     posts_filtrados_descargados = 0
     posts_filtrados_fallidos = 0
     posts_ids_vistos = set()  # Para evitar duplicados entre géneros
-    lock = threading.Lock()
 
     if descargados is None:
         descargados = set()
     if fallidos_posts is None:
         fallidos_posts = set()
+    if cursores is None:
+        cursores = {}
+    if control is None:
+        control = ControlAIMD()
+    params_extra = (filtro_servidor or {}).get('params') or {}
+    tipos_servidor = (filtro_servidor or {}).get('tipos')
+
+    vigentes = {gid: c for gid, c in cursores.items() if _cursor_vigente(c, tipos_permitidos)}
+    reanudaciones = {}
+    if journal is not None:
+        reanudaciones = journal.abrir({
+            'modo': 'incremental' if incremental else 'completo',
+            'cursores': {gid: c.get('post_id') for gid, c in vigentes.items()} if incremental else {},
+            'tipos': sorted(tipos_permitidos or []),
+            'params': params_extra,
+        }, verbose)
+    generos, estimaciones = planificar_generos(generos, vigentes, incremental)
+    # Páginas ya confirmadas en el journal no se vuelven a descargar
+    for genre_id, estado in reanudaciones.items():
+        if genre_id in estimaciones:
+            estimaciones[genre_id] = max(1, estimaciones[genre_id] - len(estado['paginas']))
+    paginas_estimadas = sum(estimaciones.values())
 
     if verbose:
-        print(f"\n📦 Scrapeando {len(generos)} géneros (3 workers paralelos)...")
+        modo = "incremental" if incremental else "completo"
+        print(f"\n📦 Scrapeando {len(generos)} géneros (concurrencia adaptativa "
+              f"{control.limite}→{control.maximo}, modo {modo})...")
         if descargados:
             print(f"📋 {len(descargados)} releases ya descargados (serán omitidos)")
+        if reanudaciones:
+            paginas = sum(len(g['paginas']) for g in reanudaciones.values())
+            print(f"↩️  Reanudando desde journal: {len(reanudaciones)} géneros, {paginas} páginas")
+        if params_extra:
+            print(f"🔎 Filtro en el servidor: {params_extra}")
+        print(f"🗓️  Orden LPT: ~{paginas_estimadas} páginas estimadas, primero "
+              f"{', '.join(name for _, name in generos[:3])}")
         print("=" * 60)
 
-    completados = [0]  # Mutable para acceso desde closure
+    completados = 0
+    inicio = time.monotonic()
+    progreso = {'paginas': 0}
+    # Géneros paginando a la vez: se arrancan en orden LPT (el semáforo es FIFO)
+    generos_activos = asyncio.Semaphore(control.maximo)
+
+    async def procesar_genero(genre_id, genre_name):
+        cursor = vigentes.get(genre_id) if incremental else None
+        async with generos_activos:
+            resultado = await _paginar_genero(
+                executor, control, session_data, genre_id, genre_name, sellos_blacklist, tipos_permitidos,
+                descargados, fallidos_posts, verbose,
+                cursor=cursor, journal=journal, reanudacion=reanudaciones.get(genre_id),
+                progreso=progreso, params_extra=params_extra, archivo=archivo
+            )
+        return (genre_id, genre_name) + resultado
+
+    with ThreadPoolExecutor(max_workers=control.maximo) as executor:
+        tareas = [procesar_genero(gid, gname) for gid, gname in generos]
+
+        for siguiente in asyncio.as_completed(tareas):
+            (genre_id, genre_name, releases, bandas, posts, filtrados_sello, filtrados_desc,
+             filtrados_fallidos, cursor_nuevo) = await siguiente
+
+            if cursor_nuevo is not None:
+                anterior = vigentes.get(genre_id) or {}
+                if tipos_servidor:
+                    # Solo se vieron estos tipos: el cursor no sirve para otros
+                    cursor_nuevo['tipos'] = tipos_servidor
+                if incremental and anterior.get('post_id') is not None:
+                    # Recorrido parcial: conservar la medición del último recorrido completo
+                    cursor_nuevo['paginas_completo'] = anterior.get('paginas_completo')
+                    cursor_nuevo['posts_completo'] = anterior.get('posts_completo')
+                else:
+                    cursor_nuevo['paginas_completo'] = cursor_nuevo['paginas']
+                    cursor_nuevo['posts_completo'] = cursor_nuevo['posts']
+                cursores[genre_id] = cursor_nuevo
+
+            posts_total += posts
+            posts_filtrados_sello += filtrados_sello
+            posts_filtrados_descargados += filtrados_desc
+            posts_filtrados_fallidos += filtrados_fallidos
+
+            nuevas_bandas = 0
+            for nombre, info in bandas.items():
+                if nombre not in todas_bandas:
+                    todas_bandas[nombre] = info
+                    nuevas_bandas += 1
+
+            nuevos = []
+            for release in releases:
+                post_id = release['post_id']
+                if post_id not in posts_ids_vistos:
+                    posts_ids_vistos.add(post_id)
+                    todos_releases.append(release)
+                    nuevos.append(release)
+            nuevos_releases = len(nuevos)
+
+            if al_liberar is not None and nuevos:
+                # En un thread aparte: si el consumidor aplica backpressure
+                # los demás géneros siguen paginando mientras tanto
+                await asyncio.get_running_loop().run_in_executor(None, al_liberar, nuevos)
+
+            completados += 1
 
-    def procesar_genero(args):
-        idx, genre_id, genre_name = args
-        releases, bandas, posts, filtrados_sello, filtrados_desc, filtrados_fallidos = extraer_posts_genero(
-            session_data, genre_id, genre_name, sellos_blacklist, tipos_permitidos, descargados, fallidos_posts, verbose
-        )
-        return (idx, genre_name, releases, bandas, posts, filtrados_sello, filtrados_desc, filtrados_fallidos)
+            if verbose:
+                filtrados_total = filtrados_sello + filtrados_desc + filtrados_fallidos
+                print(f"\n[{completados}/{len(generos)}] {genre_name}")
+                print(f"  → {posts} posts, {filtrados_total} filtrados, +{nuevas_bandas} bandas, +{nuevos_releases} releases")
+                print(f"     Total: {len(todas_bandas)} bandas, {len(todos_releases)} releases "
+                      f"(concurrencia {control.limite})")
+                transcurrido = time.monotonic() - inicio
+                hechas = progreso['paginas']
+                if hechas and completados < len(generos):
+                    restantes = max(paginas_estimadas - hechas, len(generos) - completados)
+                    eta = restantes * transcurrido / hechas
+                    print(f"     Páginas: {hechas}/~{max(paginas_estimadas, hechas)} — ETA ~{_formatear_duracion(eta)}")
 
-    tareas = [(i, gid, gname) for i, (gid, gname) in enumerate(generos)]
+    if verbose:
+        duracion = time.monotonic() - inicio
+        print(f"\n⚡ {control.requests} requests en {duracion:.0f}s, concurrencia pico {control.limite_pico}, "
+              f"{control.rate_limits} rate limits ({control.tiempo_backoff:.0f}s en backoff)")
+        print(f"🗄️  {cache_http.resumen()}")
+        print(f"🚦 {limitador_api.resumen()}")
 
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {executor.submit(procesar_genero, t): t for t in tareas}
+    return (todos_releases, list(todas_bandas.values()), posts_total,
+            posts_filtrados_sello, posts_filtrados_descargados, posts_filtrados_fallidos)
 
-        for future in as_completed(futures):
-            idx, genre_name, releases, bandas, posts, filtrados_sello, filtrados_desc, filtrados_fallidos = future.result()
 
-            with lock:
-                posts_total += posts
-                posts_filtrados_sello += filtrados_sello
-                posts_filtrados_descargados += filtrados_desc
-                posts_filtrados_fallidos += filtrados_fallidos
+def extraer_todo(session, generos, sellos_blacklist, tipos_permitidos,
+                 descargados=None, fallidos_posts=None, verbose=True,
+                 cursores=None, incremental=False, journal=None, control=None,
+                 filtro_servidor=None, archivo=None, al_liberar=None):
+    """
+    Extrae todos los posts y bandas, filtrando al vuelo.
 
-                nuevas_bandas = 0
-                for nombre, info in bandas.items():
-                    if nombre not in todas_bandas:
-                        todas_bandas[nombre] = info
-                        nuevas_bandas += 1
+    Todos los géneros paginan a la vez en un event loop asyncio; las requests
+    (bloqueantes, sesión thread-local) corren en un executor y la cantidad en
+    vuelo la regula un ControlAIMD: sube mientras el servidor responde 200 y se
+    recorta a la mitad ante cada 429.
 
-                nuevos_releases = 0
-                for release in releases:
-                    post_id = release['post_id']
-                    if post_id not in posts_ids_vistos:
-                        posts_ids_vistos.add(post_id)
-                        todos_releases.append(release)
-                        nuevos_releases += 1
+    `cursores` (dict genre_id -> cursor) se actualiza in-place con el nuevo
+    high-water mark de cada género recorrido completo. Con incremental=True
+    cada género arranca desde su cursor anterior.
 
-                completados[0] += 1
+    Con `journal` (JournalExtraccion) cada página queda registrada en disco y,
+    si el journal trae páginas de una corrida interrumpida, cada género se
+    reanuda desde su último offset confirmado.
 
-                if verbose:
-                    filtrados_total = filtrados_sello + filtrados_desc + filtrados_fallidos
-                    print(f"\n[{completados[0]}/{len(generos)}] {genre_name}")
-                    print(f"  → {posts} posts, {filtrados_total} filtrados, +{nuevas_bandas} bandas, +{nuevos_releases} releases")
-                    print(f"     Total: {len(todas_bandas)} bandas, {len(todos_releases)} releases")
+    Los géneros arrancan en orden LPT (más páginas estimadas primero, según
+    las páginas medidas en el último recorrido completo) y se reporta un
+    ETA basado en el ritmo real de páginas.
 
-    return (todos_releases, list(todas_bandas.values()), posts_total,
-            posts_filtrados_sello, posts_filtrados_descargados, posts_filtrados_fallidos)
+    `filtro_servidor` ({'params': {...}, 'tipos': [...] | None}) agrega el
+    filtro de tipo / tamaño de página detectado a cada request. El filtro
+    local por tipo se mantiene igual como red de seguridad.
+
+    Con `archivo` (ArchivoPosts) los posts crudos quedan guardados para
+    `refiltrar`.
+
+    `al_liberar(releases)` se llama con los releases nuevos (sin duplicados)
+    de cada género apenas termina, para que el pipeline en flujo los pase a
+    la siguiente etapa sin esperar al resto de la extracción.
+    """
+    return asyncio.run(extraer_todo_async(
+        session, generos, sellos_blacklist, tipos_permitidos, descargados, fallidos_posts, verbose,
+        cursores=cursores, incremental=incremental, journal=journal, control=control,
+        filtro_servidor=filtro_servidor, archivo=archivo, al_liberar=al_liberar
+    ))
 
 
 def guardar_datos(bandas, releases, verbose=True):
@@ -418,10 +1335,123 @@ def guardar_datos(bandas, releases, verbose=True):
         print(f"📁 {OUTPUT_REPERTORIO} ({len(releases)} releases)")
 
 
-def run(tipos_permitidos=None, verbose=True):
+def fusionar_con_anterior(releases, bandas, descargados, fallidos_posts, verbose=True):
+    """
+    Modo incremental: suma los releases pendientes de la corrida anterior
+    (los que aún no se descargaron ni fallaron) a los releases nuevos.
+    """
+    if not os.path.exists(OUTPUT_REPERTORIO):
+        return releases, bandas
+
+    try:
+        with open(OUTPUT_REPERTORIO, 'r', encoding='utf-8') as f:
+            anteriores = json.load(f)
+    except (OSError, ValueError):
+        return releases, bandas
+
+    vistos = {str(r.get('post_id')) for r in releases}
+    pendientes = []
+    for r in anteriores:
+        pid = str(r.get('post_id'))
+        if pid in vistos or pid in descargados or pid in fallidos_posts:
+            continue
+        vistos.add(pid)
+        pendientes.append(r)
+
+    bandas_por_nombre = {b['name']: b for b in bandas}
+    if os.path.exists(OUTPUT_BANDAS):
+        try:
+            with open(OUTPUT_BANDAS, 'r', encoding='utf-8') as f:
+                for b in json.load(f):
+                    bandas_por_nombre.setdefault(b.get('name'), b)
+        except (OSError, ValueError):
+            pass
+
+    if verbose:
+        print(f"\n📋 Incremental: {len(releases)} releases nuevos + {len(pendientes)} pendientes de la corrida anterior")
+
+    return releases + pendientes, list(bandas_por_nombre.values())
+
+
+def refiltrar(tipos_permitidos=None, verbose=True):
+    """
+    Reconstruye repertorio.json y bandas.json desde el archivo local de posts
+    crudos, sin tocar la red: aplica la blacklist de sellos, los tipos y los
+    descargados/fallidos actuales a los géneros de generos_activos.txt.
+    """
+    if verbose:
+        print("=" * 60)
+        print("♻️  RE-FILTRADO OFFLINE DEL REPERTORIO")
+        print("=" * 60)
+
+    if tipos_permitidos is None:
+        tipos_permitidos = [1, 2]
+
+    if not os.path.exists(ARCHIVO_POSTS_FILE):
+        raise FileNotFoundError(f"No existe {ARCHIVO_POSTS_FILE}: ejecuta primero una extracción")
+
+    inicio = time.monotonic()
+    generos = cargar_generos()
+    sellos_blacklist = cargar_sellos_blacklist()
+    descargados = cargar_descargados()
+    fallidos_posts = cargar_fallidos()
+    archivo = ArchivoPosts()
+
+    tipos_archivados = archivo.tipos_filtrados()
+    if verbose:
+        print(f"✓ {archivo.contar():,} posts en el archivo local")
+        print(f"✓ {len(generos)} géneros, {len(sellos_blacklist)} sellos en blacklist")
+        print(f"✓ {len(descargados)} descargados, {len(fallidos_posts)} fallidos")
+        if tipos_archivados and not set(tipos_query(tipos_permitidos)) <= set(tipos_archivados):
+            print(f"⚠️  El archivo solo tiene los tipos {tipos_archivados} (filtro del servidor): "
+                  f"para otros tipos hace falta una extracción completa")
+
+    todos_releases = []
+    todas_bandas = {}
+    posts_total = 0
+    posts_ids_vistos = set()
+    for genre_id, genre_name in generos:
+        acumulado = ExtraccionGenero(genre_name, sellos_blacklist, tipos_permitidos,
+                                     descargados, fallidos_posts)
+        acumulado.procesar_pagina(archivo.posts_de_genero(genre_id))
+        posts_total += acumulado.posts_total
+        for nombre, info in acumulado.bandas.items():
+            todas_bandas.setdefault(nombre, info)
+        for release in acumulado.releases:
+            if release['post_id'] not in posts_ids_vistos:
+                posts_ids_vistos.add(release['post_id'])
+                todos_releases.append(release)
+    archivo.cerrar()
+
+    bandas = list(todas_bandas.values())
+    guardar_datos(bandas, todos_releases, verbose)
+
+    if verbose:
+        print(f"\n⚡ {posts_total:,} posts re-filtrados en {time.monotonic() - inicio:.1f}s")
+        print(f"Bandas únicas: {len(bandas):,}")
+        print(f"Releases: {len(todos_releases):,}")
+
+    return OUTPUT_BANDAS, OUTPUT_REPERTORIO
+
+
+def run(tipos_permitidos=None, verbose=True, completo=False, control=None, al_liberar=None):
     """
     Ejecuta la extracción optimizada
     Extrae posts, filtra por sello/descargados/fallidos, guarda bandas + releases
+
+    Args:
+        tipos_permitidos: IDs de tipo de disco a conservar
+        verbose: Mostrar progreso
+        completo: Si True ignora los cursores por género y re-escanea todo.
+                  Si False (incremental) cada género se corta al llegar a
+                  posts ya vistos en la corrida anterior. Los posts debajo
+                  del cursor que antes se filtraban y hoy pasan (fallido
+                  vencido, sello quitado de la blacklist) se recuperan del
+                  archivo local; sin archivo, o sin repertorio.json, la
+                  corrida es completa.
+        control: ControlAIMD a usar (para leer sus métricas después, p.ej. el benchmark)
+        al_liberar: Callback que recibe cada tanda de releases nuevos en cuanto
+                    está lista (ver modules.pipeline_flujo)
     """
     if verbose:
         print("=" * 60)
@@ -438,7 +1468,7 @@ def run(tipos_permitidos=None, verbose=True):
         print("\n🔐 Iniciando sesión...")
     session = crear_sesion_autenticada()
     if verbose:
-        print("✓ Sesión iniciada")
+        print(f"✓ Sesión {'reutilizada' if sesion_api.reutilizada else 'iniciada'}")
 
     generos = cargar_generos()
     if not generos:
@@ -447,6 +1477,33 @@ def run(tipos_permitidos=None, verbose=True):
     sellos_blacklist = cargar_sellos_blacklist()
     descargados = cargar_descargados()
     fallidos_posts = cargar_fallidos()
+    cursores = cargar_cursores()
+    incremental = not completo and bool(cursores)
+    if incremental and not os.path.exists(OUTPUT_REPERTORIO):
+        # Los pendientes de antes del cursor solo viven en repertorio.json:
+        # sin él, una corrida incremental los perdería sin avisar
+        incremental = False
+        if verbose:
+            print("⚠️  No existe repertorio.json: se hace un recorrido completo en vez de incremental")
+    archivo = ArchivoPosts()
+    journal = JournalExtraccion(archivo=archivo)
+
+    liberados_ids, sellos_liberados = set(), set()
+    if incremental:
+        liberados_ids, sellos_liberados = filtros_liberados(cargar_filtros_cursor(), fallidos_posts,
+                                                            sellos_blacklist)
+        if (liberados_ids or sellos_liberados) and archivo.contar() == 0:
+            # Sin archivo local no hay de dónde recuperarlos: recorrido completo
+            incremental = False
+            if verbose:
+                print(f"⚠️  {len(liberados_ids)} fallidos vencidos / {len(sellos_liberados)} sellos quitados "
+                      f"de la blacklist y sin archivo local: se hace un recorrido completo")
+
+    capacidades = detectar_capacidades_filtro(session, [gid for gid, _ in generos], tipos_permitidos, verbose)
+    filtro_servidor = {
+        'params': params_filtro_servidor(capacidades, tipos_permitidos),
+        'tipos': tipos_query(tipos_permitidos) if capacidades.get('tipos') else None,
+    }
 
     if verbose:
         print(f"✓ {len(generos)} géneros")
@@ -455,12 +1512,49 @@ def run(tipos_permitidos=None, verbose=True):
         print(f"✓ {len(fallidos_posts)} posts con links fallidos")
         tipos_nombres = [TIPOS_DISCO.get(t, str(t)) for t in tipos_permitidos]
         print(f"✓ Tipos: {', '.join(tipos_nombres)}")
+        if capacidades.get('tipos'):
+            print(f"✓ Filtro de tipo en el servidor ('{capacidades['tipos']['param']}')")
+        if capacidades.get('tamano_pagina'):
+            print(f"✓ Páginas de {capacidades['tamano_pagina']['valor']} posts "
+                  f"('{capacidades['tamano_pagina']['param']}')")
+        if incremental:
+            print(f"✓ Incremental: {len(cursores)} géneros con cursor")
+        else:
+            print("✓ Re-escaneo completo")
 
     releases, bandas, posts_total, posts_filtrados_sello, posts_filtrados_desc, posts_filtrados_fallidos = extraer_todo(
-        session, generos, sellos_blacklist, tipos_permitidos, descargados, fallidos_posts, verbose
+        session, generos, sellos_blacklist, tipos_permitidos, descargados, fallidos_posts, verbose,
+        cursores=cursores, incremental=incremental, journal=journal, control=control,
+        filtro_servidor=filtro_servidor, archivo=archivo, al_liberar=al_liberar
     )
+    if liberados_ids or sellos_liberados:
+        recuperados, bandas_recuperadas = recuperar_liberados(
+            archivo, generos, liberados_ids, sellos_liberados, sellos_blacklist, tipos_permitidos,
+            descargados, fallidos_posts
+        )
+        vistos = {r['post_id'] for r in releases}
+        recuperados = [r for r in recuperados if r['post_id'] not in vistos]
+        nombres = {b['name'] for b in bandas}
+        bandas = bandas + [b for b in bandas_recuperadas if b['name'] not in nombres]
+        releases = releases + recuperados
+        if al_liberar is not None and recuperados:
+            al_liberar(recuperados)
+        if verbose:
+            print(f"\n♻️  {len(recuperados)} releases recuperados del archivo local "
+                  f"({len(liberados_ids)} fallidos vencidos, {len(sellos_liberados)} sellos quitados de la blacklist)")
+    archivo.registrar_tipos_filtrados(filtro_servidor['tipos'])
+    archivo.cerrar()
+
+    if incremental:
+        nuevos = len(releases)
+        releases, bandas = fusionar_con_anterior(releases, bandas, descargados, fallidos_posts, verbose)
+        if al_liberar is not None and len(releases) > nuevos:
+            al_liberar(releases[nuevos:])
 
     guardar_datos(bandas, releases, verbose)
+    # El cursor solo avanza (y el journal se descarta) cuando los datos ya quedaron en disco
+    guardar_cursores(cursores, {'fallidos': sorted(fallidos_posts), 'sellos': sorted(sellos_blacklist)})
+    journal.limpiar()
 
     if verbose:
         print("\n" + "=" * 60)
@@ -477,4 +1571,20 @@ def run(tipos_permitidos=None, verbose=True):
 
 
 if __name__ == "__main__":
-    run()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Extrae bandas y repertorio via API')
+    parser.add_argument('comando', nargs='?', default='extraer', choices=['extraer', 'refilter'],
+                        help='extraer (default) o refilter: reconstruir repertorio.json desde el archivo local')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignorar cursores y re-escanear todos los géneros completos')
+    parser.add_argument('--tipos', default=None,
+                        help='IDs de tipo separados por coma (default: 1,2)')
+
+    args = parser.parse_args()
+    tipos = [int(t) for t in args.tipos.split(',') if t.strip().isdigit()] if args.tipos else None
+
+    if args.comando == 'refilter':
+        refiltrar(tipos_permitidos=tipos)
+    else:
+        run(tipos_permitidos=tipos, completo=args.full)
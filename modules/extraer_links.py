@@ -15,10 +15,10 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
 from modules.utils import (
-    API_URL, DELAY_BASE_429, MAX_BACKOFF_429,
+    API_URL,
     REPERTORIO_FILTRADO_FILE, REPERTORIO_CON_LINKS_FILE, LINKS_FILE, DETALLE_FILE,
     cargar_env, crear_sesion_autenticada,
-    delay_con_jitter,
+    peticion_api, espera_rate_limit, cache_http, crear_sesion_thread, sesion_api,
 )
 
 # Configuración
@@ -27,8 +27,7 @@ OUTPUT_JSON = REPERTORIO_CON_LINKS_FILE
 OUTPUT_TXT = LINKS_FILE
 OUTPUT_DETALLE = DETALLE_FILE
 
-# Configuración de rate limiting (ajustable)
-DELAY_ENTRE_REQUESTS = 0.5     # Segundos entre cada request
+# El ritmo de requests lo fija el limitador compartido (modules.utils.limitador_api)
 
 # Lock para thread safety
 print_lock = threading.Lock()
@@ -40,11 +39,8 @@ _thread_local = threading.local()
 def _get_thread_session(session_data):
     """Obtiene o crea una sesión HTTP para el thread actual (connection pooling)"""
     if not hasattr(_thread_local, 'session'):
-        session = requests.Session()
-        session.headers.update(session_data['headers'])
-        for cookie in session_data['cookies']:
-            session.cookies.set(cookie['name'], cookie['value'])
-        _thread_local.session = session
+        # Sesión con cache condicional (ETag/Last-Modified o TTL) en disco
+        _thread_local.session = crear_sesion_thread(session_data)
     return _thread_local.session
 
 
@@ -61,7 +57,8 @@ def preparar_session_data(session):
     """Prepara datos de sesión para workers"""
     return {
         'headers': dict(session.headers),
-        'cookies': [{'name': k, 'value': v} for k, v in session.cookies.items()]
+        'cookies': [{'name': k, 'value': v} for k, v in session.cookies.items()],
+        'generacion': getattr(session, 'generacion_sesion', 0),
     }
 
 
@@ -82,16 +79,13 @@ def extraer_links_post(session_data, release, max_retries=10):
     # Obtener sesión thread-local (reutiliza conexiones HTTP/TLS)
     session = _get_thread_session(session_data)
 
-    retries_429 = 0
     retries_error = 0
 
     while retries_error < max_retries:
         try:
-            # Pequeña pausa para no saturar
-            delay_con_jitter(DELAY_ENTRE_REQUESTS)
-
-            # Obtener links via API
-            response = session.get(
+            # Obtener links via API (el limitador compartido regula el ritmo)
+            response = peticion_api(
+                session,
                 f"{API_URL}/posts/{post_id}/links",
                 timeout=30
             )
@@ -114,12 +108,11 @@ def extraer_links_post(session_data, release, max_retries=10):
                 return release, len(download_links)
 
             elif response.status_code == 429:
-                # Rate limiting - esperar y reintentar indefinidamente
-                retries_429 += 1
-                wait = min(DELAY_BASE_429 * retries_429, MAX_BACKOFF_429)
+                # Rate limiting - la penalización es global: todos los workers
+                # esperan en el limitador antes de la próxima request
+                wait = espera_rate_limit(response)
                 with print_lock:
-                    print(f"    ⏳ Rate limited en links, esperando {wait}s...")
-                time.sleep(wait)
+                    print(f"    ⏳ Rate limited en links, pausa global de {wait:.0f}s...")
                 continue
 
             elif response.status_code == 404:
@@ -275,7 +268,7 @@ def run(verbose=True, num_workers=None, input_file=None):
         print("\n🔐 Iniciando sesión...")
     session = crear_sesion_autenticada()
     if verbose:
-        print("✓ Sesión iniciada")
+        print(f"✓ Sesión {'reutilizada' if sesion_api.reutilizada else 'iniciada'}")
 
     repertorio = cargar_repertorio(input_file or INPUT_FILE)
     if verbose:
@@ -303,6 +296,7 @@ def run(verbose=True, num_workers=None, input_file=None):
         print(f"Releases procesados: {len(repertorio_con_links)}")
         print(f"Releases con links: {con_links}")
         print(f"Total links extraídos: {total_links}")
+        print(f"🗄️  {cache_http.resumen()}")
 
     return OUTPUT_TXT
 
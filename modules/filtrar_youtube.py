@@ -9,13 +9,40 @@ se considera mainstream y se EXCLUYE. Solo se mantienen los underground.
 """
 
 import asyncio
+import functools
+import math
 import os
 import json
+import random
 import re
+import sqlite3
+import threading
+import time
 import urllib.parse
 import unicodedata
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import requests
 from playwright.async_api import async_playwright
 
+from modules.utils import (
+    MAINSTREAM_FILE, YOUTUBE_VEREDICTOS_FILE, YOUTUBE_PLAN_FILE, YOUTUBE_PLAN_LOCK_FILE,
+    YOUTUBE_SERP_FILE, RECLASIFICACION_FILE, YT_SERP_HABILITADO,
+    YT_PRECLASIFICADOR_HABILITADO, YT_PRECLASIFICADOR_UMBRAL, YT_PRECLASIFICADOR_AUDITORIA,
+    YT_DURACION, YT_PLAN_EXPLORACION, YT_PLAN_UMBRAL_RESCATE, YT_AGRUPAR_BANDAS,
+    YT_BACKEND, YT_BLOQUEAR_RECURSOS,
+    YT_RECICLAR_CADA, YT_RSS_MAX_MB_POR_PAGINA, YT_MEMORIA_LIBRE_MIN_MB, YT_PROCESOS,
+    YOUTUBE_REINTENTOS_FILE, YT_REINTENTOS, YT_BACKOFF_BASE_SEG, YT_BACKOFF_MAX_SEG,
+    YT_CACHE_HABILITADO, YT_CACHE_TTL_MAINSTREAM_DIAS, YT_CACHE_TTL_UNDERGROUND_DIAS,
+)
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
 try:
     from playwright_stealth.stealth import Stealth
     HAS_STEALTH = True
@@ -25,7 +52,7 @@ except ImportError:
 # Configuración
 INPUT_FILE = "data/repertorio.json"
 OUTPUT_FILE = "data/repertorio_filtrado.json"
-OUTPUT_RECHAZADOS = "data/releases_mainstream.txt"
+OUTPUT_RECHAZADOS = MAINSTREAM_FILE
 
 # Keywords que indican que el album está disponible (mainstream)
 KEYWORDS_MAINSTREAM = []
@@ -40,6 +67,55 @@ NEGATIVE_KEYWORDS = [
     "drum cam", "guitar playthrough", "bass playthrough",
 ]
 
+# Parámetro `sp` de /results para el filtro de duración
+FILTROS_DURACION = {
+    'larga': 'EgIYAg==',   # más de 20 minutos
+    'media': 'EgIYAw==',   # 4 a 20 minutos
+    'ninguna': None,
+}
+
+# JSON con los resultados de búsqueda embebido en el HTML de /results
+_RE_YT_INITIAL_DATA = re.compile(r'(?:var\s+ytInitialData|window\[["\']ytInitialData["\']\])\s*=\s*')
+
+# Recursos que no hacen falta para leer títulos y canales de /results
+TIPOS_RECURSO_BLOQUEADOS = {"image", "media", "font", "imageset", "texttrack"}
+DOMINIOS_BLOQUEADOS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com",
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com",
+    "adservice.google.com", "i.ytimg.com", "i9.ytimg.com", "yt3.ggpht.com", "googlevideo.com",
+)
+# Endpoints de telemetría/ads de YouTube (la página funciona sin ellos)
+RUTAS_BLOQUEADAS = (
+    "/api/stats/", "/ptracking", "/pagead/", "/generate_204", "/youtubei/v1/log_event",
+    "/csi_204", "/error_204",
+)
+
+# Chromium con el menor consumo posible: sin GPU, extensiones ni servicios
+# en segundo plano, y con el heap de V8 acotado por renderer
+ARGS_CHROMIUM_LIGERO = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--blink-settings=imagesEnabled=false",
+    "--mute-audio",
+    "--no-first-run",
+    "--js-flags=--max-old-space-size=256",
+]
+
+# Títulos, canales y nombres normalizados que se recuerdan (se repiten mucho
+# entre búsquedas: mismos uploads, misma banda)
+TAMANO_CACHE_TEXTOS = 65536
+
+_RE_GUIONES_BAJOS = re.compile(r'[_]+')
+_RE_SIMBOLOS = re.compile(r'[^\w\s]', flags=re.UNICODE)
+_RE_ESPACIOS = re.compile(r'\s+')
+
 # Stopwords para tokenización simple
 STOPWORDS = {
     "the", "a", "an", "of", "and", "or", "to", "in", "for", "from",
@@ -92,34 +168,266 @@ def cargar_keywords():
     return keywords
 
 
+@functools.lru_cache(maxsize=TAMANO_CACHE_TEXTOS)
 def _normalizar_texto(texto):
     """Normaliza texto para comparación (minúsculas + sin acentos + sin símbolos)"""
     texto = texto.lower()
     texto = unicodedata.normalize('NFKD', texto)
     texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
-    texto = re.sub(r'[_]+', ' ', texto)
-    texto = re.sub(r'[^\w\s]', ' ', texto, flags=re.UNICODE)
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    texto = _RE_GUIONES_BAJOS.sub(' ', texto)
+    texto = _RE_SIMBOLOS.sub(' ', texto)
+    texto = _RE_ESPACIOS.sub(' ', texto).strip()
     return texto
 
 
+@functools.lru_cache(maxsize=TAMANO_CACHE_TEXTOS)
 def _tokenizar(texto):
     """Tokeniza y elimina stopwords"""
     normal = _normalizar_texto(texto)
-    tokens = [t for t in normal.split() if len(t) >= 2 and t not in STOPWORDS]
-    return tokens
+    return tuple(t for t in normal.split() if len(t) >= 2 and t not in STOPWORDS)
+
+
+@functools.lru_cache(maxsize=TAMANO_CACHE_TEXTOS)
+def _palabras(texto_normalizado):
+    """Palabras de un texto ya normalizado"""
+    return frozenset(texto_normalizado.split())
+
+
+class EmparejadorTitulos:
+    """
+    Clasificador de una página de resultados, con las keywords compiladas en
+    una sola regex (búsqueda de subcadena, la más larga primero) y las
+    palabras negativas como set contra las palabras del título.
+
+    Los textos normalizados y sus palabras se memorizan (LRU), así un mismo
+    upload visto en varias búsquedas no se vuelve a normalizar.
+    """
+
+    def __init__(self, keywords, neg_words):
+        self.keywords = keywords
+        self.neg_words = neg_words
+        self._negativas = frozenset(neg_words)
+        alternativas = sorted({k for k in keywords if k}, key=len, reverse=True)
+        self._re_keyword = re.compile('|'.join(map(re.escape, alternativas))) if alternativas else None
+
+    def tiene_keyword(self, titulo_norm):
+        return self._re_keyword is not None and self._re_keyword.search(titulo_norm) is not None
+
+    def evaluar(self, resultados, band, album, tipo):
+        """
+        ('mainstream', titulo) si un video de la banda y el álbum tiene keyword;
+        ('ambigua', None) si hay videos de la banda y el álbum pero sin keyword;
+        ('limpia', None) si ninguno corresponde al release.
+        """
+        chequear_negativas = str(tipo or '').lower() != "live"
+        band_tokens = _tokenizar(band)
+        album_tokens = _tokenizar(album)
+        band_req = 1 if len(band_tokens) <= 2 else 2
+        album_req = 1 if len(album_tokens) <= 2 else 2
+        estado = 'limpia'
+
+        for item in resultados:
+            titulo = item.get('title') or ''
+            titulo_norm = _normalizar_texto(titulo)
+            palabras = _palabras(titulo_norm)
+
+            # Evitar falsos positivos comunes (excepto si el release es Live)
+            if chequear_negativas and not self._negativas.isdisjoint(palabras):
+                continue
+
+            # Si no hay tokens de álbum (títulos muy cortos), solo usar banda + keyword
+            if album_tokens and sum(1 for t in album_tokens if t in palabras) < album_req:
+                continue
+            band_hits = sum(1 for t in band_tokens if t in palabras)
+            if band_hits < band_req:
+                canal = _palabras(_normalizar_texto(item.get('channel') or ''))
+                if sum(1 for t in band_tokens if t in canal) < band_req:
+                    continue
 
+            # Solo keywords determinan si es mainstream
+            if self.tiene_keyword(titulo_norm):
+                return 'mainstream', titulo
+            estado = 'ambigua'
 
-def _contar_coincidencias(tokens, texto_normalizado):
-    """Cuenta cuántos tokens aparecen en el texto"""
-    if not tokens:
-        return 0
-    hay = f" {texto_normalizado} "
-    hits = 0
-    for t in tokens:
-        if f" {t} " in hay:
-            hits += 1
-    return hits
+        return estado, None
+
+    def banda_presente(self, resultados, band):
+        """True si algún video (título o canal) corresponde a la banda"""
+        band_tokens = _tokenizar(band)
+        if not band_tokens:
+            return True  # Sin tokens no se puede descartar: decidir por álbum
+        band_req = 1 if len(band_tokens) <= 2 else 2
+        for item in resultados:
+            for texto in (item.get('title'), item.get('channel')):
+                palabras = _palabras(_normalizar_texto(texto or ''))
+                if sum(1 for t in band_tokens if t in palabras) >= band_req:
+                    return True
+        return False
+
+
+def _clave_banda(release):
+    """Agrupa los releases de una banda (band_id si está, si no el nombre normalizado)"""
+    if release.get('band_id') is not None:
+        return f"id:{release['band_id']}"
+    return _normalizar_texto(release.get('band', ''))
+
+
+def _agrupable_por_banda(release):
+    """True si la búsqueda por banda (uploads con filtro de duración) dice algo del
+    release: solo los tipos de duración de álbum. Un EP o un single ausente
+    de esa página no prueba nada; van directo al plan del álbum."""
+    tipo = (release.get('type') or '').strip().lower()
+    return tipo in PlanificadorBusquedas.TIPOS_DURACION_ALBUM
+
+
+def _debe_bloquearse(tipo_recurso, url):
+    """True si el request no aporta nada a la lectura de resultados"""
+    if tipo_recurso in TIPOS_RECURSO_BLOQUEADOS:
+        return True
+    partes = urllib.parse.urlsplit(url)
+    host = partes.hostname or ''
+    if any(host == d or host.endswith('.' + d) for d in DOMINIOS_BLOQUEADOS):
+        return True
+    return any(r in partes.path for r in RUTAS_BLOQUEADAS)
+
+
+class MedidorNavegador:
+    """Bytes recibidos, requests bloqueados y tiempo de las búsquedas en Chromium"""
+
+    def __init__(self):
+        self.busquedas = 0
+        self.ms = 0.0
+        self.bytes = 0
+        self.requests = 0
+        self.bloqueados = 0
+
+    async def al_terminar_request(self, request):
+        self.requests += 1
+        try:
+            tamanos = await request.sizes()
+            self.bytes += tamanos['responseBodySize'] + tamanos['responseHeadersSize']
+        except Exception:
+            pass
+
+    def por_busqueda(self):
+        """(KB, ms, requests, bloqueados) promedio por búsqueda"""
+        n = max(self.busquedas, 1)
+        return self.bytes / 1024 / n, self.ms / n, self.requests / n, self.bloqueados / n
+
+    def resumen(self):
+        kb, ms, requests_, bloqueados = self.por_busqueda()
+        return (f"navegador: {kb:.0f} KB y {ms:.0f} ms por búsqueda "
+                f"({requests_:.0f} requests, {bloqueados:.0f} bloqueados)")
+
+
+def _hijos_directos():
+    """PIDs de los procesos hijos directos (vacío sin psutil)"""
+    try:
+        import psutil
+        return {proceso.pid for proceso in psutil.Process().children()}
+    except Exception:
+        return set()
+
+
+def _drivers_nuevos(antes):
+    """Drivers de Playwright lanzados desde `antes` (_hijos_directos()). Otras
+    etapas del pipeline también lanzan procesos: solo cuentan los de Playwright."""
+    try:
+        import psutil
+    except ImportError:
+        return []
+    drivers = []
+    for pid in _hijos_directos() - antes:
+        try:
+            if 'playwright' in ' '.join(psutil.Process(pid).cmdline()).lower():
+                drivers.append(pid)
+        except psutil.Error:
+            pass
+    return drivers
+
+
+def _rss_navegador_mb(raices):
+    """RSS sumado del árbol de procesos del navegador (driver + Chromium) que
+    cuelga de `raices`, o None sin psutil o sin raíces"""
+    if not raices:
+        return None
+    try:
+        import psutil
+    except ImportError:
+        return None
+    total = 0
+    for pid in raices:
+        try:
+            raiz = psutil.Process(pid)
+            procesos = [raiz] + raiz.children(recursive=True)
+        except psutil.Error:
+            continue
+        for proceso in procesos:
+            try:
+                total += proceso.memory_info().rss
+            except psutil.Error:
+                pass
+    return total / (1024 ** 2)
+
+
+class GobernadorMemoria:
+    """Decide cuándo reciclar un contexto de Chromium y si achicar o agrandar
+    el pool de páginas según la RAM libre. Sin psutil solo recicla por cantidad
+    de navegaciones."""
+
+    def __init__(self, reciclar_cada=YT_RECICLAR_CADA, rss_max_mb=YT_RSS_MAX_MB_POR_PAGINA,
+                 libre_min_mb=YT_MEMORIA_LIBRE_MIN_MB, intervalo=5.0):
+        self.reciclar_cada = reciclar_cada
+        self.rss_max_mb = rss_max_mb
+        self.libre_min_mb = libre_min_mb
+        self.intervalo = intervalo
+        self._medicion = (0.0, None, None)  # (momento, rss_mb, disponible_mb)
+        self._ultimo_ajuste = 0.0
+        # PIDs de los drivers de Playwright de este filtro: el RSS se mide sobre su árbol
+        self.raices = []
+
+    def medir(self):
+        """(RSS del navegador, RAM disponible) en MB; se mide como mucho cada `intervalo` s"""
+        momento, rss, disponible = self._medicion
+        if time.monotonic() - momento < self.intervalo:
+            return rss, disponible
+        try:
+            import psutil
+        except ImportError:
+            return None, None
+        disponible = psutil.virtual_memory().available / (1024 ** 2)
+        rss = _rss_navegador_mb(self.raices)
+        self._medicion = (time.monotonic(), rss, disponible)
+        return rss, disponible
+
+    def invalidar(self):
+        self._medicion = (0.0, None, None)
+
+    def debe_reciclar(self, navegaciones, activas):
+        if navegaciones >= self.reciclar_cada:
+            return True
+        if navegaciones == 0:
+            return False
+        rss, _ = self.medir()
+        return rss is not None and rss / max(activas, 1) > self.rss_max_mb
+
+    def ajuste_pool(self, activas):
+        """-1: retirar una página, +1: sumar una, 0: dejar igual"""
+        if time.monotonic() - self._ultimo_ajuste < self.intervalo:
+            return 0  # Dar tiempo a que el ajuste anterior se note en la medición
+        rss, disponible = self.medir()
+        if disponible is None:
+            return 0
+        por_pagina = max(rss / max(activas, 1), 150) if rss else 150
+        if disponible < self.libre_min_mb:
+            ajuste = -1
+        elif disponible > self.libre_min_mb + 2 * por_pagina:
+            ajuste = 1
+        else:
+            return 0
+        self._ultimo_ajuste = time.monotonic()
+        self.invalidar()
+        return ajuste
 
 
 def cargar_repertorio(input_file=INPUT_FILE):
@@ -131,176 +439,1272 @@ def cargar_repertorio(input_file=INPUT_FILE):
         return json.load(f)
 
 
-def generar_urls_busqueda(band, album, year=None, es_split=False):
-    """Genera 2 URLs de búsqueda en YouTube (doble búsqueda)"""
-    # Query 1: banda + album + año
-    if year:
-        q1 = f"{band} {album} {year}"
-    else:
-        q1 = f"{band} {album}"
+def _leer_mainstream_txt(path):
+    """(band, album, year, razon) de cada release de un releases_mainstream.txt
+    (formato de guardar_resultados)"""
+    actual = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.rstrip('\n')
+            if not linea.strip() or linea.startswith('#'):
+                continue
+            if linea.startswith(' '):
+                # "  Razón: ..." del release anterior
+                if actual is not None and linea.strip().startswith('Razón:'):
+                    razon = linea.split(':', 1)[1].strip()
+                    yield actual + (None if razon == 'N/A' else razon,)
+                    actual = None
+                continue
+            if actual is not None:
+                yield actual + (None,)
+            match = re.match(r'^(.+?) - (.+?)(?: \((\d{4})\))?\s*$', linea)
+            actual = (match.group(1), match.group(2), match.group(3)) if match else None
+    if actual is not None:
+        yield actual + (None,)
+
+
+class CacheVeredictos:
+    """Veredictos del filtro YouTube guardados en disco (SQLite).
+
+    Clave: banda / álbum normalizados + año. Guarda si fue mainstream, el
+    título que lo delató, cuándo se verificó y con qué se decidió (origen:
+    'album' = las búsquedas del release, 'banda' = solo la búsqueda por
+    banda, 'importado' = releases_mainstream.txt). Los mainstream vencen a los
+    YT_CACHE_TTL_MAINSTREAM_DIAS y los underground antes
+    (YT_CACHE_TTL_UNDERGROUND_DIAS): con el tiempo aparecen uploads nuevos.
+    """
+
+    def __init__(self, path=YOUTUBE_VEREDICTOS_FILE,
+                 ttl_mainstream_dias=YT_CACHE_TTL_MAINSTREAM_DIAS,
+                 ttl_underground_dias=YT_CACHE_TTL_UNDERGROUND_DIAS):
+        self.path = path
+        self.ttl_mainstream = ttl_mainstream_dias * 86400
+        self.ttl_underground = ttl_underground_dias * 86400
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Varios procesos del filtro pueden escribir a la vez (ver filtrar_en_procesos)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS veredictos (
+                band TEXT NOT NULL,
+                album TEXT NOT NULL,
+                year TEXT NOT NULL,
+                mainstream INTEGER NOT NULL,
+                titulo TEXT,
+                verificado REAL NOT NULL,
+                tipo TEXT,
+                origen TEXT,
+                PRIMARY KEY (band, album, year)
+            )
+        """)
+        columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(veredictos)")}
+        if 'tipo' not in columnas:
+            # Cachés creadas antes de guardar el tipo (lo usa PreclasificadorUnderground)
+            self._conn.execute("ALTER TABLE veredictos ADD COLUMN tipo TEXT")
+        if 'origen' not in columnas:
+            # Cachés creadas antes de guardar el origen: quedan NULL (origen desconocido)
+            self._conn.execute("ALTER TABLE veredictos ADD COLUMN origen TEXT")
+        self._conn.commit()
+
+    @staticmethod
+    def clave(band, album, year=None):
+        return (_normalizar_texto(band or ''), _normalizar_texto(album or ''), str(year or '').strip())
+
+    def obtener(self, release):
+        """(es_mainstream, titulo) si hay un veredicto vigente, si no None"""
+        clave = self.clave(release.get('band'), release.get('album'), release.get('year'))
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT mainstream, titulo, verificado FROM veredictos WHERE band = ? AND album = ? AND year = ?",
+                clave
+            ).fetchone()
+            if fila is not None:
+                mainstream, titulo, verificado = fila
+                ttl = self.ttl_mainstream if mainstream else self.ttl_underground
+                if time.time() - verificado <= ttl:
+                    self.hits += 1
+                    return bool(mainstream), titulo
+            self.misses += 1
+        return None
+
+    def guardar(self, band, album, year, es_mainstream, titulo=None, verificado=None, tipo=None,
+                origen=None):
+        clave = self.clave(band, album, year)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO veredictos (band, album, year, mainstream, titulo, verificado, tipo, origen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                clave + (1 if es_mainstream else 0, titulo, verificado or time.time(), tipo, origen)
+            )
+            self._conn.commit()
+
+    def importar_mainstream(self, path=OUTPUT_RECHAZADOS):
+        """Siembra la cache con un releases_mainstream.txt (formato de guardar_resultados).
+
+        Retorna cuántos releases se importaron.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No existe {path}")
+
+        verificado = os.path.getmtime(path)
+        importados = 0
+        for band, album, year, razon in _leer_mainstream_txt(path):
+            self.guardar(band, album, year, True, razon, verificado, origen='importado')
+            importados += 1
+        return importados
+
+    def todos(self):
+        """{clave: (es_mainstream, titulo, tipo, origen)} de todos los veredictos, vigentes o no"""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT band, album, year, mainstream, titulo, tipo, origen FROM veredictos"
+            ).fetchall()
+        return {(b, a, y): (bool(m), t, tipo, origen) for b, a, y, m, t, tipo, origen in filas}
+
+    def resumen(self):
+        return f"caché YouTube: {self.hits} veredictos reutilizados, {self.misses} verificados en el navegador"
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Probabilidad de mainstream por tipo cuando todavía no hay historial de ese
+# tipo (None = la tasa global). Los demos casi nunca tienen "full album".
+TIPO_PRIOR_MAINSTREAM = {
+    'album': None, 'ep': 0.25, 'compilation': 0.3, 'live': 0.3,
+    'split': 0.1, 'single': 0.1, 'demo': 0.03,
+}
+
+
+def _logit(p):
+    p = min(max(p, 1e-4), 1 - 1e-4)
+    return math.log(p / (1 - p))
+
+
+class PreclasificadorUnderground:
+    """
+    Estima la probabilidad de que un release sea mainstream sin buscarlo,
+    con las tasas del historial de veredictos (CacheVeredictos y
+    releases_mainstream.txt): por tipo, por década y por banda, suavizadas
+    hacia la tasa global y combinadas en escala logit.
+
+    decidir() devuelve 'underground' si la probabilidad queda bajo el umbral
+    (el release no pasa por el navegador), 'auditar' para una muestra de esos
+    casos que se verifica igual, o None. Si la auditoría encuentra demasiados
+    mainstream, el pre-clasificador se desactiva para el resto de la corrida.
+    Las bandas con muchos releases en el repertorio (establecidas) siempre se buscan.
+    """
+
+    def __init__(self, historial, umbral=YT_PRECLASIFICADOR_UMBRAL, auditoria=YT_PRECLASIFICADOR_AUDITORIA,
+                 max_releases_banda=5, min_auditorias=30):
+        self.umbral = umbral
+        self.auditoria = auditoria
+        self.max_releases_banda = max_releases_banda
+        self.min_auditorias = min_auditorias
+        self.activo = True
+        self.global_ = [0, 0]  # [mainstream, total]
+        self.por_tipo = {}
+        self.por_decada = {}
+        self.por_banda = {}
+        for band, year, tipo, es_mainstream in historial:
+            for tabla, clave in ((self.por_tipo, tipo), (self.por_decada, self._decada(year)),
+                                 (self.por_banda, band)):
+                if clave:
+                    cuenta = tabla.setdefault(clave, [0, 0])
+                    cuenta[0] += es_mainstream
+                    cuenta[1] += 1
+            self.global_[0] += es_mainstream
+            self.global_[1] += 1
+        self._lock = threading.Lock()
+        self.decididos = 0
+        self.auditados = 0
+        self.fallos_auditoria = 0
+
+    @classmethod
+    def desde_historial(cls, cache_path=YOUTUBE_VEREDICTOS_FILE, mainstream_path=OUTPUT_RECHAZADOS, **kwargs):
+        """Historial = veredictos de la caché + releases_mainstream.txt (lo que no esté en la caché)"""
+        filas = {}
+        if os.path.exists(mainstream_path):
+            for band, album, year, _ in _leer_mainstream_txt(mainstream_path):
+                filas[CacheVeredictos.clave(band, album, year)] = (True, None)
+        if os.path.exists(cache_path):
+            cache = CacheVeredictos(cache_path)
+            try:
+                for clave, (es_mainstream, _, tipo, _) in cache.todos().items():
+                    filas[clave] = (es_mainstream, tipo)
+            finally:
+                cache.cerrar()
+        historial = (
+            (band, year, str(tipo or '').lower(), es_mainstream)
+            for (band, _, year), (es_mainstream, tipo) in filas.items()
+        )
+        return cls(historial, **kwargs)
+
+    @staticmethod
+    def _decada(year):
+        year = str(year or '').strip()
+        return year[:3] if len(year) == 4 and year.isdigit() else None
+
+    @staticmethod
+    def _tasa(cuenta, prior, peso):
+        mainstream, total = cuenta or (0, 0)
+        return (mainstream + prior * peso) / (total + peso)
+
+    def probabilidad(self, release):
+        band, _, year = CacheVeredictos.clave(release.get('band'), release.get('album'), release.get('year'))
+        tipo = str(release.get('type') or '').lower()
+        p_global = self._tasa(self.global_, 0.5, 2)
+        prior_tipo = TIPO_PRIOR_MAINSTREAM.get(tipo)
+        logit = _logit(self._tasa(self.por_tipo.get(tipo), p_global if prior_tipo is None else prior_tipo, 20))
+        decada = self._decada(year)
+        if decada:
+            logit += _logit(self._tasa(self.por_decada.get(decada), p_global, 20)) - _logit(p_global)
+        logit += _logit(self._tasa(self.por_banda.get(band), p_global, 2)) - _logit(p_global)
+        return 1 / (1 + math.exp(-logit))
+
+    def releases_en_historial(self, release):
+        """Releases de la banda con veredicto en el historial"""
+        band = _normalizar_texto(release.get('band') or '')
+        return (self.por_banda.get(band) or (0, 0))[1]
+
+    def _en_auditoria(self, release):
+        """Muestra de auditoría por hash de la clave: la misma entrada da los mismos veredictos"""
+        clave = "\x1f".join(CacheVeredictos.clave(release.get('band'), release.get('album'), release.get('year')))
+        return zlib.crc32(clave.encode('utf-8')) / 2 ** 32 < self.auditoria
+
+    def decidir(self, release, releases_banda=1):
+        if not self.activo or releases_banda >= self.max_releases_banda:
+            return None
+        if self.probabilidad(release) >= self.umbral:
+            return None
+        if self._en_auditoria(release):
+            return 'auditar'
+        with self._lock:
+            self.decididos += 1
+        return 'underground'
+
+    def registrar_auditoria(self, es_mainstream):
+        with self._lock:
+            self.auditados += 1
+            self.fallos_auditoria += bool(es_mainstream)
+            if (self.activo and self.auditados >= self.min_auditorias
+                    and self.fallos_auditoria / self.auditados > 2 * self.umbral):
+                self.activo = False
+                print(f"⚠️  Pre-clasificador desactivado: la auditoría encontró {self.fallos_auditoria} "
+                      f"mainstream en {self.auditados} releases")
+
+    def resumen(self):
+        texto = f"pre-clasificador: {self.decididos} releases underground sin navegador"
+        if self.auditados:
+            texto += (f", auditoría {self.fallos_auditoria}/{self.auditados} mainstream "
+                      f"({self.fallos_auditoria / self.auditados:.1%} de error estimado)")
+        return texto
+
+
+class SnapshotsSERP:
+    """Páginas de resultados de YouTube guardadas en disco (SQLite).
+
+    Una fila por release (clave de CacheVeredictos) y consulta del plan, con
+    la URL, el tipo del release, cuándo se buscó y los (título, canal)
+    comprimidos con zlib. Las búsquedas por banda se guardan con álbum y
+    año vacíos. Permite reclasificar sin volver a YouTube (reclasificar()).
+    """
+
+    def __init__(self, path=YOUTUBE_SERP_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS serp (
+                band TEXT NOT NULL,
+                album TEXT NOT NULL,
+                year TEXT NOT NULL,
+                consulta TEXT NOT NULL,
+                url TEXT,
+                tipo TEXT,
+                buscado REAL NOT NULL,
+                resultados BLOB NOT NULL,
+                PRIMARY KEY (band, album, year, consulta)
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _comprimir(resultados):
+        pares = [[item.get('title') or '', item.get('channel') or ''] for item in resultados]
+        return zlib.compress(json.dumps(pares, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _descomprimir(blob):
+        return [{'title': t, 'channel': c} for t, c in json.loads(zlib.decompress(blob))]
+
+    def guardar(self, clave, consulta, url, resultados, tipo=''):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO serp VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                tuple(clave) + (consulta, url, tipo or '', time.time(), self._comprimir(resultados))
+            )
+            self._conn.commit()
+
+    def cargar(self):
+        """(páginas por release, páginas por banda, tipo por release)
+
+        páginas por release: {clave: [resultados, ...]}; por banda: {band_norm: [...]}
+        """
+        por_release = {}
+        por_banda = {}
+        tipos = {}
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT band, album, year, tipo, resultados FROM serp ORDER BY band, album, year, consulta"
+            ).fetchall()
+        for band, album, year, tipo, blob in filas:
+            resultados = self._descomprimir(blob)
+            if album:
+                por_release.setdefault((band, album, year), []).append(resultados)
+                tipos[(band, album, year)] = tipo
+            else:
+                por_banda.setdefault(band, []).append(resultados)
+        return por_release, por_banda, tipos
+
+    def resumen(self):
+        with self._lock:
+            n, tamano = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(resultados)), 0) FROM serp").fetchone()
+        return f"{n} páginas de resultados ({tamano / 1024:.0f} KB comprimidas)"
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _url_busqueda(query, duracion=None):
+    url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(query)}"
+    sp = FILTROS_DURACION.get(duracion)
+    if sp:
+        url += f"&sp={urllib.parse.quote(sp)}"
+    return url
+
+
+class PlanificadorBusquedas:
+    """
+    Decide qué búsquedas hacer por release y lleva la tasa de aciertos de cada una.
+
+    Plan: 'combinada' ("banda álbum full album", con filtro de duración solo
+    para los tipos de duración de álbum, donde están casi todos los uploads
+    de álbum completo; un EP, demo o single dura menos de 20 min y el filtro
+    lo escondería) y, solo si hace falta, 'respaldo' (la búsqueda clásica
+    banda + álbum + año, sin filtro). La segunda se salta cuando la primera
+    fue 'limpia' (ningún video de la banda y el álbum), salvo en una muestra
+    de exploración que mide cuántos mainstream se escapan; si esa tasa pasa
+    el umbral, vuelve a correr siempre. La tasa se lleva por tipo de release:
+    la de los álbumes no dice nada de los EPs.
+
+    Las estadísticas se acumulan en YOUTUBE_PLAN_FILE (sumando entre procesos).
+    """
+
+    CONSULTAS = ('banda', 'combinada', 'respaldo')
+    ESTADOS = ('mainstream', 'ambigua', 'limpia')
+    # Tipos que duran como un álbum: los únicos a los que se aplica el filtro de duración
+    TIPOS_DURACION_ALBUM = frozenset({'album', 'compilation', 'live', 'boxset'})
+
+    def __init__(self, path=YOUTUBE_PLAN_FILE, duracion=YT_DURACION,
+                 exploracion=YT_PLAN_EXPLORACION, umbral_rescate=YT_PLAN_UMBRAL_RESCATE,
+                 min_muestras=50):
+        self.path = path
+        self.duracion = duracion
+        self.exploracion = exploracion
+        self.umbral_rescate = umbral_rescate
+        self.min_muestras = min_muestras
+        self._lock = threading.Lock()
+        self._historico = self._leer()
+        self._nuevo = self._vacio()
+
+    @classmethod
+    def _vacio(cls):
+        return {
+            'consultas': {c: {e: 0 for e in cls.ESTADOS} for c in cls.CONSULTAS},
+            'exploracion': {'muestras': 0, 'rescates': 0, 'por_tipo': {}},
+        }
+
+    def _leer(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return self._vacio()
+        return self._sumar(self._vacio(), datos)
+
+    @classmethod
+    def _sumar(cls, base, delta):
+        for consulta, estados in delta.get('consultas', {}).items():
+            destino = base['consultas'].setdefault(consulta, {e: 0 for e in cls.ESTADOS})
+            for estado, n in estados.items():
+                destino[estado] = destino.get(estado, 0) + n
+        for clave, n in delta.get('exploracion', {}).items():
+            if clave == 'por_tipo':
+                for tipo, cuentas in n.items():
+                    destino = base['exploracion']['por_tipo'].setdefault(
+                        tipo, {'muestras': 0, 'rescates': 0})
+                    for k, v in cuentas.items():
+                        destino[k] = destino.get(k, 0) + v
+            else:
+                base['exploracion'][clave] = base['exploracion'].get(clave, 0) + n
+        return base
+
+    @staticmethod
+    def _clave_tipo(tipo):
+        return (tipo or '').strip().lower()
+
+    def duracion_para(self, tipo):
+        """Filtro de duración de la búsqueda 'combinada' (None si el tipo es más corto que un álbum)"""
+        return self.duracion if self._clave_tipo(tipo) in self.TIPOS_DURACION_ALBUM else None
+
+    def _total(self):
+        return self._sumar(self._sumar(self._vacio(), self._historico), self._nuevo)
+
+    def plan(self, band, album, year=None, es_split=False, es_self_titled=False, tipo=''):
+        """Lista de (nombre, url) en orden de ejecución"""
+        banda_combinada = band.split(" / ")[0].strip() if es_split and " / " in band else band
+        q_combinada = f"{banda_combinada} {album} full album"
+        partes = [band, album] + (["self titled"] if es_self_titled else []) + ([str(year)] if year else [])
+        q_respaldo = " ".join(partes)
+        return [
+            ('combinada', _url_busqueda(q_combinada, self.duracion_para(tipo))),
+            ('respaldo', _url_busqueda(q_respaldo)),
+        ]
+
+    def url_banda(self, band):
+        """Búsqueda por banda: sus uploads de álbum completo, para decidir varios releases a la vez"""
+        return _url_busqueda(f"{band} full album", self.duracion)
+
+    def tasa_rescate(self, tipo=None):
+        """
+        Fracción de casos 'limpios' explorados en los que la segunda búsqueda
+        encontró mainstream. Con `tipo` usa la tasa de ese tipo; mientras no
+        junte min_muestras propias, la global.
+        """
+        exploracion = self._total()['exploracion']
+        if tipo is not None:
+            propia = exploracion['por_tipo'].get(self._clave_tipo(tipo))
+            if propia and propia['muestras'] >= self.min_muestras:
+                return propia['rescates'] / propia['muestras']
+        if exploracion['muestras'] < self.min_muestras:
+            return None
+        return exploracion['rescates'] / exploracion['muestras']
+
+    def saltar_respaldo(self, tipo=''):
+        """(saltar, explorar) para un release cuya primera búsqueda fue limpia"""
+        tasa = self.tasa_rescate(tipo)
+        if tasa is not None and tasa > self.umbral_rescate:
+            return False, False
+        if random.random() < self.exploracion:
+            return False, True
+        return True, False
+
+    def registrar(self, consulta, estado):
+        with self._lock:
+            self._nuevo['consultas'][consulta][estado] += 1
+
+    def registrar_exploracion(self, rescate, tipo=''):
+        with self._lock:
+            exploracion = self._nuevo['exploracion']
+            por_tipo = exploracion['por_tipo'].setdefault(
+                self._clave_tipo(tipo), {'muestras': 0, 'rescates': 0})
+            for cuentas in (exploracion, por_tipo):
+                cuentas['muestras'] += 1
+                if rescate:
+                    cuentas['rescates'] += 1
+
+    def resumen(self):
+        total = self._total()
+        partes = []
+        for consulta, estados in total['consultas'].items():
+            n = sum(estados.values())
+            if n:
+                partes.append(f"{consulta} {n} ({estados['mainstream'] / n:.0%} mainstream, "
+                              f"{estados['ambigua'] / n:.0%} ambiguas)")
+        tasa = self.tasa_rescate()
+        if tasa is not None:
+            partes.append(f"rescate {tasa:.1%} en {total['exploracion']['muestras']} exploraciones")
+            por_tipo = [f"{tipo or '?'} {c['rescates'] / c['muestras']:.1%}"
+                        for tipo, c in sorted(total['exploracion']['por_tipo'].items())
+                        if c['muestras'] >= self.min_muestras]
+            if por_tipo:
+                partes.append("rescate por tipo: " + ", ".join(por_tipo))
+        return "plan: " + ("; ".join(partes) if partes else "sin datos")
+
+    def guardar(self):
+        """Suma lo de esta corrida al archivo (con lock entre procesos)"""
+        with self._lock:
+            nuevo, self._nuevo = self._nuevo, self._vacio()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock_f = None
+        if HAS_FCNTL:
+            lock_f = open(YOUTUBE_PLAN_LOCK_FILE, 'a')
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+        try:
+            datos = self._sumar(self._leer(), nuevo)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, indent=2)
+            os.replace(tmp, self.path)
+            self._historico = datos
+        finally:
+            if lock_f is not None:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+                lock_f.close()
+
+
+def _texto_yt(obj):
+    """Texto de un nodo de texto de ytInitialData ({'runs': [...]} o {'simpleText': ...})"""
+    if not isinstance(obj, dict):
+        return ''
+    if 'simpleText' in obj:
+        return obj['simpleText'] or ''
+    return ''.join(run.get('text', '') for run in obj.get('runs') or [])
+
+
+def _iterar_video_renderers(nodo):
+    """Recorre ytInitialData en orden y devuelve cada videoRenderer"""
+    pila = [nodo]
+    while pila:
+        actual = pila.pop()
+        if isinstance(actual, dict):
+            video = actual.get('videoRenderer')
+            if isinstance(video, dict):
+                yield video
+                continue
+            pila.extend(reversed(list(actual.values())))
+        elif isinstance(actual, list):
+            pila.extend(reversed(actual))
+
+
+def extraer_yt_initial_data(html):
+    """JSON ytInitialData embebido en la página de resultados (None si no está)"""
+    match = _RE_YT_INITIAL_DATA.search(html)
+    if not match:
+        return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(html, match.end())
+        return data
+    except ValueError:
+        return None
+
+
+class BloqueoYouTube(Exception):
+    """YouTube no mostró resultados sino un estado que no dice nada del release.
+
+    tipo: 'consentimiento' (muro de cookies), 'captcha' (página "unusual
+    traffic" / sorry), 'throttle' (HTTP 429) o 'vacia' (la página no llegó a
+    ningún estado reconocible). Un release cuya búsqueda termina así queda sin
+    veredicto: no puede aprobarse como underground.
+    """
+
+    def __init__(self, tipo):
+        super().__init__(tipo)
+        self.tipo = tipo
 
-    # Query 2: variante con "full album"
-    if es_split and " / " in band:
-        # Para splits, la segunda query usa solo la primera banda
-        primera_banda = band.split(" / ")[0].strip()
-        q2 = f"{primera_banda} {album} full album"
-    else:
-        q2 = f"{band} {album} full album"
 
-    return [
-        f"https://www.youtube.com/results?search_query={urllib.parse.quote(q1)}",
-        f"https://www.youtube.com/results?search_query={urllib.parse.quote(q2)}",
-    ]
+# Cookies que evitan el muro de consentimiento (UE) en la mayoría de los casos
+COOKIES_CONSENTIMIENTO = [
+    {'name': 'CONSENT', 'value': 'YES+cb', 'domain': '.youtube.com', 'path': '/'},
+    {'name': 'SOCS', 'value': 'CAI', 'domain': '.youtube.com', 'path': '/'},
+]
+
+# Estados de la página de resultados que el navegador sabe reconocer
+SELECTOR_VIDEOS = 'ytd-video-renderer'
+SELECTOR_OTROS_RESULTADOS = 'ytd-channel-renderer, ytd-playlist-renderer, ytd-radio-renderer'
+SELECTOR_SIN_RESULTADOS = 'ytd-background-promo-renderer'
+SELECTOR_CONSENTIMIENTO = 'form[action*="consent"], ytd-consent-bump-v2-lightbox'
+SELECTOR_CAPTCHA = '#captcha-form, iframe[src*="recaptcha"]'
+SELECTOR_ESTADOS = ', '.join([SELECTOR_VIDEOS, SELECTOR_OTROS_RESULTADOS, SELECTOR_SIN_RESULTADOS,
+                              SELECTOR_CONSENTIMIENTO, SELECTOR_CAPTCHA])
+
+
+def _es_pagina_captcha(url, html=''):
+    """Página de "unusual traffic" de Google (google.com/sorry o reCAPTCHA)"""
+    return '/sorry/' in url or 'unusual traffic' in html or 'g-recaptcha' in html
+
+
+class BuscadorHTTP:
+    """Resultados de búsqueda de YouTube sin navegador.
+
+    Baja el HTML de /results con una sesión HTTP por worker (keep-alive) y
+    lee título y canal de los videoRenderer del JSON ytInitialData. Retorna
+    None cuando hace falta el navegador: muro de consentimiento, error HTTP
+    o un formato que no se reconoce. Un 429 o la página de CAPTCHA levantan
+    BloqueoYouTube: el navegador, desde la misma IP, recibiría lo mismo.
+    """
+
+    def __init__(self, num_sesiones=5, timeout=15):
+        self.timeout = timeout
+        self._sesiones = [self._crear_sesion(i) for i in range(max(1, num_sesiones))]
+
+    def _crear_sesion(self, i):
+        session = requests.Session()
+        session.headers.update({
+            'User-Agent': f'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/131.0.{i}.0 Safari/537.36',
+            'Accept-Language': 'en-US,en;q=0.9',
+        })
+        for cookie in COOKIES_CONSENTIMIENTO:
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'])
+        return session
+
+    def renovar(self, idx):
+        """Sesión nueva (cookies y conexión limpias) para el worker idx"""
+        i = idx % len(self._sesiones)
+        self._sesiones[i].close()
+        self._sesiones[i] = self._crear_sesion(i)
+
+    def buscar(self, url, idx=0, max_videos=10):
+        session = self._sesiones[idx % len(self._sesiones)]
+        try:
+            response = session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            return None
+        if response.status_code == 429:
+            raise BloqueoYouTube('throttle')
+        if _es_pagina_captcha(response.url, '' if 'ytInitialData' in response.text else response.text):
+            raise BloqueoYouTube('captcha')
+        if response.status_code != 200 or 'consent.' in response.url:
+            return None
+
+        data = extraer_yt_initial_data(response.text)
+        if data is None:
+            return None
+
+        resultados = []
+        for video in _iterar_video_renderers(data):
+            resultados.append({
+                'title': _texto_yt(video.get('title')).strip(),
+                'channel': _texto_yt(video.get('ownerText') or video.get('longBylineText')).strip(),
+            })
+            if len(resultados) >= max_videos:
+                break
+        if not resultados and '"backgroundPromoRenderer"' in response.text:
+            return []  # YouTube dice explícitamente que no hay resultados
+        # Sin videos puede ser un formato nuevo de la página: mejor confirmarlo en el navegador
+        return resultados or None
+
+    def cerrar(self):
+        for session in self._sesiones:
+            session.close()
 
 
 class YouTubeFilterParallel:
-    def __init__(self, num_workers=5):
+    def __init__(self, num_workers=5, backend=YT_BACKEND, bloquear_recursos=YT_BLOQUEAR_RECURSOS):
         self.playwright = None
         self.browser = None
         self.contexts = []
         self.pages = []
         self.keywords = []
         self.neg_words = set()
+        self._emparejador_actual = None
         self.num_workers = num_workers
-        self.semaphore = None
+        self._paginas_libres = None
+        self.backend = backend
+        self.buscador_http = BuscadorHTTP(num_workers) if backend == 'http' else None
+        self.headless = True
+        self._browser_lock = None
+        self.busquedas_http = 0
+        self.busquedas_navegador = 0
+        self.bloquear_recursos = bloquear_recursos
+        self.medidor = MedidorNavegador()
+        self.gobernador = GobernadorMemoria()
+        self.planificador = PlanificadorBusquedas()
+        # clave de banda -> releases pendientes que pueden usar la búsqueda por banda
+        self.bandas_agrupadas = {}
+        self._busquedas_banda = {}
+        self._releases_liberados = set()  # id(release) ya descontados de bandas_agrupadas
+        self.busquedas_banda = 0
+        self.decididos_por_banda = 0
+        # id(release) de los decididos solo con la búsqueda por banda (ver origen_veredicto)
+        self._ids_por_banda = set()
+        self.snapshots = SnapshotsSERP() if YT_SERP_HABILITADO else None
+        self.navegaciones = []
+        self.paginas_activas = num_workers
+        self._retiradas = []
+        self.reciclajes = 0
+        # Bloqueos de YouTube por tipo; racha, espera pendiente y rotación por contexto (page_idx)
+        self.bloqueos = {'consentimiento': 0, 'captcha': 0, 'throttle': 0, 'vacia': 0}
+        self._rachas_bloqueo = {}
+        self._espera_contexto = {}
+        self._rotar = set()
+        self.reintentos = 0
+
+    async def iniciar(self, headless=True):
+        """Prepara el filtro. Con el backend HTTP el navegador se abre recién si hace falta."""
+        self.headless = headless
+        # Pool de páginas: cada búsqueda en curso tiene la suya (check-out / check-in)
+        self._paginas_libres = asyncio.Queue()
+        for i in range(self.num_workers):
+            self._paginas_libres.put_nowait(i)
+        if self.buscador_http is None:
+            await self.iniciar_browser(headless=headless)
 
     async def iniciar_browser(self, headless=True):
         """Inicializa Playwright con múltiples páginas"""
+        antes = _hijos_directos()
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=headless)
-        self.semaphore = asyncio.Semaphore(self.num_workers)
+        self.gobernador.raices = _drivers_nuevos(antes)
+        self.gobernador.invalidar()
+        self.browser = await self.playwright.chromium.launch(
+            headless=headless,
+            args=ARGS_CHROMIUM_LIGERO if self.bloquear_recursos else None
+        )
 
-        # Crear múltiples contextos y páginas
+        # Un contexto y una página por worker
+        self.contexts = [None] * self.num_workers
+        self.pages = [None] * self.num_workers
+        self.navegaciones = [0] * self.num_workers
         for i in range(self.num_workers):
-            context = await self.browser.new_context(
-                viewport={'width': 1280, 'height': 720},
-                user_agent=f'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/131.0.{i}.0 Safari/537.36'
-            )
-            page = await context.new_page()
+            if i not in self._retiradas:
+                await self._crear_pagina(i)
+
+    async def _crear_pagina(self, i):
+        context = await self.browser.new_context(
+            viewport={'width': 1280, 'height': 720},
+            user_agent=f'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/131.0.{i}.0 Safari/537.36',
+            service_workers='block'
+        )
+        await context.add_cookies(COOKIES_CONSENTIMIENTO)
+        if self.bloquear_recursos:
+            await context.route('**/*', self._filtrar_recurso)
+        page = await context.new_page()
+        page.on('requestfinished', self.medidor.al_terminar_request)
+
+        if HAS_STEALTH:
+            stealth = Stealth()
+            await stealth.apply_stealth_async(page)
+
+        self.contexts[i] = context
+        self.pages[i] = page
+        self.navegaciones[i] = 0
+
+    async def _cerrar_pagina(self, i):
+        """Cierra el contexto de la página i (libera su renderer)"""
+        context = self.contexts[i]
+        self.contexts[i] = None
+        self.pages[i] = None
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def _reciclar_pagina(self, i):
+        """Reemplaza el contexto de la página i por uno nuevo (la memoria acumulada se libera)"""
+        await self._cerrar_pagina(i)
+        await self._crear_pagina(i)
+        self.reciclajes += 1
+        self.gobernador.invalidar()
+
+    def _registrar_bloqueo(self, page_idx, tipo):
+        """Cuenta el bloqueo y deja el contexto en backoff: al devolverlo se
+        rota (contexto / sesión nuevos) y vuelve al pool tras
+        YT_BACKOFF_BASE_SEG * 2^(racha-1) segundos (tope YT_BACKOFF_MAX_SEG)"""
+        self.bloqueos[tipo] = self.bloqueos.get(tipo, 0) + 1
+        racha = self._rachas_bloqueo.get(page_idx, 0) + 1
+        self._rachas_bloqueo[page_idx] = racha
+        espera = min(YT_BACKOFF_MAX_SEG, YT_BACKOFF_BASE_SEG * 2 ** (racha - 1))
+        # Jitter: que los contextos bloqueados a la vez no vuelvan todos juntos
+        self._espera_contexto[page_idx] = espera * random.uniform(0.8, 1.2)
+        self._rotar.add(page_idx)
+
+    async def _devolver_pagina(self, page_idx):
+        """Check-in al pool: rota el contexto si YouTube lo bloqueó, recicla
+        si corresponde y aplica el gobernador de memoria (retira esta página
+        o reactiva una retirada). Un contexto en backoff vuelve al pool
+        recién cuando termina su espera."""
+        espera = self._espera_contexto.pop(page_idx, 0)
+        rotar = page_idx in self._rotar
+        self._rotar.discard(page_idx)
+        if rotar and self.buscador_http is not None:
+            self.buscador_http.renovar(page_idx)
+        if self.browser is not None:
+            ajuste = 0
+            try:
+                if (self.pages[page_idx] is not None
+                        and (rotar or self.gobernador.debe_reciclar(self.navegaciones[page_idx],
+                                                                    self.paginas_activas))):
+                    await self._reciclar_pagina(page_idx)
+                ajuste = self.gobernador.ajuste_pool(self.paginas_activas)
+            except Exception:
+                pass
+            if ajuste < 0 and self.paginas_activas > 1:
+                await self._cerrar_pagina(page_idx)
+                self._retiradas.append(page_idx)
+                self.paginas_activas -= 1
+                return
+            if ajuste > 0 and self._retiradas:
+                # La página reactivada se vuelve a crear al tomarla (_pagina)
+                self._paginas_libres.put_nowait(self._retiradas.pop())
+                self.paginas_activas += 1
+        if espera > 0:
+            asyncio.get_running_loop().call_later(espera, self._paginas_libres.put_nowait, page_idx)
+        else:
+            self._paginas_libres.put_nowait(page_idx)
+
+    async def _filtrar_recurso(self, route):
+        """Aborta imágenes, video, fuentes y trackers; el resto sigue normal"""
+        request = route.request
+        if _debe_bloquearse(request.resource_type, request.url):
+            self.medidor.bloqueados += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _pagina(self, page_idx):
+        """Página del navegador para page_idx (abre el navegador o recrea la
+        página la primera vez que se necesita)"""
+        if self.browser is None or self.pages[page_idx] is None:
+            if self._browser_lock is None:
+                self._browser_lock = asyncio.Lock()
+            async with self._browser_lock:
+                if self.browser is None:
+                    await self.iniciar_browser(headless=self.headless)
+                elif self.pages[page_idx] is None:
+                    await self._crear_pagina(page_idx)
+        return self.pages[page_idx]
+
+    async def _resultados_navegador(self, page, url, max_videos=10):
+        """Título y canal de los primeros videos, renderizando la búsqueda en Chromium"""
+        inicio = time.monotonic()
+        try:
+            return await self._leer_resultados(page, url, max_videos)
+        finally:
+            self.medidor.busquedas += 1
+            self.medidor.ms += (time.monotonic() - inicio) * 1000
+
+    async def _leer_resultados(self, page, url, max_videos):
+        """Videos de la página de resultados. [] solo si YouTube dice que no
+        hay videos; consentimiento, CAPTCHA, 429 o una página que no llega a
+        ningún estado conocido levantan BloqueoYouTube en vez de esperar y
+        devolver una lista vacía."""
+        respuesta = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+        if respuesta is not None and respuesta.status == 429:
+            raise BloqueoYouTube('throttle')
+        if 'consent.' in page.url:
+            raise BloqueoYouTube('consentimiento')
+        if _es_pagina_captcha(page.url):
+            raise BloqueoYouTube('captcha')
 
-            if HAS_STEALTH:
-                stealth = Stealth()
-                await stealth.apply_stealth_async(page)
+        try:
+            await page.wait_for_selector(SELECTOR_ESTADOS, timeout=15000)
+        except Exception:
+            raise BloqueoYouTube('vacia')
+
+        if await page.query_selector(SELECTOR_VIDEOS) is None:
+            if await page.query_selector(SELECTOR_CONSENTIMIENTO) is not None:
+                raise BloqueoYouTube('consentimiento')
+            if await page.query_selector(SELECTOR_CAPTCHA) is not None:
+                raise BloqueoYouTube('captcha')
+            return []  # Sin resultados, o solo canales / playlists
+
+        return await page.evaluate('''(maxVideos) => {
+            const items = [];
+            const elements = Array.from(document.querySelectorAll('ytd-video-renderer')).slice(0, maxVideos);
+            for (const el of elements) {
+                const titleEl = el.querySelector('#video-title');
+                const title = titleEl ? (titleEl.textContent || titleEl.getAttribute('title') || '').trim() : '';
+                const chEl = el.querySelector('ytd-channel-name #text a');
+                const channel = chEl ? (chEl.textContent || '').trim() : '';
+                items.push({title, channel});
+            }
+            return items;
+        }''', max_videos)
+
+    async def _buscar(self, page_idx, url, max_videos):
+        """Resultados de una búsqueda: HTTP si se puede, si no Chromium. None
+        si no cargó (error de red); BloqueoYouTube si YouTube no mostró resultados."""
+        if self.buscador_http is not None:
+            resultados = await asyncio.get_running_loop().run_in_executor(
+                None, self.buscador_http.buscar, url, page_idx, max_videos
+            )
+            if resultados is not None:
+                self.busquedas_http += 1
+                self._rachas_bloqueo.pop(page_idx, None)
+                return resultados
 
-            self.contexts.append(context)
-            self.pages.append(page)
+        try:
+            page = await self._pagina(page_idx)
+            self.navegaciones[page_idx] += 1
+            resultados = await self._resultados_navegador(page, url, max_videos)
+            self.busquedas_navegador += 1
+            self._rachas_bloqueo.pop(page_idx, None)
+            return resultados
+        except BloqueoYouTube:
+            raise
+        except Exception:
+            return None
+
+    def _emparejador(self):
+        """EmparejadorTitulos de las keywords actuales (se recompila si se reemplazan)"""
+        actual = self._emparejador_actual
+        if actual is None or actual.keywords is not self.keywords or actual.neg_words is not self.neg_words:
+            actual = self._emparejador_actual = EmparejadorTitulos(self.keywords, self.neg_words)
+        return actual
+
+    def _evaluar_resultados(self, resultados, band, album, tipo):
+        """Clasifica una página de resultados (ver EmparejadorTitulos.evaluar)"""
+        return self._emparejador().evaluar(resultados, band, album, tipo)
+
+    def _banda_presente(self, resultados, band):
+        return self._emparejador().banda_presente(resultados, band)
+
+    async def _resultados_banda(self, clave, band, page_idx, max_videos):
+        """Resultados de la búsqueda por banda; se hace una sola vez aunque
+        varios releases de la banda se procesen a la vez. Si falla (None o
+        bloqueo) no queda en memoria: el próximo release de la banda la reintenta."""
+        futuro = self._busquedas_banda.get(clave)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().create_future()
+            self._busquedas_banda[clave] = futuro
+            try:
+                url = self.planificador.url_banda(band)
+                resultados = await self._buscar(page_idx, url, max_videos)
+                futuro.set_result(resultados)
+                self.busquedas_banda += 1
+                self._guardar_snapshot((_normalizar_texto(band), '', ''), 'banda', url, resultados)
+            finally:
+                if not futuro.done():
+                    futuro.set_result(None)
+                if futuro.result() is None and self._busquedas_banda.get(clave) is futuro:
+                    del self._busquedas_banda[clave]
+        return await futuro
+
+    def _liberar_banda(self, clave, release_id):
+        """Descarta los títulos de la banda cuando ya no quedan releases suyos.
+        Cada release cuenta una sola vez aunque vuelva a la cola tras un bloqueo."""
+        if release_id in self._releases_liberados or clave not in self.bandas_agrupadas:
+            return
+        self._releases_liberados.add(release_id)
+        self.bandas_agrupadas[clave] -= 1
+        if self.bandas_agrupadas[clave] <= 0:
+            del self.bandas_agrupadas[clave]
+            self._busquedas_banda.pop(clave, None)
+
+    async def _decidir_por_banda(self, release_id, clave, band, album, tipo, page_idx, max_videos):
+        """
+        ((es_mainstream, titulo), explorando) si la búsqueda por banda alcanza
+        para decidir: mainstream si un video de la banda con keyword
+        corresponde al álbum, underground si la banda no aparece en ningún
+        resultado. (None, explorando) si hay que buscar el álbum.
+        Una banda ausente es una decisión 'limpia' como la de la primera
+        búsqueda del álbum: pasa por la misma muestra de exploración
+        (PlanificadorBusquedas.saltar_respaldo) y, si sale sorteada,
+        explorando=True y el llamador corre el plan del álbum para medirla.
+        """
+        try:
+            resultados = await self._resultados_banda(clave, band, page_idx, max_videos)
+        finally:
+            self._liberar_banda(clave, release_id)
+        if resultados is None:
+            return None, False
+        estado, titulo = self._evaluar_resultados(resultados, band, album, tipo)
+        if estado != 'mainstream':
+            estado = 'ambigua' if self._banda_presente(resultados, band) else 'limpia'
+        self.planificador.registrar('banda', estado)
+        if estado == 'ambigua':
+            return None, False
+        if estado == 'limpia':
+            saltar, explorando = self.planificador.saltar_respaldo(tipo)
+            if not saltar:
+                return None, explorando
+        self.decididos_por_banda += 1
+        return (estado == 'mainstream', titulo), False
+
+    def _guardar_snapshot(self, clave, consulta, url, resultados, tipo=''):
+        if self.snapshots is None or resultados is None:
+            return
+        try:
+            self.snapshots.guardar(clave, consulta, url, resultados, tipo)
+        except sqlite3.Error:
+            pass  # El snapshot es opcional: nunca frena el filtro
 
-    async def verificar_disponibilidad(self, page, urls, band, album, tipo, max_videos=10):
+    async def verificar_disponibilidad(self, page_idx, consultas, band, album, tipo, max_videos=10,
+                                       clave=None, completo=False):
         """
         Verifica si hay videos con 'full album' en YouTube.
-        Recibe lista de URLs (doble búsqueda). Si la primera detecta mainstream,
-        retorna inmediatamente sin visitar la segunda (fast path).
+        Recibe el plan de PlanificadorBusquedas: [(nombre, url), ...]. Si una
+        búsqueda detecta mainstream, retorna sin hacer las siguientes; si la
+        primera no encontró nada del release ('limpia'), la segunda se salta
+        (ver PlanificadorBusquedas.saltar_respaldo).
+        Con el backend HTTP cada búsqueda se intenta primero sin navegador y
+        solo se renderiza en Chromium si el HTML no se pudo interpretar.
+        Retorna (None, None) si alguna búsqueda del plan no llegó a cargar y
+        ninguna encontró mainstream: el release queda sin veredicto (se
+        reintenta, no se aprueba). BloqueoYouTube se propaga a procesar_release.
+        Con `clave` (CacheVeredictos.clave) cada página se guarda en SnapshotsSERP.
+        Con `completo` corre el plan entero sin saltar nada (exploración de
+        una decisión 'limpia' por banda, que registra el llamador).
         """
-        tipo_norm = str(tipo or '').lower()
-        band_tokens = _tokenizar(band)
-        album_tokens = _tokenizar(album)
-        band_req = 1 if len(band_tokens) <= 2 else 2
-        album_req = 1 if len(album_tokens) <= 2 else 2
-
-        for url in urls:
-            try:
-                await page.goto(url, wait_until='domcontentloaded', timeout=30000)
-
-                try:
-                    await page.wait_for_selector('ytd-video-renderer', timeout=20000)
-                except (asyncio.TimeoutError, Exception):
-                    continue
-
-                resultados = await page.evaluate('''() => {
-                    const items = [];
-                    const elements = Array.from(document.querySelectorAll('ytd-video-renderer')).slice(0, 10);
-                    for (const el of elements) {
-                        const titleEl = el.querySelector('#video-title');
-                        const title = titleEl ? (titleEl.textContent || titleEl.getAttribute('title') || '').trim() : '';
-                        const chEl = el.querySelector('ytd-channel-name #text a');
-                        const channel = chEl ? (chEl.textContent || '').trim() : '';
-                        items.push({title, channel});
-                    }
-                    return items;
-                }''')
-
-                for item in resultados:
-                    titulo = (item.get('title') or '')
-                    canal = (item.get('channel') or '')
-
-                    titulo_norm = _normalizar_texto(titulo)
-                    canal_norm = _normalizar_texto(canal)
-
-                    # Evitar falsos positivos comunes (excepto si el release es Live)
-                    if tipo_norm != "live":
-                        titulo_words = set(titulo_norm.split())
-                        if self.neg_words & titulo_words:
-                            continue
-
-                    band_hits = max(
-                        _contar_coincidencias(band_tokens, titulo_norm),
-                        _contar_coincidencias(band_tokens, canal_norm)
-                    )
-                    album_hits = _contar_coincidencias(album_tokens, titulo_norm)
-
-                    # Si no hay tokens de álbum (títulos muy cortos), solo usar banda + keyword
-                    if album_tokens:
-                        if band_hits < band_req or album_hits < album_req:
-                            continue
-                    else:
-                        if band_hits < band_req:
-                            continue
-
-                    # Solo keywords determinan si es mainstream
-                    has_keyword = any(kw in titulo_norm for kw in self.keywords)
-
-                    if has_keyword:
-                        return True, titulo
+        incompleta = False
+        explorando = False
 
-            except Exception:
+        for n, (consulta, url) in enumerate(consultas):
+            resultados = await self._buscar(page_idx, url, max_videos)
+            if resultados is None:
+                incompleta = True
                 continue
+            if clave is not None:
+                self._guardar_snapshot(clave, consulta, url, resultados, tipo)
+
+            estado, titulo = self._evaluar_resultados(resultados, band, album, tipo)
+            self.planificador.registrar(consulta, estado)
+            if estado == 'mainstream':
+                if explorando:
+                    self.planificador.registrar_exploracion(True, tipo)
+                return True, titulo
+
+            if n == 0 and estado == 'limpia' and not completo:
+                saltar, explorando = self.planificador.saltar_respaldo(tipo)
+                if saltar:
+                    break
+
+        if explorando:
+            self.planificador.registrar_exploracion(False, tipo)
+        return (None if incompleta else False), None
+
+    async def procesar_release(self, release, page_idx=None, max_videos=10):
+        """Procesa un release con una página del pool (o con `page_idx` si el
+        llamador ya la tiene). es_mainstream es None si YouTube bloqueó la
+        búsqueda o no cargó: el contexto queda en backoff y el release sin veredicto."""
+        if page_idx is None:
+            page_idx = await self._paginas_libres.get()
+            try:
+                return await self.procesar_release(release, page_idx, max_videos)
+            finally:
+                await self._devolver_pagina(page_idx)
 
-        return False, None
-
-    async def procesar_release(self, release, page_idx, max_videos=10):
-        """Procesa un release usando una página específica"""
-        async with self.semaphore:
-            page = self.pages[page_idx % self.num_workers]
-            band = release.get('band', 'Unknown')
-            album = release.get('album', 'Unknown')
-            year = release.get('year')
-            tipo = release.get('type', '')
-
-            es_split = " / " in band
-            es_self_titled = _normalizar_texto(band) == _normalizar_texto(album)
+        band = release.get('band', 'Unknown')
+        album = release.get('album', 'Unknown')
+        year = release.get('year')
+        tipo = release.get('type', '')
 
-            # Generar URLs de búsqueda
-            urls = generar_urls_busqueda(band, album, year, es_split=es_split)
+        es_split = " / " in band
+        es_self_titled = _normalizar_texto(band) == _normalizar_texto(album)
 
-            # Self-titled: agregar "self titled" a la primera query
-            if es_self_titled:
-                if year:
-                    q_st = f"{band} {album} self titled {year}"
-                else:
-                    q_st = f"{band} {album} self titled"
-                urls[0] = f"https://www.youtube.com/results?search_query={urllib.parse.quote(q_st)}"
+        try:
+            clave = _clave_banda(release)
+            explorando = False
+            if clave in self.bandas_agrupadas and _agrupable_por_banda(release):
+                # Varias búsquedas de álbum de la misma banda traen los mismos uploads
+                decidido, explorando = await self._decidir_por_banda(
+                    id(release), clave, band, album, tipo, page_idx, max_videos * 2)
+                if decidido is not None:
+                    self._ids_por_banda.add(id(release))
+                    return release, decidido[0], decidido[1]
+
+            consultas = self.planificador.plan(band, album, year, es_split=es_split,
+                                               es_self_titled=es_self_titled, tipo=tipo)
 
             es_mainstream, titulo = await self.verificar_disponibilidad(
-                page, urls, band, album, tipo, max_videos
+                page_idx, consultas, band, album, tipo, max_videos,
+                clave=CacheVeredictos.clave(band, album, year), completo=explorando
             )
-
-            return release, es_mainstream, titulo
+            if explorando and es_mainstream is not None:
+                self.planificador.registrar_exploracion(es_mainstream, tipo)
+        except BloqueoYouTube as e:
+            self._registrar_bloqueo(page_idx, e.tipo)
+            return release, None, None
+
+        return release, es_mainstream, titulo
+
+    def origen_veredicto(self, release):
+        """Origen para CacheVeredictos del último veredicto de procesar_release(release)"""
+        if id(release) in self._ids_por_banda:
+            self._ids_por_banda.discard(id(release))
+            return 'banda'
+        return 'album'
+
+    def resumen_busquedas(self):
+        resumen = f"búsquedas: {self.busquedas_http} por HTTP, {self.busquedas_navegador} en el navegador"
+        if self.busquedas_banda:
+            resumen += (f" ({self.busquedas_banda} por banda, "
+                        f"{self.decididos_por_banda} releases decididos sin buscar el álbum)")
+        resumen += f" — {self.planificador.resumen()}"
+        if self.medidor.busquedas:
+            resumen += f" — {self.medidor.resumen()}"
+            resumen += (f" — {self.reciclajes} contextos reciclados, "
+                        f"pool {self.paginas_activas}/{self.num_workers} páginas")
+        total_bloqueos = sum(self.bloqueos.values())
+        if total_bloqueos or self.reintentos:
+            intentos = self.busquedas_http + self.busquedas_navegador + total_bloqueos
+            detalle = ", ".join(f"{n} {tipo}" for tipo, n in self.bloqueos.items() if n)
+            resumen += (f" — bloqueos de YouTube: {total_bloqueos} "
+                        f"({total_bloqueos / max(1, intentos):.1%} de las búsquedas"
+                        f"{': ' + detalle if detalle else ''}), {self.reintentos} releases reintentados")
+        return resumen
 
     async def cerrar(self):
         """Cierra el navegador"""
+        try:
+            self.planificador.guardar()
+        except OSError:
+            pass
+        if self.snapshots is not None:
+            self.snapshots.cerrar()
+        if self.buscador_http is not None:
+            self.buscador_http.cerrar()
         for context in self.contexts:
-            await context.close()
+            if context is not None:
+                await context.close()
         if self.browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
 
 
+class FiltroYouTubeEnFlujo:
+    """Filtro YouTube con interfaz bloqueante para el pipeline en flujo.
+
+    El navegador vive en un event loop propio (thread dedicado); verificar()
+    se puede llamar desde varios threads a la vez y cada llamada toma una
+    página del pool de YouTubeFilterParallel, así nunca hay dos búsquedas
+    sobre la misma página.
+
+    El repertorio llega de a un release, así que el pre-clasificador no
+    conoce cuántos tiene cada banda: se usa el mayor entre los que ya
+    pasaron por el flujo y los que la banda tiene en el historial. El primer
+    release de una banda nueva puede decidirse antes de ver al resto.
+    """
+
+    def __init__(self, num_workers=5, headless=True, keywords=None, cache=None, backend=YT_BACKEND,
+                 preclasificador=None):
+        self.num_workers = num_workers
+        self.headless = headless
+        self.cache = cache
+        self.preclasificador = preclasificador
+        self._releases_por_banda = {}
+        self._lock = threading.Lock()
+        self.filtro = YouTubeFilterParallel(num_workers=num_workers, backend=backend)
+        self.filtro.keywords = keywords if keywords is not None else cargar_keywords()
+        self.filtro.neg_words = _build_neg_words()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def _ejecutar(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iniciar(self):
+        self._thread.start()
+        self._ejecutar(self.filtro.iniciar(headless=self.headless))
+
+    def verificar(self, release, reintentos=YT_REINTENTOS):
+        """Retorna (es_mainstream, titulo). es_mainstream es None si tras
+        `reintentos` reintentos YouTube siguió bloqueando (o fallando) la
+        búsqueda: el release no tiene veredicto y no debe aprobarse."""
+        if self.cache is not None:
+            veredicto = self.cache.obtener(release)
+            if veredicto is not None:
+                return veredicto
+        decision = None
+        if self.preclasificador is not None:
+            decision = self.preclasificador.decidir(release, self._releases_banda(release))
+        if decision == 'underground':
+            return False, None
+        es_mainstream, titulo = None, None
+        for intento in range(1 + reintentos):
+            if intento:
+                self.filtro.reintentos += 1
+            try:
+                # El contexto bloqueado vuelve al pool tras su backoff: el reintento usa otro
+                _, es_mainstream, titulo = self._ejecutar(self.filtro.procesar_release(release))
+            except Exception:
+                es_mainstream, titulo = None, None
+            if es_mainstream is not None:
+                break
+        if es_mainstream is None:
+            return None, None
+        if self.cache is not None:
+            self.cache.guardar(release.get('band'), release.get('album'), release.get('year'),
+                               es_mainstream, titulo, tipo=release.get('type'),
+                               origen=self.filtro.origen_veredicto(release))
+        if decision == 'auditar':
+            self.preclasificador.registrar_auditoria(es_mainstream)
+        return es_mainstream, titulo
+
+    def _releases_banda(self, release):
+        """Releases conocidos de la banda (ver la nota de la clase)"""
+        clave = _clave_banda(release)
+        with self._lock:
+            vistos = self._releases_por_banda[clave] = self._releases_por_banda.get(clave, 0) + 1
+        return max(vistos, self.preclasificador.releases_en_historial(release))
+
+    def cerrar(self):
+        try:
+            self._ejecutar(self.filtro.cerrar())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
+
+
+class EscritorResultados:
+    """Escribe repertorio_filtrado.json y releases_mainstream.txt a medida que
+    llegan los veredictos (mismo formato que json.dump(indent=2) al cerrar).
+
+    Se puede usar desde varios threads a la vez.
+    """
+
+    def __init__(self, output_file=OUTPUT_FILE, output_rechazados=OUTPUT_RECHAZADOS):
+        self.output_file = output_file
+        self.output_rechazados = output_rechazados
+        self.aprobados = 0
+        self.rechazados = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        self._f_aprobados = open(output_file, 'w', encoding='utf-8')
+        self._f_aprobados.write("[")
+        self._f_rechazados = open(output_rechazados, 'w', encoding='utf-8')
+        self._f_rechazados.write("# Releases excluidos por estar disponibles en YouTube\n")
+        self._f_rechazados.write("# (encontrados con keywords de 'full album')\n\n")
+
+    def agregar(self, release, es_mainstream, razon=None):
+        with self._lock:
+            if es_mainstream:
+                year_str = f"({release.get('year')})" if release.get('year') else ""
+                self._f_rechazados.write(f"{release['band']} - {release['album']} {year_str}\n")
+                self._f_rechazados.write(f"  Razón: {razon or 'N/A'}\n\n")
+                self._f_rechazados.flush()
+                self.rechazados += 1
+            else:
+                item = json.dumps(release, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                self._f_aprobados.write(f"{',' if self.aprobados else ''}\n  {item}")
+                self._f_aprobados.flush()
+                self.aprobados += 1
+
+    def cerrar(self, verbose=True):
+        with self._lock:
+            self._f_aprobados.write("\n]" if self.aprobados else "]")
+            self._f_aprobados.close()
+            self._f_rechazados.close()
+        if verbose:
+            print(f"\n📁 Guardado: {self.output_file} ({self.aprobados} releases)")
+            print(f"📁 Guardado: {self.output_rechazados} ({self.rechazados} excluidos)")
+
+
 async def filtrar_por_youtube(repertorio, keywords, headless=True, verbose=True,
-                               max_videos=10, num_workers=5, batch_size=20):
+                               max_videos=10, num_workers=5, batch_size=20, cache=None,
+                               backend=YT_BACKEND, escritor=None, prefijo='',
+                               agrupar_bandas=YT_AGRUPAR_BANDAS, preclasificador=None,
+                               reintentos=YT_REINTENTOS):
     """
     Filtra releases verificando disponibilidad en YouTube (PARALELO)
 
+    Los releases salen de una cola continua: cada worker toma el siguiente
+    apenas termina el anterior (sin esperar al más lento de un lote) y usa
+    una página del pool de YouTubeFilterParallel. Un release sin veredicto
+    (YouTube bloqueó o no cargó la búsqueda) vuelve al final de la cola hasta
+    `reintentos` veces; si sigue igual no se aprueba ni se rechaza.
+
     Args:
         repertorio: Lista de releases
         keywords: Lista de keywords que indican mainstream
@@ -308,106 +1712,520 @@ async def filtrar_por_youtube(repertorio, keywords, headless=True, verbose=True,
         verbose: Mostrar progreso
         max_videos: Cuántos videos analizar por búsqueda
         num_workers: Número de páginas paralelas
-        batch_size: Tamaño del lote para procesar
+        batch_size: Cada cuántos releases mostrar el progreso
+        cache: CacheVeredictos; los releases con veredicto vigente no abren el navegador
+        backend: 'http' (ytInitialData, navegador solo de respaldo) o 'navegador'
+        escritor: EscritorResultados; cada veredicto se escribe apenas se conoce
+        prefijo: Antepuesto a las líneas de progreso (p. ej. el shard)
+        agrupar_bandas: Una búsqueda por banda para las bandas con varios releases
+        preclasificador: PreclasificadorUnderground; lo que decide con
+                         confianza queda underground sin buscarse
+        reintentos: Veces que un release sin veredicto vuelve a la cola
 
     Returns:
-        tuple: (releases_aprobados, releases_rechazados)
+        tuple: (releases_aprobados, releases_rechazados, releases_sin_veredicto)
     """
     aprobados = []
     rechazados = []
-    if verbose:
+    sin_veredicto = []
+    releases_por_banda = {}
+    for release in repertorio:
+        clave = _clave_banda(release)
+        releases_por_banda[clave] = releases_por_banda.get(clave, 0) + 1
+
+    def registrar(release, es_mainstream, razon):
+        if es_mainstream:
+            rechazados.append({**release, 'razon': razon})
+        else:
+            aprobados.append(release)
+        if escritor is not None:
+            escritor.agregar(release, es_mainstream, razon)
+
+    if cache is not None:
+        pendientes = []
+        for release in repertorio:
+            veredicto = cache.obtener(release)
+            if veredicto is None:
+                pendientes.append(release)
+            else:
+                registrar(release, veredicto[0], (veredicto[1] or 'keyword')[:50])
+        if verbose:
+            print(f"🗄️  {len(repertorio) - len(pendientes)} veredictos desde caché "
+                  f"({len(rechazados)} mainstream), {len(pendientes)} por verificar")
+        repertorio = pendientes
+    elif verbose:
         print("🔄 Sin caché: se verificarán todos los releases del repertorio actual")
 
-    filtro = YouTubeFilterParallel(num_workers=num_workers)
+    auditados = set()
+    if preclasificador is not None and repertorio:
+        pendientes = []
+        for release in repertorio:
+            decision = preclasificador.decidir(release, releases_por_banda[_clave_banda(release)])
+            if decision == 'underground':
+                # No se guarda en la caché: sería historial que se alimenta a sí mismo
+                registrar(release, False, None)
+                continue
+            if decision == 'auditar':
+                auditados.add(id(release))
+            pendientes.append(release)
+        if verbose:
+            print(f"🧮 Pre-clasificador: {len(repertorio) - len(pendientes)} releases underground sin "
+                  f"navegador, {len(auditados)} en auditoría, {len(pendientes)} por verificar")
+        repertorio = pendientes
+
+    if not repertorio:
+        return aprobados, rechazados, sin_veredicto
+
+    filtro = YouTubeFilterParallel(num_workers=num_workers, backend=backend)
     filtro.keywords = keywords
     filtro.neg_words = _build_neg_words()
+    if agrupar_bandas:
+        por_banda = {}
+        for release in repertorio:
+            if not _agrupable_por_banda(release):
+                continue
+            clave = _clave_banda(release)
+            por_banda[clave] = por_banda.get(clave, 0) + 1
+        filtro.bandas_agrupadas = {c: n for c, n in por_banda.items() if n >= 2}
+        if verbose and filtro.bandas_agrupadas:
+            print(f"👥 {len(filtro.bandas_agrupadas)} bandas con varios releases: una búsqueda por banda "
+                  f"({sum(filtro.bandas_agrupadas.values())} releases)")
 
     if verbose:
-        print(f"\n🌐 Iniciando navegador con {num_workers} workers paralelos...")
+        if backend == 'http':
+            print(f"\n🌐 Búsqueda por HTTP con {num_workers} workers paralelos (navegador solo de respaldo)...")
+        else:
+            print(f"\n🌐 Iniciando navegador con {num_workers} workers paralelos...")
 
-    await filtro.iniciar_browser(headless=headless)
+    await filtro.iniciar(headless=headless)
 
     if verbose:
-        print("✓ Navegador listo\n")
+        print("✓ Filtro listo\n")
 
     total = len(repertorio)
     procesados = 0
+    cola = asyncio.Queue()
+    for release in repertorio:
+        cola.put_nowait((release, 0))
+
+    def resolver(release, intento, es_mainstream, titulo):
+        """Registra el veredicto de un release ya buscado, o lo devuelve a la cola"""
+        nonlocal procesados
+        if es_mainstream is None and intento < reintentos:
+            # El contexto que lo buscó quedó en backoff; otro lo toma más tarde
+            filtro.reintentos += 1
+            cola.put_nowait((release, intento + 1))
+            return
+
+        procesados += 1
+        band = release.get('band', 'Unknown')
+        album = release.get('album', 'Unknown')
+        year = release.get('year', '')
+        if es_mainstream is None:
+            sin_veredicto.append(release)
+            veredicto = "⏸ Sin veredicto (búsqueda bloqueada o sin cargar)"
+        else:
+            if cache is not None:
+                cache.guardar(release.get('band'), release.get('album'), release.get('year'),
+                              es_mainstream, titulo, tipo=release.get('type'),
+                              origen=filtro.origen_veredicto(release))
+            if id(release) in auditados:
+                preclasificador.registrar_auditoria(es_mainstream)
+            razon = titulo[:50] if titulo else 'keyword'
+            registrar(release, es_mainstream, razon)
+            veredicto = "❌ Mainstream" if es_mainstream else "✓ Underground"
 
-    # Procesar en lotes
-    for batch_start in range(0, total, batch_size):
-        batch = repertorio[batch_start:batch_start + batch_size]
-
-        # Crear tareas para el lote
-        tasks = []
-        for idx, release in enumerate(batch):
-            task = filtro.procesar_release(release, batch_start + idx, max_videos)
-            tasks.append(task)
-
-        # Ejecutar lote en paralelo
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Procesar resultados
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                release = batch[i]
-                aprobados.append(release)  # Asumir underground en error
-                procesados += 1
-                continue
-
-            release, es_mainstream, titulo = result
-            procesados += 1
+        if verbose:
+            year_str = f"({year})" if year else ""
+            print(f"{prefijo}[{procesados}/{total}] {band} - {album} {year_str} {veredicto}")
 
-            band = release.get('band', 'Unknown')
-            album = release.get('album', 'Unknown')
-            year = release.get('year', '')
-            razon = titulo[:50] if titulo else 'keyword'
+            if procesados % batch_size == 0 or procesados == total:
+                pct = (procesados / total) * 100
+                print(f"\n{prefijo}📊 Progreso: {procesados}/{total} ({pct:.1f}%) - Underground: {len(aprobados)}, "
+                      f"Mainstream: {len(rechazados)}, Sin veredicto: {len(sin_veredicto)}\n")
 
-            if es_mainstream:
-                rechazados.append({**release, 'razon': razon})
-                if verbose:
-                    year_str = f"({year})" if year else ""
-                    print(f"[{procesados}/{total}] {band} - {album} {year_str} ❌ Mainstream")
-            else:
-                aprobados.append(release)
+    async def worker():
+        while True:
+            release, intento = await cola.get()
+            try:
+                try:
+                    _, es_mainstream, titulo = await filtro.procesar_release(release, max_videos=max_videos)
+                except Exception:
+                    es_mainstream, titulo = None, None  # Sin veredicto: nunca se aprueba por error
+                resolver(release, intento, es_mainstream, titulo)
+            except Exception as e:
+                # Un release que no se pudo registrar no debe frenar la cola
+                sin_veredicto.append(release)
                 if verbose:
-                    year_str = f"({year})" if year else ""
-                    print(f"[{procesados}/{total}] {band} - {album} {year_str} ✓ Underground")
+                    print(f"{prefijo}⚠️  {release.get('band')} - {release.get('album')}: {e}")
+            finally:
+                cola.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(num_workers)]
+    try:
+        # join y no gather: los reintentos vuelven a la cola mientras los workers corren
+        await cola.join()
+    finally:
+        for tarea in workers:
+            tarea.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await filtro.cerrar()
 
-        # Mostrar progreso del lote
-        if verbose:
-            pct = (procesados / total) * 100
-            print(f"\n📊 Progreso: {procesados}/{total} ({pct:.1f}%) - Underground: {len(aprobados)}, Mainstream: {len(rechazados)}\n")
+    if verbose:
+        print(f"{prefijo}🔎 {filtro.resumen_busquedas()}")
+        if preclasificador is not None:
+            print(f"{prefijo}🧮 {preclasificador.resumen()}")
+        if sin_veredicto:
+            print(f"{prefijo}⏸  {len(sin_veredicto)} releases sin veredicto tras {reintentos} reintentos: "
+                  f"no se aprueban, quedan para la próxima corrida")
+
+    return aprobados, rechazados, sin_veredicto
+
+
+class _VeredictosShard:
+    """Hace de `escritor` dentro de un proceso del filtro: junta (posición,
+    es_mainstream, razón) para que el padre los ubique en el repertorio"""
+
+    def __init__(self, releases):
+        self._posicion = {id(r): i for i, r in enumerate(releases)}
+        self.veredictos = []
+
+    def agregar(self, release, es_mainstream, razon=None):
+        self.veredictos.append((self._posicion[id(release)], bool(es_mainstream), razon))
+
+
+def _shard_de(release, procesos):
+    """Shard estable por banda: la misma banda cae siempre en el mismo proceso"""
+    clave = _normalizar_texto(release.get('band', ''))
+    return zlib.crc32(clave.encode('utf-8')) % procesos
+
+
+def _filtrar_shard(shard, releases, keywords, headless, verbose, max_videos,
+                   num_workers, usar_cache, backend, usar_preclasificador=False):
+    """Punto de entrada de cada proceso: su propio navegador, event loop y conexión a la caché"""
+    cache = CacheVeredictos() if usar_cache else None
+    preclasificador = PreclasificadorUnderground.desde_historial() if usar_preclasificador else None
+    recolector = _VeredictosShard(releases)
+    try:
+        asyncio.run(filtrar_por_youtube(
+            releases, keywords, headless=headless, verbose=verbose, max_videos=max_videos,
+            num_workers=num_workers, cache=cache, backend=backend,
+            escritor=recolector, prefijo=f"[S{shard}] ", preclasificador=preclasificador
+        ))
+    finally:
+        if cache is not None:
+            cache.cerrar()
+    return recolector.veredictos
+
+
+def filtrar_en_procesos(repertorio, keywords, procesos, headless=True, verbose=True,
+                        max_videos=10, num_workers=5, cache=None, backend=YT_BACKEND,
+                        usar_preclasificador=False):
+    """
+    Filtra el repertorio repartido en `procesos` procesos (shards por banda),
+    cada uno con su navegador y event loop; comparten la caché de veredictos.
 
-    await filtro.cerrar()
+    El resultado se arma en el orden del repertorio de entrada, así que no
+    depende de qué proceso termine primero.
 
-    return aprobados, rechazados
+    Args:
+        num_workers: Páginas paralelas en total (se reparten entre los procesos;
+                     nunca hay más procesos que páginas)
+        usar_preclasificador: Cada proceso aplica PreclasificadorUnderground a su shard
+
+    Returns:
+        tuple: (releases_aprobados, releases_rechazados, releases_sin_veredicto)
+    """
+    procesos = max(1, min(procesos, num_workers))
+    veredictos = [None] * len(repertorio)
+    shards = [[] for _ in range(procesos)]
+    for i, release in enumerate(repertorio):
+        veredicto = cache.obtener(release) if cache is not None else None
+        if veredicto is not None:
+            veredictos[i] = (veredicto[0], (veredicto[1] or 'keyword')[:50])
+        else:
+            shards[_shard_de(release, procesos)].append(i)
+
+    shards = [(n, indices) for n, indices in enumerate(shards) if indices]
+    if verbose:
+        if cache is not None:
+            print(f"🗄️  {len(repertorio) - sum(len(i) for _, i in shards)} veredictos desde caché")
+        print(f"🧩 {len(shards)} procesos: " + ", ".join(f"S{n}={len(i)}" for n, i in shards))
+
+    if shards:
+        # Reparto exacto: el resto va a los primeros shards, uno más a cada uno
+        base, resto = divmod(num_workers, len(shards))
+        workers_shard = {n: base + (1 if k < resto else 0) for k, (n, _) in enumerate(shards)}
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=contexto) as executor:
+            futuros = {
+                executor.submit(
+                    _filtrar_shard, n, [repertorio[i] for i in indices], keywords, headless,
+                    verbose, max_videos, workers_shard[n], cache is not None, backend,
+                    usar_preclasificador
+                ): (n, indices)
+                for n, indices in shards
+            }
+            for futuro in as_completed(futuros):
+                n, indices = futuros[futuro]
+                try:
+                    resultados = futuro.result()
+                except Exception as e:
+                    # Igual que una búsqueda bloqueada: sin veredicto (no se aprueban)
+                    print(f"⚠️  Proceso S{n} falló ({e}); sus {len(indices)} releases quedan sin veredicto")
+                    resultados = []
+                else:
+                    if verbose:
+                        print(f"✓ Proceso S{n} terminó ({len(indices)} releases)")
+                for pos, es_mainstream, razon in resultados:
+                    veredictos[indices[pos]] = (es_mainstream, razon)
+
+    aprobados = []
+    rechazados = []
+    sin_veredicto = []
+    for release, veredicto in zip(repertorio, veredictos):
+        if veredicto is None:
+            # El shard no lo registró: quedó sin veredicto tras sus reintentos
+            sin_veredicto.append(release)
+            continue
+        es_mainstream, razon = veredicto
+        if es_mainstream:
+            rechazados.append({**release, 'razon': razon or 'keyword'})
+        else:
+            aprobados.append(release)
+    return aprobados, rechazados, sin_veredicto
 
 
 def guardar_resultados(aprobados, rechazados, output_file=OUTPUT_FILE,
                        output_rechazados=OUTPUT_RECHAZADOS, verbose=True):
     """Guarda los resultados"""
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-    # Guardar aprobados (underground)
+    escritor = EscritorResultados(output_file, output_rechazados)
+    for r in aprobados:
+        escritor.agregar(r, False)
+    for r in rechazados:
+        escritor.agregar(r, True, r.get('razon'))
+    escritor.cerrar(verbose)
+
+
+def guardar_sin_veredicto(releases, output_file=YOUTUBE_REINTENTOS_FILE, verbose=True):
+    """Guarda los releases que quedaron sin veredicto por bloqueos de YouTube
+    (se vuelven a filtrar con run(input_file=...)); sin ninguno, borra el archivo"""
+    if not releases:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        return
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(aprobados, f, indent=2, ensure_ascii=False)
+        json.dump(releases, f, indent=2, ensure_ascii=False)
+    if verbose:
+        print(f"📁 Guardado: {output_file} ({len(releases)} releases sin veredicto, para reintentar)")
+
+
+async def medir_bloqueo_recursos(releases, headless=True, max_videos=10):
+    """
+    Mide lo que ahorra el bloqueo de recursos: hace las mismas búsquedas en
+    Chromium sin y con bloqueo (perfil liviano) y compara bytes, tiempo por
+    búsqueda y memoria de los procesos del navegador.
+
+    Si YouTube bloquea una búsqueda la medición se corta ahí: se devuelven las
+    pasadas que llegaron a medir algo (la interrumpida con sus búsquedas hechas).
+
+    Returns:
+        dict: {'sin_bloqueo': {...}, 'con_bloqueo': {...}} (las pasadas medidas)
+    """
+    planificador = PlanificadorBusquedas()
+    urls = []
+    for release in releases:
+        band = release.get('band', 'Unknown')
+        plan = planificador.plan(band, release.get('album', 'Unknown'), release.get('year'),
+                                 es_split=" / " in band, tipo=release.get('type', ''))
+        urls.extend(url for _, url in plan)
+
+    mediciones = {}
+    for nombre, bloquear in (('sin_bloqueo', False), ('con_bloqueo', True)):
+        filtro = YouTubeFilterParallel(num_workers=1, backend='navegador', bloquear_recursos=bloquear)
+        await filtro.iniciar(headless=headless)
+        page = filtro.pages[0]
+        medidor = MedidorNavegador()
+        rss_max = 0.0
+        bloqueo = None
+        try:
+            # Una búsqueda de calentamiento que no cuenta (arranque del renderer)
+            await filtro._resultados_navegador(page, urls[0], max_videos)
+            # Un solo listener por página: el de la pasada reemplaza al de _crear_pagina
+            page.remove_listener('requestfinished', filtro.medidor.al_terminar_request)
+            filtro.medidor = medidor
+            page.on('requestfinished', medidor.al_terminar_request)
+            for url in urls:
+                await filtro._resultados_navegador(page, url, max_videos)
+                rss_max = max(rss_max, _rss_navegador_mb(filtro.gobernador.raices) or 0.0)
+        except BloqueoYouTube as e:
+            bloqueo = e.tipo
+        finally:
+            if filtro.medidor is medidor:
+                page.remove_listener('requestfinished', medidor.al_terminar_request)
+            await filtro.cerrar()
+        if medidor.busquedas:
+            kb, ms, requests_, bloqueados = medidor.por_busqueda()
+            mediciones[nombre] = {'kb': kb, 'ms': ms, 'requests': requests_,
+                                  'bloqueados': bloqueados, 'rss_mb': rss_max,
+                                  'busquedas': medidor.busquedas}
+        if bloqueo is not None:
+            print(f"⚠️  YouTube bloqueó la medición ({bloqueo}) en la pasada {nombre.replace('_', ' ')} "
+                  f"tras {medidor.busquedas} de {len(urls)} búsquedas: resultado parcial")
+            break
+    return mediciones
+
+
+def mostrar_medicion(mediciones):
+    filas = [(nombre, mediciones[clave]) for clave, nombre in
+             (('sin_bloqueo', 'Sin bloqueo'), ('con_bloqueo', 'Con bloqueo')) if clave in mediciones]
+    if not filas:
+        print("⚠️  Sin mediciones: ninguna pasada llegó a completar una búsqueda")
+        return
+    print(f"{'':14}{'KB/búsqueda':>12}{'ms/búsqueda':>13}{'requests':>10}{'RSS MB':>9}{'búsquedas':>11}")
+    for nombre, m in filas:
+        print(f"{nombre:14}{m['kb']:>12.0f}{m['ms']:>13.0f}{m['requests']:>10.0f}{m['rss_mb']:>9.0f}"
+              f"{m['busquedas']:>11}")
+    if len(filas) < 2:
+        return
+    sin, con = mediciones['sin_bloqueo'], mediciones['con_bloqueo']
+    print(f"\nAhorro por búsqueda: {sin['kb'] - con['kb']:.0f} KB, {sin['ms'] - con['ms']:.0f} ms "
+          f"({con['bloqueados']:.0f} requests bloqueados)")
+    if sin['rss_mb'] and con['rss_mb']:
+        print(f"Memoria del navegador: {sin['rss_mb']:.0f} MB → {con['rss_mb']:.0f} MB por worker")
+
+
+def reclasificar(keywords=None, neg_words=None, aplicar=False, verbose=True,
+                 snapshots_path=YOUTUBE_SERP_FILE, cache_path=YOUTUBE_VEREDICTOS_FILE,
+                 reporte=RECLASIFICACION_FILE):
+    """
+    Vuelve a clasificar todos los releases con las páginas guardadas en
+    SnapshotsSERP (sin red) usando las keywords y palabras negativas actuales,
+    y compara contra los veredictos de CacheVeredictos.
+
+    Un release es mainstream si alguna de sus páginas (o la de su banda) lo es.
+    Solo se evalúan las páginas que se llegaron a buscar: si el plan se saltó
+    la segunda búsqueda, esa página no existe. Solo se reclasifican los
+    veredictos cuya evidencia original está guardada: los de origen 'banda'
+    necesitan la página de su banda, el resto (búsquedas del álbum, importados
+    o de origen desconocido) páginas propias. Juzgar un release buscado por
+    álbum solo con la página de la banda sería un veredicto nuevo, no una
+    reclasificación.
+
+    Args:
+        aplicar: Guardar en la caché los veredictos que cambian
 
-    # Guardar rechazados (mainstream) para referencia
-    with open(output_rechazados, 'w', encoding='utf-8') as f:
-        f.write("# Releases excluidos por estar disponibles en YouTube\n")
-        f.write("# (encontrados con keywords de 'full album')\n\n")
-        for r in rechazados:
-            year_str = f"({r.get('year')})" if r.get('year') else ""
-            f.write(f"{r['band']} - {r['album']} {year_str}\n")
-            f.write(f"  Razón: {r.get('razon', 'N/A')}\n\n")
+    Returns:
+        list: [(clave, anterior, nuevo, titulo)] de los veredictos que cambian
+    """
+    emparejador = EmparejadorTitulos(
+        keywords if keywords is not None else cargar_keywords(),
+        neg_words if neg_words is not None else _build_neg_words()
+    )
+    snapshots = SnapshotsSERP(snapshots_path)
+    cache = CacheVeredictos(cache_path)
+    try:
+        inicio_carga = time.perf_counter()
+        por_release, por_banda, tipos = snapshots.cargar()
+        anteriores = cache.todos()
+        carga = time.perf_counter() - inicio_carga
+
+        def usa_pagina_banda(clave):
+            # Como en el filtro: la página de la banda solo juzga tipos de duración de álbum
+            anterior = anteriores.get(clave)
+            if anterior is not None and anterior[3] == 'banda':
+                return True
+            tipo = tipos.get(clave) or (anterior[2] if anterior is not None else '')
+            return (tipo or '').strip().lower() in PlanificadorBusquedas.TIPOS_DURACION_ALBUM
+
+        # Releases con páginas propias, y los decididos solo con la búsqueda por banda
+        claves = set(por_release) | {c for c, v in anteriores.items()
+                                     if v[3] == 'banda' and c[0] in por_banda}
+        sin_evidencia = sum(1 for c in anteriores
+                            if c not in claves and c[0] in por_banda and usa_pagina_banda(c))
+
+        cambios = []
+        titulos = 0
+        clasificacion = 0.0
+        for clave in sorted(claves):
+            band, album, _ = clave
+            paginas = por_release.get(clave, [])
+            if usa_pagina_banda(clave):
+                paginas = paginas + por_banda.get(band, [])
+            inicio = time.perf_counter()
+            nuevo, titulo = False, None
+            for resultados in paginas:
+                titulos += len(resultados)
+                estado, titulo_hit = emparejador.evaluar(resultados, band, album, tipos.get(clave, ''))
+                if estado == 'mainstream':
+                    nuevo, titulo = True, titulo_hit
+                    break
+            clasificacion += time.perf_counter() - inicio
+
+            anterior = anteriores.get(clave)
+            if anterior is not None and anterior[0] != nuevo:
+                cambios.append((clave, anterior[0], nuevo, titulo))
+                if aplicar:
+                    cache.guardar(band, album, clave[2], nuevo, titulo, tipo=anterior[2] or tipos.get(clave),
+                                  origen=anterior[3])
+    finally:
+        cache.cerrar()
+        snapshots.cerrar()
+
+    os.makedirs(os.path.dirname(reporte) or '.', exist_ok=True)
+    with open(reporte, 'w', encoding='utf-8') as f:
+        f.write("# Veredictos que cambian al reclasificar con las keywords actuales\n\n")
+        for (band, album, year), anterior, nuevo, titulo in cambios:
+            de = "mainstream" if anterior else "underground"
+            a = "mainstream" if nuevo else "underground"
+            year_str = f"({year})" if year else ""
+            f.write(f"{band} - {album} {year_str}: {de} → {a}\n")
+            if titulo:
+                f.write(f"  Título: {titulo}\n")
 
     if verbose:
-        print(f"\n📁 Guardado: {output_file} ({len(aprobados)} releases)")
-        print(f"📁 Guardado: {output_rechazados} ({len(rechazados)} excluidos)")
+        a_mainstream = sum(1 for c in cambios if c[2])
+        print(f"🗂️  {len(claves)} releases reclasificados con {len(por_release)} páginas propias "
+              f"y {len(por_banda)} de banda (carga {carga:.1f}s)")
+        if sin_evidencia:
+            print(f"⏭️  {sin_evidencia} veredictos sin reclasificar: su banda tiene página guardada "
+                  f"pero se decidieron con búsquedas del álbum que no están en los snapshots")
+        velocidad = titulos / clasificacion if clasificacion else 0
+        print(f"⚡ Clasificador: {titulos} títulos en {clasificacion:.2f}s ({velocidad:,.0f} títulos/s)")
+        print(f"🔁 Cambiarían {len(cambios)} veredictos: {a_mainstream} → mainstream, "
+              f"{len(cambios) - a_mainstream} → underground")
+        for (band, album, year), _, nuevo, _ in cambios[:20]:
+            year_str = f" ({year})" if year else ""
+            print(f"   {'❌' if nuevo else '✓'} {band} - {album}{year_str}")
+        print(f"📁 Detalle: {reporte}" + (" — cambios aplicados a la caché" if aplicar and cambios else ""))
+
+    return cambios
+
+
+def _mostrar_estadisticas(repertorio, aprobados, rechazados, cache, verbose, sin_veredicto=()):
+    if verbose:
+        print("\n" + "=" * 60)
+        print("📊 RESULTADO")
+        print("=" * 60)
+        print(f"Total verificados: {len(repertorio)}")
+        print(f"Underground (aprobados): {len(aprobados)}")
+        print(f"Mainstream (excluidos): {len(rechazados)}")
+        if sin_veredicto:
+            print(f"Sin veredicto (bloqueos de YouTube, ni aprobados ni excluidos): {len(sin_veredicto)}")
+
+        if repertorio:
+            pct = (len(aprobados) / len(repertorio)) * 100
+            print(f"Tasa de aprobación: {pct:.1f}%")
+        if cache is not None:
+            print(f"🗄️  {cache.resumen()}")
+
+    return OUTPUT_FILE
 
 
 def run(headless=True, verbose=True, max_videos=10, num_workers=None,
-        input_file=None):
+        input_file=None, solo_con_links=False, usar_cache=YT_CACHE_HABILITADO, backend=YT_BACKEND,
+        procesos=YT_PROCESOS, usar_preclasificador=YT_PRECLASIFICADOR_HABILITADO):
     """
     Ejecuta el filtrado por YouTube (PARALELO)
 
@@ -417,6 +2235,15 @@ def run(headless=True, verbose=True, max_videos=10, num_workers=None,
         max_videos: Cuántos videos analizar por búsqueda
         num_workers: Número de páginas paralelas
         input_file: Archivo de entrada (default: INPUT_FILE)
+        solo_con_links: La entrada ya trae download_links (links antes de
+                        YouTube): los releases sin ningún link vivo se
+                        descartan sin abrir el navegador
+        usar_cache: Reutilizar veredictos vigentes de CacheVeredictos
+        backend: 'http' o 'navegador' (ver BuscadorHTTP)
+        usar_preclasificador: Decidir sin navegador los releases casi seguro
+                              underground (PreclasificadorUnderground)
+        procesos: Procesos con navegador propio entre los que se reparte el
+                  repertorio (1 = un solo proceso, 0 = uno por core)
     """
     if verbose:
         print("=" * 60)
@@ -430,6 +2257,8 @@ def run(headless=True, verbose=True, max_videos=10, num_workers=None,
             num_workers = detectar_workers_optimos()
         except ImportError:
             num_workers = min((os.cpu_count() or 4) - 1, 6)
+    if procesos <= 0:
+        procesos = max(1, min(os.cpu_count() or 1, num_workers))
 
     # Cargar keywords
     keywords = cargar_keywords()
@@ -438,39 +2267,104 @@ def run(headless=True, verbose=True, max_videos=10, num_workers=None,
 
     # Cargar repertorio
     repertorio = cargar_repertorio(input_file or INPUT_FILE)
+    if solo_con_links:
+        from modules.descargar_y_organizar import tiene_links_vivos
+
+        total_entrada = len(repertorio)
+        repertorio = [r for r in repertorio if tiene_links_vivos(r)]
+        if verbose:
+            print(f"✓ {total_entrada - len(repertorio)} releases sin links vivos (no se buscan en YouTube)")
     if verbose:
         print(f"✓ {len(repertorio)} releases, {num_workers} workers")
 
-    # Filtrar
-    aprobados, rechazados = asyncio.run(
-        filtrar_por_youtube(
-            repertorio,
-            keywords,
-            headless=headless,
-            verbose=verbose,
-            max_videos=max_videos,
-            num_workers=num_workers
-        )
-    )
-
-    # Guardar
-    guardar_resultados(aprobados, rechazados, verbose=verbose)
+    cache = CacheVeredictos() if usar_cache else None
 
-    # Estadísticas
-    if verbose:
-        print("\n" + "=" * 60)
-        print("📊 RESULTADO")
-        print("=" * 60)
-        print(f"Total verificados: {len(repertorio)}")
-        print(f"Underground (aprobados): {len(aprobados)}")
-        print(f"Mainstream (excluidos): {len(rechazados)}")
+    if procesos > 1:
+        try:
+            aprobados, rechazados, sin_veredicto = filtrar_en_procesos(
+                repertorio, keywords, procesos, headless=headless, verbose=verbose,
+                max_videos=max_videos, num_workers=num_workers, cache=cache, backend=backend,
+                usar_preclasificador=usar_preclasificador
+            )
+        finally:
+            if cache is not None:
+                cache.cerrar()
+        guardar_resultados(aprobados, rechazados, verbose=verbose)
+        guardar_sin_veredicto(sin_veredicto, verbose=verbose)
+        return _mostrar_estadisticas(repertorio, aprobados, rechazados, cache, verbose, sin_veredicto)
+
+    # Antes que el escritor: EscritorResultados vacía releases_mainstream.txt,
+    # que es parte del historial del pre-clasificador
+    preclasificador = PreclasificadorUnderground.desde_historial() if usar_preclasificador else None
+    # Los resultados se escriben a medida que se verifican: si el proceso se
+    # corta, lo ya verificado queda en disco (y en la caché de veredictos)
+    escritor = EscritorResultados()
 
-        if repertorio:
-            pct = (len(aprobados) / len(repertorio)) * 100
-            print(f"Tasa de aprobación: {pct:.1f}%")
+    # Filtrar
+    try:
+        aprobados, rechazados, sin_veredicto = asyncio.run(
+            filtrar_por_youtube(
+                repertorio,
+                keywords,
+                headless=headless,
+                verbose=verbose,
+                max_videos=max_videos,
+                num_workers=num_workers,
+                cache=cache,
+                backend=backend,
+                escritor=escritor,
+                preclasificador=preclasificador
+            )
+        )
+    finally:
+        escritor.cerrar(verbose)
+        if cache is not None:
+            cache.cerrar()
 
-    return OUTPUT_FILE
+    guardar_sin_veredicto(sin_veredicto, verbose=verbose)
+    return _mostrar_estadisticas(repertorio, aprobados, rechazados, cache, verbose, sin_veredicto)
 
 
 if __name__ == "__main__":
-    run(headless=False, max_videos=10)
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Filtra el repertorio por disponibilidad en YouTube')
+    parser.add_argument('comando', nargs='?', default='filtrar',
+                        choices=['filtrar', 'importar-mainstream', 'medir-recursos', 'reclasificar'],
+                        help='filtrar (default); importar-mainstream: sembrar la caché de veredictos '
+                             'con un releases_mainstream.txt; medir-recursos: comparar bytes, tiempo y '
+                             'RAM por búsqueda con y sin bloqueo de recursos; reclasificar: volver a '
+                             'clasificar las páginas guardadas con las keywords actuales (sin red)')
+    parser.add_argument('archivo', nargs='?', default=None,
+                        help='releases_mainstream.txt a importar, o repertorio para medir-recursos')
+    parser.add_argument('--procesos', type=int, default=YT_PROCESOS,
+                        help='Procesos con navegador propio (shards por banda); 0 = uno por core')
+    parser.add_argument('--preclasificador', action='store_true', default=YT_PRECLASIFICADOR_HABILITADO,
+                        help='Decidir sin navegador los releases casi seguro underground '
+                             '(por defecto YT_PRECLASIFICADOR del entorno)')
+    parser.add_argument('--sin-preclasificador', action='store_true',
+                        help='Buscar todos los releases, sin decidir ninguno por estadística')
+    parser.add_argument('--aplicar', action='store_true',
+                        help='reclasificar: guardar en la caché los veredictos que cambian')
+    parser.add_argument('--muestra', type=int, default=5,
+                        help='Releases del repertorio a usar en medir-recursos')
+    parser.add_argument('--sin-cache', action='store_true',
+                        help='Verificar todo en el navegador sin usar la caché de veredictos')
+    parser.add_argument('--backend', choices=['http', 'navegador'], default=YT_BACKEND,
+                        help='http: leer ytInitialData (navegador solo de respaldo); navegador: siempre Chromium')
+
+    args = parser.parse_args()
+
+    if args.comando == 'importar-mainstream':
+        cache = CacheVeredictos()
+        importados = cache.importar_mainstream(args.archivo or OUTPUT_RECHAZADOS)
+        cache.cerrar()
+        print(f"✓ {importados} releases mainstream importados a {YOUTUBE_VEREDICTOS_FILE}")
+    elif args.comando == 'reclasificar':
+        reclasificar(aplicar=args.aplicar)
+    elif args.comando == 'medir-recursos':
+        muestra = cargar_repertorio(args.archivo or INPUT_FILE)[:args.muestra]
+        mostrar_medicion(asyncio.run(medir_bloqueo_recursos(muestra)))
+    else:
+        run(headless=False, max_videos=10, usar_cache=not args.sin_cache, backend=args.backend,
+            procesos=args.procesos, usar_preclasificador=args.preclasificador and not args.sin_preclasificador)
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Pipeline en flujo: extracción → filtro YouTube → links → descarga solapados
+
+Cada release pasa a la siguiente etapa apenas está listo, en vez de esperar a
+que el módulo anterior termine con todo el repertorio. Las etapas se conectan
+con colas acotadas: si una etapa se atrasa, la anterior se bloquea al
+entregarle trabajo (backpressure) y la memoria queda acotada.
+
+Al terminar se escriben los mismos artefactos JSON/TXT que el pipeline
+secuencial (repertorio.json, repertorio_filtrado.json, releases_mainstream.txt,
+repertorio_con_links.json, links_descarga.txt, ...).
+
+Uso:
+    python -m modules.pipeline_flujo --tipos 1,2
+"""
+
+import os
+import json
+import queue
+import threading
+import time
+
+from modules.utils import (
+    REPERTORIO_FILE, LINKS_ANTES_DE_YOUTUBE, cargar_env, crear_sesion_autenticada, delay_con_jitter,
+    detectar_workers_optimos, detectar_workers_api,
+)
+from modules.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Capacidad de cada cola entre etapas (releases en espera)
+CAPACIDAD_COLA = int(os.getenv('FLUJO_CAPACIDAD_COLA', '50'))
+
+# Concurrencia por etapa (None = autodetectar como en el pipeline secuencial)
+WORKERS_YOUTUBE = None
+WORKERS_LINKS = None
+WORKERS_DESCARGA = 4
+
+# Marca de fin de la entrada de una etapa
+_FIN = object()
+
+# Cada cuánto un worker o productor bloqueado en una cola revisa si la etapa se canceló
+ESPERA_COLA = 0.5
+
+print_lock = threading.Lock()
+
+
+class Etapa:
+    """Etapa del pipeline: `workers` threads que toman items de una cola acotada.
+
+    procesar(item) retorna el item para la etapa siguiente o None si no
+    sigue. Cuando el último worker termina, cierra la entrada de la
+    siguiente etapa. Las esperas en la cola son con timeout: una etapa
+    cancelada despierta a sus workers y a quien esté bloqueado entregándole
+    trabajo (el item se descarta).
+    """
+
+    def __init__(self, nombre, procesar, workers=1, capacidad=CAPACIDAD_COLA):
+        self.nombre = nombre
+        self.procesar = procesar
+        self.workers = max(1, workers)
+        self.entrada = queue.Queue(maxsize=capacidad)
+        self.siguiente = None
+        self._lock = threading.Lock()
+        self._activos = self.workers
+        self._threads = []
+        self.cancelada = False
+        self.recibidos = 0
+        self.procesados = 0
+        self.errores = 0
+        self.tiempo_ocupado = 0.0
+        self.tiempo_bloqueado = 0.0  # esperando lugar en la cola de la etapa siguiente
+
+    def _poner(self, item):
+        """put() que se rinde si la etapa se cancela. True si el item quedó en la cola."""
+        while not self.cancelada:
+            try:
+                self.entrada.put(item, timeout=ESPERA_COLA)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def recibir(self, item):
+        """Encola un item; bloquea mientras la cola está llena. Retorna los segundos bloqueado."""
+        inicio = time.monotonic()
+        if self._poner(item):
+            with self._lock:
+                self.recibidos += 1
+        return time.monotonic() - inicio
+
+    def cerrar_entrada(self):
+        for _ in range(self.workers):
+            self._poner(_FIN)
+
+    def iniciar(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"{self.nombre}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def esperar(self):
+        for t in self._threads:
+            t.join()
+
+    def _worker(self):
+        while not self.cancelada:
+            try:
+                item = self.entrada.get(timeout=ESPERA_COLA)
+            except queue.Empty:
+                continue
+            if item is _FIN or self.cancelada:
+                break
+            inicio = time.monotonic()
+            try:
+                salida = self.procesar(item)
+            except Exception as e:
+                salida = None
+                with self._lock:
+                    self.errores += 1
+                logger.error(f"Error en etapa {self.nombre}: {e}")
+            ocupado = time.monotonic() - inicio
+            bloqueado = 0.0
+            if salida is not None and self.siguiente is not None:
+                bloqueado = self.siguiente.recibir(salida)
+            with self._lock:
+                self.procesados += 1
+                self.tiempo_ocupado += ocupado
+                self.tiempo_bloqueado += bloqueado
+
+        with self._lock:
+            self._activos -= 1
+            ultimo = self._activos == 0
+        if ultimo and self.siguiente is not None:
+            self.siguiente.cerrar_entrada()
+
+    def resumen(self):
+        return (f"{self.nombre}: {self.procesados}/{self.recibidos} procesados, {self.workers} workers, "
+                f"{self.tiempo_ocupado:.0f}s ocupado, {self.tiempo_bloqueado:.0f}s en backpressure"
+                + (f", {self.errores} errores" if self.errores else ""))
+
+
+class PipelineFlujo:
+    """Encadena etapas y las alimenta desde una fuente.
+
+    `fuente(emitir)` corre en el thread que llama a ejecutar() y entrega
+    releases con emitir(release); cuando retorna, la entrada de la primera
+    etapa se cierra y el cierre se propaga por la cadena. Si la fuente falla
+    (o Ctrl+C) las etapas se cancelan sin vaciar sus colas y ejecutar() no
+    retorna hasta que sus threads terminan el item que tenían en curso: el
+    llamador puede cerrar los recursos compartidos sin que nadie los use.
+    """
+
+    def __init__(self, etapas):
+        self.etapas = etapas
+        for anterior, siguiente in zip(etapas, etapas[1:]):
+            anterior.siguiente = siguiente
+        self.emitidos = 0
+        self.tiempo_bloqueado = 0.0
+        self._lock = threading.Lock()
+
+    def emitir(self, release):
+        bloqueado = self.etapas[0].recibir(release)
+        with self._lock:
+            self.emitidos += 1
+            self.tiempo_bloqueado += bloqueado
+
+    def ejecutar(self, fuente):
+        for etapa in self.etapas:
+            etapa.iniciar()
+        try:
+            fuente(self.emitir)
+        except BaseException:
+            self.detener()
+            raise
+        self.etapas[0].cerrar_entrada()
+        for etapa in self.etapas:
+            etapa.esperar()
+
+    def detener(self):
+        """Cancela las etapas que sigan corriendo y espera a sus threads"""
+        vivas = [etapa for etapa in self.etapas if any(t.is_alive() for t in etapa._threads)]
+        if not vivas:
+            return
+        for etapa in self.etapas:
+            etapa.cancelada = True
+        with print_lock:
+            print("\n⏹️  Pipeline cancelado: esperando que cada etapa termine el release en curso...")
+        for etapa in vivas:
+            etapa.esperar()
+
+
+def _solo_mega(release):
+    """True si todos los links del release son de Mega (van a la etapa secuencial)"""
+    from modules.descargar_y_organizar import detectar_tipo_link
+
+    urls = [l.get('url', '') for l in release.get('download_links', []) if l.get('url')]
+    return bool(urls) and all(detectar_tipo_link(u) == 'mega' for u in urls)
+
+
+def _verificar_destino(destino_base):
+    """Igual que descargar_y_organizar.run: ofrece crear el destino si no existe"""
+    if os.path.exists(destino_base):
+        return True
+    logger.warning(f"El directorio destino no existe: {destino_base}")
+    crear = input("¿Crearlo? [S/n]: ").strip().lower()
+    if crear == 'n':
+        return False
+    os.makedirs(destino_base, exist_ok=True)
+    return True
+
+
+def run(tipos_permitidos=None, headless=True, verbose=True, completo=False,
+        usar_repertorio=False, descargar=True, links_primero=LINKS_ANTES_DE_YOUTUBE, workers=None,
+        capacidad=CAPACIDAD_COLA):
+    """
+    Ejecuta el pipeline completo con las etapas solapadas
+
+    Args:
+        tipos_permitidos: IDs de tipo de disco a conservar
+        headless: Navegador del filtro YouTube sin ventana
+        verbose: Mostrar progreso
+        completo: Extracción completa (ignora cursores por género)
+        usar_repertorio: Alimentar el pipeline desde data/repertorio.json en
+                         vez de extraer (reanudar con la extracción ya hecha)
+        descargar: Incluir la etapa de descarga
+        links_primero: Pedir los links antes del filtro YouTube; los releases
+                       sin ningún link vivo no llegan al navegador
+        workers: dict opcional {'youtube': n, 'links': n, 'descarga': n}
+        capacidad: Tamaño de cada cola entre etapas
+
+    Returns:
+        bool: True si el pipeline terminó
+    """
+    from modules import extraer_bandas, extraer_links, filtrar_youtube
+    from modules import descargar_y_organizar as descargas
+
+    if verbose:
+        orden = "links → YouTube" if links_primero else "YouTube → links"
+        print("=" * 60)
+        print(f"🌊 PIPELINE EN FLUJO (extracción → {orden} → descarga)")
+        print("=" * 60)
+
+    workers = dict(workers or {})
+    n_youtube = workers.get('youtube') or WORKERS_YOUTUBE or detectar_workers_optimos()
+    n_links = workers.get('links') or WORKERS_LINKS or min(detectar_workers_api(), 5)
+    n_descarga = workers.get('descarga') or WORKERS_DESCARGA
+
+    os.makedirs('data', exist_ok=True)
+    cargar_env()
+    session = crear_sesion_autenticada()
+    session_data = extraer_links.preparar_session_data(session)
+
+    if descargar:
+        if not _verificar_destino(descargas.DESTINO_BASE):
+            descargar = False
+        else:
+            os.makedirs(descargas.TEMP_DIR, exist_ok=True)
+
+    # --- Estado compartido (para los artefactos y el resumen) ---
+    estado_lock = threading.Lock()
+    aprobados = []
+    rechazados = []
+    sin_veredicto = []
+    con_links = []
+    sin_links_vivos = [0]
+    verificados = [0]
+
+    # --- Etapa: filtro YouTube ---
+    cache_yt = filtrar_youtube.CacheVeredictos() if filtrar_youtube.YT_CACHE_HABILITADO else None
+    preclasificador = (filtrar_youtube.PreclasificadorUnderground.desde_historial()
+                       if filtrar_youtube.YT_PRECLASIFICADOR_HABILITADO else None)
+    filtro = filtrar_youtube.FiltroYouTubeEnFlujo(num_workers=n_youtube, headless=headless, cache=cache_yt,
+                                                  preclasificador=preclasificador)
+    escritor_yt = filtrar_youtube.EscritorResultados()
+
+    def etapa_youtube(release):
+        es_mainstream, titulo = filtro.verificar(release)
+        band = release.get('band', 'Unknown')
+        album = release.get('album', 'Unknown')
+        year = release.get('year', '')
+        year_str = f"({year})" if year else ""
+        if es_mainstream is None:
+            # YouTube bloqueó la búsqueda incluso tras los reintentos: no se aprueba
+            with estado_lock:
+                sin_veredicto.append(release)
+            if verbose:
+                with print_lock:
+                    print(f"[YT] {band} - {album} {year_str} ⏸ Sin veredicto (bloqueo de YouTube)")
+            return None
+        razon = titulo[:50] if titulo else 'keyword'
+        with estado_lock:
+            verificados[0] += 1
+            n = verificados[0]
+            if es_mainstream:
+                rechazados.append({**release, 'razon': razon})
+            else:
+                aprobados.append(release)
+        escritor_yt.agregar(release, es_mainstream, razon)
+        if verbose:
+            veredicto = "❌ Mainstream" if es_mainstream else "✓ Underground"
+            with print_lock:
+                print(f"[YT {n}] {band} - {album} {year_str} {veredicto}")
+        return None if es_mainstream else release
+
+    # --- Etapa: links ---
+    def etapa_links(release):
+        release, num_links = extraer_links.extraer_links_post(session_data, release)
+        if verbose and num_links:
+            with print_lock:
+                print(f"[LINKS] {release.get('band', 'Unknown')} - {release.get('album', 'Unknown')} "
+                      f"✓ {num_links} link(s)")
+        if links_primero:
+            # Solo lo que se puede descargar pasa al navegador
+            if descargas.tiene_links_vivos(release):
+                return release
+            with estado_lock:
+                sin_links_vivos[0] += 1
+            return None
+        with estado_lock:
+            con_links.append(release)
+        return release if (num_links and descargar) else None
+
+    etapa_yt = Etapa("youtube", etapa_youtube, n_youtube, capacidad)
+    etapa_ln = Etapa("links", etapa_links, n_links, capacidad)
+    etapas = [etapa_ln, etapa_yt] if links_primero else [etapa_yt, etapa_ln]
+
+    # --- Etapas: descarga (paralela) y Mega (secuencial) ---
+    resultados = None
+    if descargar:
+        descargados = descargas.cargar_descargados()
+        fallidos = descargas.cargar_fallidos()
+        mega_anteriores = descargas.cargar_mega_pendientes()
+        # Los pendientes anteriores siguen en la cola hasta que la etapa Mega los procese
+        resultados = descargas.ResultadosDescarga(descargados, fallidos, list(mega_anteriores), verbose)
+
+        def etapa_descarga(release):
+            if _solo_mega(release):
+                return release
+            try:
+                exito, mensaje, info = descargas.procesar_release(
+                    release, descargas.DESTINO_BASE, descargas.TEMP_DIR, verbose, descargados, fallidos,
+                    show_progress=False
+                )
+            finally:
+                # Evitar fugas de recursos al reusar el thread
+                descargas._cleanup_playwright()
+                descargas._close_session()
+            resultados.registrar(release, exito, mensaje, info)
+            return None
+
+        def etapa_mega(release):
+            if descargas._mega_cooldown_activo():
+                resultados.encolar_pendiente(release)
+                return None
+            resultados.quitar_pendiente(release)
+            exito, mensaje, info = descargas.procesar_release(
+                release, descargas.DESTINO_BASE, descargas.TEMP_DIR, verbose, descargados, fallidos
+            )
+            resultados.registrar(release, exito, mensaje, info)
+            delay_con_jitter(descargas.DELAY_ENTRE_DESCARGAS)
+            return None
+
+        etapas.append(Etapa("descarga", etapa_descarga, n_descarga, capacidad))
+        etapas.append(Etapa("mega", etapa_mega, 1, capacidad))
+
+    # --- Fuente: extracción (o repertorio.json ya extraído) ---
+    def fuente(emitir):
+        def liberar(releases):
+            for release in releases:
+                emitir(release)
+
+        if usar_repertorio:
+            with open(REPERTORIO_FILE, 'r', encoding='utf-8') as f:
+                liberar(json.load(f))
+        else:
+            extraer_bandas.run(tipos_permitidos=tipos_permitidos, verbose=verbose,
+                               completo=completo, al_liberar=liberar)
+        # Mega pendientes de corridas anteriores: al final de la cola secuencial
+        if descargar:
+            for release in mega_anteriores:
+                etapas[-1].recibir(release)
+
+    if verbose:
+        print(f"\n⚙️  Workers: YouTube {n_youtube}, links {n_links}"
+              + (f", descarga {n_descarga} + Mega 1" if descargar else "")
+              + f" — colas de {capacidad}")
+        print(f"🌐 Iniciando filtro YouTube (backend {filtro.filtro.backend})...")
+
+    inicio = time.monotonic()
+    pipeline = PipelineFlujo(etapas)
+    filtro.iniciar()
+    try:
+        pipeline.ejecutar(fuente)
+    finally:
+        # Ningún thread de etapa puede seguir usando el navegador, la caché o los archivos
+        pipeline.detener()
+        filtro.cerrar()
+        if cache_yt is not None:
+            cache_yt.cerrar()
+        # Artefactos de compatibilidad con el pipeline secuencial
+        escritor_yt.cerrar(verbose)
+        filtrar_youtube.guardar_sin_veredicto(sin_veredicto, verbose=verbose)
+        # Con links primero, repertorio_con_links.json son los aprobados (ya traen sus links)
+        extraer_links.guardar_resultados(aprobados if links_primero else con_links, verbose=verbose)
+        if resultados is not None:
+            descargas.guardar_mega_pendientes(resultados.mega_pendientes)
+            descargas._close_session()
+            descargas._cleanup_playwright()
+
+    if verbose:
+        print("\n" + "=" * 60)
+        print("📊 RESULTADO DEL PIPELINE EN FLUJO")
+        print("=" * 60)
+        print(f"Releases extraídos: {pipeline.emitidos} "
+              f"({pipeline.tiempo_bloqueado:.0f}s de la extracción en backpressure)")
+        for etapa in etapas:
+            print(f"  {etapa.resumen()}")
+        con_links_final = aprobados if links_primero else con_links
+        print(f"Underground: {len(aprobados)}, Mainstream: {len(rechazados)}, "
+              f"con links: {sum(1 for r in con_links_final if r.get('download_links'))}")
+        if sin_veredicto:
+            print(f"Sin veredicto (bloqueos de YouTube, para reintentar): {len(sin_veredicto)}")
+        if links_primero:
+            print(f"Sin links vivos (no pasaron por YouTube): {sin_links_vivos[0]}")
+        if cache_yt is not None:
+            print(f"🗄️  {cache_yt.resumen()}")
+        print(f"🔎 {filtro.filtro.resumen_busquedas()}")
+        if preclasificador is not None:
+            print(f"🧮 {preclasificador.resumen()}")
+        print(f"⏱️  {time.monotonic() - inicio:.0f}s en total")
+        if resultados is not None:
+            resultados.mostrar_resumen(descargas.DESTINO_BASE)
+
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pipeline completo con etapas solapadas')
+    parser.add_argument('--tipos', default=None,
+                        help='IDs de tipo separados por coma (default: 1,2)')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignorar cursores y re-escanear todos los géneros completos')
+    parser.add_argument('--desde-repertorio', action='store_true',
+                        help='No extraer: alimentar el pipeline desde data/repertorio.json')
+    parser.add_argument('--sin-descarga', action='store_true',
+                        help='Terminar en la extracción de links')
+    parser.add_argument('--links-primero', action='store_true', default=LINKS_ANTES_DE_YOUTUBE,
+                        help='Pedir links antes del filtro YouTube (sin links vivos no se busca; '
+                             'por defecto LINKS_PRIMERO del entorno)')
+    parser.add_argument('--visible', action='store_true', help='Mostrar el navegador')
+    parser.add_argument('--workers-youtube', type=int, default=None)
+    parser.add_argument('--workers-links', type=int, default=None)
+    parser.add_argument('--workers-descarga', type=int, default=None)
+    parser.add_argument('--capacidad', type=int, default=CAPACIDAD_COLA,
+                        help='Tamaño de cada cola entre etapas')
+
+    args = parser.parse_args()
+    tipos = [int(t) for t in args.tipos.split(',') if t.strip().isdigit()] if args.tipos else None
+
+    run(tipos_permitidos=tipos, headless=not args.visible, completo=args.full,
+        usar_repertorio=args.desde_repertorio, descargar=not args.sin_descarga,
+        links_primero=args.links_primero,
+        workers={'youtube': args.workers_youtube, 'links': args.workers_links,
+                 'descarga': args.workers_descarga},
+        capacidad=args.capacidad)
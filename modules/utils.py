@@ -4,9 +4,21 @@ Utilidades compartidas para el scraper de DeathGrind.club
 """
 
 import os
+import json
 import time
 import random
+import sqlite3
+import threading
+import zlib
 import requests
+from requests.structures import CaseInsensitiveDict
+from email.utils import parsedate_to_datetime
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
 
 from modules.logger import setup_logger
 
@@ -16,8 +28,8 @@ logger = setup_logger(__name__)
 # Constantes centralizadas
 # =============================================================================
 
-# URLs
-BASE_URL = "https://deathgrind.club"
+# URLs (DEATHGRIND_BASE_URL permite apuntar a un servidor local, ver scripts/fake_api_server.py)
+BASE_URL = os.getenv('DEATHGRIND_BASE_URL', "https://deathgrind.club").rstrip('/')
 API_URL = f"{BASE_URL}/api"
 
 # Paths de datos
@@ -32,16 +44,670 @@ MAINSTREAM_FILE = f"{DATA_DIR}/releases_mainstream.txt"
 DESCARGADOS_FILE = f"{DATA_DIR}/descargados.txt"
 FALLIDOS_FILE = f"{DATA_DIR}/fallidos_bandas.txt"
 MEGA_PENDIENTES_FILE = f"{DATA_DIR}/mega_pendientes.json"
+CURSOR_GENEROS_FILE = f"{DATA_DIR}/cursor_generos.json"
+JOURNAL_EXTRACCION_FILE = f"{DATA_DIR}/extraccion_journal.jsonl"
+API_CAPACIDADES_FILE = f"{DATA_DIR}/api_capacidades.json"
+ARCHIVO_POSTS_FILE = f"{DATA_DIR}/posts_archivo.sqlite3"
+HTTP_CACHE_FILE = f"{DATA_DIR}/http_cache.sqlite3"
+YOUTUBE_VEREDICTOS_FILE = f"{DATA_DIR}/youtube_veredictos.sqlite3"
+YOUTUBE_PLAN_FILE = f"{DATA_DIR}/youtube_plan.json"
+YOUTUBE_PLAN_LOCK_FILE = f"{DATA_DIR}/.youtube_plan.lock"
+YOUTUBE_SERP_FILE = f"{DATA_DIR}/youtube_serp.sqlite3"
+RECLASIFICACION_FILE = f"{DATA_DIR}/reclasificacion_youtube.txt"
+YOUTUBE_REINTENTOS_FILE = f"{DATA_DIR}/youtube_sin_veredicto.json"
 
 # Rate limiting
 DELAY_BASE_429 = 30
 MAX_BACKOFF_429 = 300
 
+# Token bucket compartido para toda la API de deathgrind.club (todos los
+# threads y procesos de la misma máquina/cuenta comparten el presupuesto)
+API_RATE_POR_SEGUNDO = float(os.getenv('API_RATE_POR_SEGUNDO', '4'))
+API_RAFAGA = int(os.getenv('API_RAFAGA', '8'))
+API_RATE_STATE_FILE = f"{DATA_DIR}/.api_rate_state.json"
+API_RATE_LOCK_FILE = f"{DATA_DIR}/.api_rate.lock"
+
+# Pedir los links (API, barato) antes del filtro YouTube (navegador, caro):
+# los releases sin ningún link vivo no se buscan en YouTube. Vale para el
+# pipeline secuencial y el en flujo (LINKS_PRIMERO=1 para activarlo).
+LINKS_ANTES_DE_YOUTUBE = os.getenv('LINKS_PRIMERO', '0') == '1'
+
+# Cache HTTP de respuestas de la API (GET condicional con ETag/Last-Modified).
+# Por defecto cada request se revalida. Con HTTP_CACHE_TTL > 0, una respuesta
+# sin validadores se reutiliza sin red durante ese tiempo, salvo las páginas
+# de /posts/filter: una primera página vieja esconde los posts nuevos.
+HTTP_CACHE_HABILITADO = os.getenv('HTTP_CACHE', '1') != '0'
+HTTP_CACHE_TTL = int(os.getenv('HTTP_CACHE_TTL', '0'))
+HTTP_CACHE_RUTAS_SIN_TTL = ('/posts/filter',)
+
+# Cache de veredictos del filtro YouTube. Un mainstream casi nunca deja de
+# serlo; un underground puede tener upload nuevo, así que vence antes.
+YT_CACHE_HABILITADO = os.getenv('YT_CACHE', '1') != '0'
+YT_CACHE_TTL_MAINSTREAM_DIAS = float(os.getenv('YT_CACHE_TTL_MAINSTREAM_DIAS', '180'))
+YT_CACHE_TTL_UNDERGROUND_DIAS = float(os.getenv('YT_CACHE_TTL_UNDERGROUND_DIAS', '30'))
+
+# Backend de búsqueda del filtro YouTube: 'http' (HTML + ytInitialData, el
+# navegador solo como respaldo) o 'navegador' (siempre Chromium)
+YT_BACKEND = os.getenv('YT_BACKEND', 'http')
+
+# Páginas de Chromium del filtro YouTube sin imágenes, video, fuentes ni
+# trackers (solo se lee texto): menos bytes y RAM por worker
+YT_BLOQUEAR_RECURSOS = os.getenv('YT_BLOQUEAR_RECURSOS', '1') != '0'
+
+# Gobernador de memoria del filtro YouTube: un contexto de Chromium se recicla
+# tras YT_RECICLAR_CADA navegaciones o si el RSS del navegador por página pasa
+# YT_RSS_MAX_MB_POR_PAGINA; el pool de páginas se achica si la RAM libre baja
+# de YT_MEMORIA_LIBRE_MIN_MB y vuelve a crecer cuando hay margen.
+YT_RECICLAR_CADA = int(os.getenv('YT_RECICLAR_CADA', '150'))
+YT_RSS_MAX_MB_POR_PAGINA = float(os.getenv('YT_RSS_MAX_MB_POR_PAGINA', '400'))
+YT_MEMORIA_LIBRE_MIN_MB = float(os.getenv('YT_MEMORIA_LIBRE_MIN_MB', '1024'))
+
+# Procesos del filtro YouTube (cada uno con su navegador y event loop) que se
+# reparten el repertorio. 1 = un solo proceso; 0 = uno por core disponible.
+YT_PROCESOS = int(os.getenv('YT_PROCESOS', '1'))
+
+# Planificador de búsquedas del filtro YouTube: primero una sola consulta
+# "full album" con filtro de duración ('larga' = más de 20 min, 'media' =
+# 4-20 min, 'ninguna'; solo para álbumes, compilados, en vivo y boxsets);
+# la segunda solo si la primera quedó ambigua. Una fracción
+# YT_PLAN_EXPLORACION de los casos "limpios" corre igual la segunda para
+# medir cuántos mainstream se escaparían; si superan YT_PLAN_UMBRAL_RESCATE
+# (por tipo de release) se vuelve a la doble búsqueda completa.
+YT_DURACION = os.getenv('YT_DURACION', 'larga')
+YT_PLAN_EXPLORACION = float(os.getenv('YT_PLAN_EXPLORACION', '0.05'))
+YT_PLAN_UMBRAL_RESCATE = float(os.getenv('YT_PLAN_UMBRAL_RESCATE', '0.02'))
+
+# Bandas con varios releases pendientes: una búsqueda por banda y cada álbum
+# se compara localmente contra esos títulos; solo los que no se pudieron
+# decidir pasan a la búsqueda por álbum.
+YT_AGRUPAR_BANDAS = os.getenv('YT_AGRUPAR_BANDAS', '1') != '0'
+
+# Guardar cada página de resultados (título + canal, comprimida) para poder
+# reclasificar offline cuando cambian las keywords
+YT_SERP_HABILITADO = os.getenv('YT_SERP', '1') != '0'
+
+# Pre-clasificador del filtro YouTube: los releases con probabilidad estimada
+# de mainstream (tipo, década, historial de la banda) menor a
+# YT_PRECLASIFICADOR_UMBRAL quedan underground sin abrir el navegador; una
+# fracción YT_PRECLASIFICADOR_AUDITORIA se verifica igual para medir el error.
+# Desactivado hasta validar su tasa de error: YT_PRECLASIFICADOR=1 para usarlo.
+YT_PRECLASIFICADOR_HABILITADO = os.getenv('YT_PRECLASIFICADOR', '0') == '1'
+YT_PRECLASIFICADOR_UMBRAL = float(os.getenv('YT_PRECLASIFICADOR_UMBRAL', '0.03'))
+YT_PRECLASIFICADOR_AUDITORIA = float(os.getenv('YT_PRECLASIFICADOR_AUDITORIA', '0.05'))
+
+# Bloqueos de YouTube (muro de consentimiento, CAPTCHA / "unusual traffic",
+# 429, página que no termina de cargar): el contexto que lo recibió descansa
+# YT_BACKOFF_BASE_SEG * 2^(racha-1) (hasta YT_BACKOFF_MAX_SEG) y se rota; el
+# release vuelve a la cola hasta YT_REINTENTOS veces y, si sigue sin
+# veredicto, no se aprueba (queda en YOUTUBE_REINTENTOS_FILE).
+YT_REINTENTOS = int(os.getenv('YT_REINTENTOS', '2'))
+YT_BACKOFF_BASE_SEG = float(os.getenv('YT_BACKOFF_BASE_SEG', '30'))
+YT_BACKOFF_MAX_SEG = float(os.getenv('YT_BACKOFF_MAX_SEG', '600'))
+
+# Sesión autenticada persistida (cookies + CSRF) compartida entre módulos.
+# Si se validó hace menos de SESION_VALIDAR_CADA segundos se reutiliza sin sondear.
+SESION_API_FILE = f"{DATA_DIR}/.sesion_api.json"
+SESION_API_LOCK_FILE = f"{DATA_DIR}/.sesion_api.lock"
+SESION_VALIDAR_CADA = int(os.getenv('SESION_VALIDAR_CADA', '600'))
+SESION_URL_SONDEO = f"{API_URL}/posts/filter?offset=1"
+
 # HTTP
 DEFAULT_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) Chrome/131.0.0.0 Safari/537.36"
 DEFAULT_UUID = "12345"
 
 
+# =============================================================================
+# Rate limiter compartido
+# =============================================================================
+
+def segundos_retry_after(response):
+    """Segundos indicados por el header Retry-After (None si no viene o no se entiende)"""
+    valor = response.headers.get('Retry-After') if response is not None else None
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LimitadorAPI:
+    """Token bucket compartido por todo el tráfico a la API.
+
+    - Entre threads: lock en memoria.
+    - Entre procesos: el estado (tokens, penalización) vive en un archivo
+      protegido con flock, así dos instancias del pipeline con la misma
+      cuenta reparten un solo presupuesto. Sin fcntl (Windows) queda
+      limitado al proceso actual.
+    - Un 429 abre una ventana de penalización global: ninguna request sale
+      hasta que termine (Retry-After si el servidor lo manda, si no backoff
+      lineal DELAY_BASE_429 * racha, tope MAX_BACKOFF_429).
+    - Cada transacción toma hasta `lote` tokens (tasa y penalización se
+      revisan en el mismo paso); el sobrante queda reservado en el proceso
+      y vence al segundo, así una penalización abierta por otro proceso se
+      respeta enseguida. Una respuesta OK solo escribe el estado si había
+      una racha de 429 que resetear.
+    - Si las requests esperan tokens, el bucket (API_RATE_POR_SEGUNDO) es lo
+      que marca el ritmo: se avisa y saturado() le indica a ControlAIMD que
+      más concurrencia no sirve.
+    """
+
+    def __init__(self, rate=API_RATE_POR_SEGUNDO, rafaga=API_RAFAGA,
+                 state_file=API_RATE_STATE_FILE, lock_file=API_RATE_LOCK_FILE):
+        self.rate = rate
+        self.rafaga = rafaga
+        self.state_file = state_file
+        self.lock_file = lock_file
+        self._lock = threading.Lock()
+        self._estado_local = None
+        self.rate_limits = 0
+        self.tiempo_espera = 0.0
+        self.lote = max(1, min(self.rafaga // 2, int(self.rate // 2)))
+        self._lock_reserva = threading.Lock()
+        self._reserva = 0
+        self._reserva_vence = 0.0
+        self._racha_vista = 0
+        self.espera_por_tasa = 0.0
+        self._saturado_hasta = 0.0
+        self._ultimo_aviso = 0.0
+
+    def _leer_estado(self):
+        if HAS_FCNTL:
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        elif self._estado_local is not None:
+            return self._estado_local
+        return {'tokens': float(self.rafaga), 'ts': time.time(), 'penalty_until': 0.0, 'racha_429': 0}
+
+    def _guardar_estado(self, estado):
+        if not HAS_FCNTL:
+            self._estado_local = estado
+            return
+        tmp = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+        os.replace(tmp, self.state_file)
+
+    def _transaccion(self, fn):
+        """Ejecuta fn(estado) -> resultado con el estado bloqueado (threads + procesos)"""
+        with self._lock:
+            lock_f = None
+            if HAS_FCNTL:
+                os.makedirs(os.path.dirname(self.lock_file) or '.', exist_ok=True)
+                lock_f = open(self.lock_file, 'a')
+                fcntl.flock(lock_f, fcntl.LOCK_EX)
+            try:
+                estado = self._leer_estado()
+                resultado = fn(estado)
+                self._guardar_estado(estado)
+                return resultado
+            finally:
+                if lock_f is not None:
+                    fcntl.flock(lock_f, fcntl.LOCK_UN)
+                    lock_f.close()
+
+    def _tomar_tokens(self, estado):
+        """Intenta consumir hasta `lote` tokens.
+        Retorna (tomados, segundos a esperar, True si la espera es una penalización)."""
+        self._racha_vista = estado.get('racha_429', 0)
+        ahora = time.time()
+        if estado.get('penalty_until', 0) > ahora:
+            return 0, estado['penalty_until'] - ahora, True
+        transcurrido = max(0.0, ahora - estado.get('ts', ahora))
+        tokens = min(float(self.rafaga), estado.get('tokens', 0.0) + transcurrido * self.rate)
+        estado['ts'] = ahora
+        if tokens >= 1:
+            tomados = min(self.lote, int(tokens))
+            estado['tokens'] = tokens - tomados
+            return tomados, 0, False
+        estado['tokens'] = tokens
+        return 0, (1 - tokens) / self.rate, False
+
+    def _usar_reserva(self):
+        with self._lock_reserva:
+            if self._reserva > 0 and time.monotonic() < self._reserva_vence:
+                self._reserva -= 1
+                return True
+            return False
+
+    def _registrar_saturacion(self, espera):
+        """La request esperó tokens (no una penalización): el bucket marca el ritmo"""
+        ahora = time.monotonic()
+        self.espera_por_tasa += espera
+        self._saturado_hasta = ahora + 2.0
+        if ahora - self._ultimo_aviso > 60:
+            self._ultimo_aviso = ahora
+            logger.info(f"⏳ Limitador API: el tope de {self.rate:g} req/s marca el ritmo "
+                        f"(más concurrencia no acelera; ver API_RATE_POR_SEGUNDO)")
+
+    def saturado(self):
+        """True si en los últimos segundos alguna request esperó tokens del bucket"""
+        return time.monotonic() < self._saturado_hasta
+
+    def adquirir(self):
+        """Bloquea hasta poder hacer una request"""
+        while True:
+            if self._usar_reserva():
+                return
+            tomados, espera, penalizacion = self._transaccion(self._tomar_tokens)
+            if tomados:
+                with self._lock_reserva:
+                    if time.monotonic() >= self._reserva_vence:
+                        self._reserva = 0
+                    self._reserva += tomados - 1
+                    self._reserva_vence = time.monotonic() + 1.0
+                return
+            self.tiempo_espera += espera
+            if not penalizacion:
+                self._registrar_saturacion(espera)
+            time.sleep(espera)
+
+    def penalizar(self, segundos=None):
+        """Abre (o extiende) la ventana global de penalización. Retorna los segundos restantes."""
+        def _penalizar(estado):
+            ahora = time.time()
+            if estado.get('penalty_until', 0) > ahora:
+                # Mismo episodio (otras requests ya en vuelo): no escalar la racha
+                if segundos is not None:
+                    estado['penalty_until'] = max(estado['penalty_until'], ahora + segundos)
+                return estado['penalty_until'] - ahora
+            estado['racha_429'] = estado.get('racha_429', 0) + 1
+            espera = segundos
+            if espera is None:
+                espera = min(DELAY_BASE_429 * estado['racha_429'], MAX_BACKOFF_429)
+            estado['penalty_until'] = ahora + espera
+            estado['tokens'] = 0.0
+            return espera
+        self.rate_limits += 1
+        with self._lock_reserva:
+            self._reserva = 0
+        espera = self._transaccion(_penalizar)
+        self._racha_vista = 1
+        return espera
+
+    def restante(self):
+        """Segundos que faltan de la penalización global activa (0 si no hay)"""
+        def _restante(estado):
+            return max(0.0, estado.get('penalty_until', 0) - time.time())
+        return self._transaccion(_restante)
+
+    def registrar_respuesta(self, response):
+        """Actualiza el estado según la respuesta. Retorna segundos de penalización si fue 429."""
+        if response.status_code == 429:
+            return self.penalizar(segundos_retry_after(response))
+        if response.status_code < 400 and self._racha_vista:
+            def _reset(estado):
+                estado['racha_429'] = 0
+            self._transaccion(_reset)
+            self._racha_vista = 0
+        return None
+
+    def resumen(self):
+        return (f"limitador API: {self.rate:g} req/s (lotes de {self.lote}), "
+                f"{self.espera_por_tasa:.0f}s esperando tokens, {self.rate_limits} rate limits")
+
+
+limitador_api = LimitadorAPI()
+
+
+def espera_rate_limit(response):
+    """Segundos de penalización de un 429 que pasó por peticion_api (sin
+    volver a bloquear el estado compartido)"""
+    espera = getattr(response, 'espera_limitador', None)
+    return espera if espera is not None else limitador_api.restante()
+
+
+def peticion_api(session, url, method='GET', **kwargs):
+    """Hace una request a deathgrind.club pasando por el limitador compartido.
+
+    Si la sesión viene de sesion_api y el servidor responde 401/403, se
+    renueva el login (una sola vez para todos los threads) y se reintenta.
+    """
+    # Respuesta vigente en la cache (TTL): no consume presupuesto de requests
+    buscar_fresco = getattr(session, 'buscar_fresco', None)
+    if buscar_fresco is not None and method.upper() == 'GET':
+        cacheada = buscar_fresco(url, kwargs.get('params'))
+        if cacheada is not None:
+            return cacheada
+    sesion_api.sincronizar(session)
+    limitador_api.adquirir()
+    response = session.request(method, url, **kwargs)
+    response.espera_limitador = limitador_api.registrar_respuesta(response)
+
+    if response.status_code in (401, 403) and hasattr(session, 'generacion_sesion'):
+        if sesion_api.renovar(session.generacion_sesion):
+            sesion_api.sincronizar(session)
+            limitador_api.adquirir()
+            response = session.request(method, url, **kwargs)
+            response.espera_limitador = limitador_api.registrar_respuesta(response)
+    return response
+
+
+# =============================================================================
+# Cache HTTP condicional
+# =============================================================================
+
+class CacheHTTP:
+    """Cache en disco (SQLite, cuerpo comprimido) de respuestas GET de la API.
+
+    Guarda ETag / Last-Modified / cuerpo por URL completa. Una conexión por
+    thread; WAL para que los workers lean y escriban en paralelo.
+    """
+
+    def __init__(self, path=HTTP_CACHE_FILE, ttl=HTTP_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits_ttl = 0
+        self.hits_304 = 0
+        self.misses = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS respuestas (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    guardado REAL NOT NULL,
+                    cuerpo BLOB NOT NULL
+                )
+            """)
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def obtener(self, url):
+        fila = self._conn().execute(
+            "SELECT etag, last_modified, content_type, guardado, cuerpo FROM respuestas WHERE url = ?",
+            (url,)
+        ).fetchone()
+        if fila is None:
+            return None
+        etag, last_modified, content_type, guardado, cuerpo = fila
+        return {
+            'etag': etag, 'last_modified': last_modified, 'content_type': content_type,
+            'guardado': guardado, 'cuerpo': zlib.decompress(cuerpo),
+        }
+
+    def guardar(self, url, response):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?)",
+            (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+             response.headers.get('Content-Type'), time.time(), zlib.compress(response.content))
+        )
+        conn.commit()
+
+    def refrescar(self, url):
+        conn = self._conn()
+        conn.execute("UPDATE respuestas SET guardado = ? WHERE url = ?", (time.time(), url))
+        conn.commit()
+
+    def contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def resumen(self):
+        total = self.hits_ttl + self.hits_304 + self.misses
+        return (f"cache HTTP: {self.hits_304} sin cambios (304), {self.hits_ttl} por TTL, "
+                f"{self.misses} descargas completas de {total} GET")
+
+
+cache_http = CacheHTTP()
+
+
+def _respuesta_desde_cache(url, entrada):
+    """Arma un requests.Response 200 con el cuerpo cacheado"""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = entrada['cuerpo']
+    response.headers = CaseInsensitiveDict({'Content-Type': entrada['content_type'] or 'application/json'})
+    response.url = url
+    response.encoding = 'utf-8'
+    response.from_cache = True
+    return response
+
+
+class SesionCacheada(requests.Session):
+    """requests.Session que hace GET condicionales contra la cache en disco.
+
+    - Con ETag/Last-Modified guardados: manda If-None-Match / If-Modified-Since
+      y un 304 se devuelve como 200 con el cuerpo cacheado.
+    - Sin validadores: la entrada se reutiliza sin red mientras tenga menos de
+      HTTP_CACHE_TTL segundos (ver buscar_fresco, usado por peticion_api),
+      nunca en HTTP_CACHE_RUTAS_SIN_TTL.
+    """
+
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache if cache is not None else cache_http
+
+    def _url_completa(self, url, params):
+        preparada = requests.models.PreparedRequest()
+        preparada.prepare_url(url, params)
+        return preparada.url
+
+    def _admite_ttl(self, url):
+        return self.cache.ttl > 0 and not any(ruta in str(url) for ruta in HTTP_CACHE_RUTAS_SIN_TTL)
+
+    def buscar_fresco(self, url, params=None):
+        """Respuesta cacheada vigente por TTL (solo entradas sin validadores)"""
+        if not HTTP_CACHE_HABILITADO or not self._admite_ttl(url):
+            return None
+        url_completa = self._url_completa(url, params)
+        entrada = self.cache.obtener(url_completa)
+        if entrada is None or entrada['etag'] or entrada['last_modified']:
+            return None
+        if time.time() - entrada['guardado'] > self.cache.ttl:
+            return None
+        self.cache.contar('hits_ttl')
+        return _respuesta_desde_cache(url_completa, entrada)
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if not HTTP_CACHE_HABILITADO or method.upper() != 'GET' or not str(url).startswith(API_URL):
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        url_completa = self._url_completa(url, params)
+        entrada = self.cache.obtener(url_completa)
+        headers = dict(headers or {})
+        if entrada is not None:
+            if entrada['etag']:
+                headers['If-None-Match'] = entrada['etag']
+            if entrada['last_modified']:
+                headers['If-Modified-Since'] = entrada['last_modified']
+
+        response = super().request(method, url_completa, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entrada is not None:
+            self.cache.refrescar(url_completa)
+            self.cache.contar('hits_304')
+            return _respuesta_desde_cache(url_completa, entrada)
+
+        if response.status_code == 200:
+            self.cache.contar('misses')
+            if response.headers.get('ETag') or response.headers.get('Last-Modified') or self._admite_ttl(url):
+                self.cache.guardar(url_completa, response)
+
+        return response
+
+
+def _aplicar_credenciales(session, datos):
+    """Copia headers y cookies de `datos` a la sesión y la marca con su generación"""
+    session.headers.update(datos['headers'])
+    session.cookies.clear()
+    for cookie in datos['cookies']:
+        session.cookies.set(cookie['name'], cookie['value'])
+    session.generacion_sesion = datos.get('generacion', 0)
+    return session
+
+
+def crear_sesion_thread(session_data):
+    """Sesión HTTP para un worker (con cache condicional) a partir de _preparar_session_data"""
+    return _aplicar_credenciales(SesionCacheada(), session_data)
+
+
+# =============================================================================
+# Sesión autenticada persistida
+# =============================================================================
+
+class SesionAPI:
+    """Credenciales de la API (cookies + token CSRF) compartidas por módulos y workers.
+
+    Se guardan en disco (SESION_API_FILE) para que cada módulo del pipeline no
+    tenga que volver a loguearse; al cargarlas se validan con una request
+    barata. Ante un 401/403 el primer thread que lo detecta hace el re-login
+    (los demás esperan y reutilizan el resultado) y cada sesión thread-local
+    adopta las credenciales nuevas antes de su próxima request.
+    """
+
+    def __init__(self, path=SESION_API_FILE, lock_file=SESION_API_LOCK_FILE):
+        self.path = path
+        self.lock_file = lock_file
+        self._lock = threading.Lock()
+        self.datos = None
+        self.reutilizada = False
+        self.logins = 0
+        self.renovaciones = 0
+
+    def _leer_disco(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('base_url') == BASE_URL and datos.get('cookies'):
+                return datos
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _guardar_disco(self, datos):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        # Contiene cookies de sesión: solo legible por el usuario
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        os.replace(tmp, self.path)
+
+    def _bloqueo_procesos(self):
+        """Lock de archivo para que dos procesos no se logueen a la vez (None sin fcntl)"""
+        if not HAS_FCNTL:
+            return None
+        os.makedirs(os.path.dirname(self.lock_file) or '.', exist_ok=True)
+        lock_f = open(self.lock_file, 'a')
+        fcntl.flock(lock_f, fcntl.LOCK_EX)
+        return lock_f
+
+    def _liberar_procesos(self, lock_f):
+        if lock_f is not None:
+            fcntl.flock(lock_f, fcntl.LOCK_UN)
+            lock_f.close()
+
+    def _sondear(self, datos):
+        """True si las credenciales siguen sirviendo (cualquier respuesta que no sea 401/403)"""
+        try:
+            session = requests.Session()
+            session.headers.update(datos['headers'])
+            for cookie in datos['cookies']:
+                session.cookies.set(cookie['name'], cookie['value'])
+            response = peticion_api(session, SESION_URL_SONDEO, timeout=15)
+            return response.status_code not in (401, 403)
+        except requests.exceptions.RequestException:
+            return False
+
+    def _login(self, generacion, max_retries=3):
+        session = _login_api(max_retries)
+        self.logins += 1
+        return {
+            'base_url': BASE_URL,
+            'headers': dict(session.headers),
+            'cookies': [{'name': k, 'value': v} for k, v in session.cookies.items()],
+            'generacion': generacion,
+            'validada': time.time(),
+        }
+
+    def obtener(self, max_retries=3):
+        """Sesión autenticada: reutiliza la guardada en disco si sigue válida, si no hace login"""
+        with self._lock:
+            if self.datos is None:
+                lock_f = self._bloqueo_procesos()
+                try:
+                    datos = self._leer_disco()
+                    self.reutilizada = False
+                    if datos is not None and (time.time() - datos.get('validada', 0) < SESION_VALIDAR_CADA
+                                              or self._sondear(datos)):
+                        datos['validada'] = time.time()
+                        self.reutilizada = True
+                    else:
+                        generacion = datos.get('generacion', 0) + 1 if datos else 1
+                        datos = self._login(generacion, max_retries)
+                    self._guardar_disco(datos)
+                    self.datos = datos
+                finally:
+                    self._liberar_procesos(lock_f)
+            return _aplicar_credenciales(requests.Session(), self.datos)
+
+    def renovar(self, generacion_vista, max_retries=3):
+        """Re-login tras un 401/403 visto con credenciales de `generacion_vista`.
+
+        Si otro thread (u otro proceso) ya renovó, reutiliza sus credenciales.
+        Retorna True si hay credenciales más nuevas que las que fallaron.
+        """
+        with self._lock:
+            if self.datos is not None and self.datos.get('generacion', 0) > generacion_vista:
+                return True
+            lock_f = self._bloqueo_procesos()
+            try:
+                disco = self._leer_disco()
+                if disco is not None and disco.get('generacion', 0) > generacion_vista:
+                    self.datos = disco
+                    return True
+                print("   🔐 Sesión expirada, renovando login...")
+                self.datos = self._login(generacion_vista + 1, max_retries)
+                self._guardar_disco(self.datos)
+                self.renovaciones += 1
+                return True
+            except (ValueError, ConnectionError, requests.exceptions.RequestException) as e:
+                print(f"   ⚠️ No se pudo renovar la sesión: {e}")
+                return False
+            finally:
+                self._liberar_procesos(lock_f)
+
+    def sincronizar(self, session):
+        """Aplica a `session` las credenciales vigentes si las suyas son de una generación anterior"""
+        generacion = getattr(session, 'generacion_sesion', None)
+        datos = self.datos
+        if generacion is not None and datos is not None and datos.get('generacion', 0) > generacion:
+            _aplicar_credenciales(session, datos)
+
+    def session_data(self):
+        """Copia serializable de las credenciales vigentes (para crear_sesion_thread)"""
+        with self._lock:
+            return json.loads(json.dumps(self.datos)) if self.datos else None
+
+    def invalidar(self):
+        """Olvida la sesión (memoria y disco); la próxima obtener() hace login"""
+        with self._lock:
+            self.datos = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+sesion_api = SesionAPI()
+
+
 # =============================================================================
 # Funciones compartidas
 # =============================================================================
@@ -66,6 +732,11 @@ def cargar_env():
 
 
 def crear_sesion_autenticada(max_retries=3):
+    """Sesión autenticada compartida (ver SesionAPI): solo hace login si la guardada no sirve"""
+    return sesion_api.obtener(max_retries)
+
+
+def _login_api(max_retries=3):
     """Login con retry y retorna sesión autenticada"""
     email = os.environ.get('DEATHGRIND_EMAIL')
     password = os.environ.get('DEATHGRIND_PASSWORD')
@@ -81,13 +752,14 @@ def crear_sesion_autenticada(max_retries=3):
                 'Accept': 'application/json',
             })
 
-            session.get(f"{BASE_URL}/auth/sign-in")
+            peticion_api(session, f"{BASE_URL}/auth/sign-in")
             cookies = session.cookies.get_dict()
             csrf_token = cookies.get('csrfToken', '')
 
             login_data = {"login": email, "password": password}
             headers = {'x-csrf-token': csrf_token, 'x-uuid': DEFAULT_UUID}
-            response = session.post(f"{API_URL}/auth/login", json=login_data, headers=headers)
+            response = peticion_api(session, f"{API_URL}/auth/login", method='POST',
+                                    json=login_data, headers=headers)
 
             if response.status_code in [200, 202]:
                 cookies = session.cookies.get_dict()
@@ -96,9 +768,8 @@ def crear_sesion_autenticada(max_retries=3):
                 return session
 
             if response.status_code == 429:
-                wait = (intento + 1) * 10
-                print(f"   ⚠️ Rate limited, esperando {wait}s...")
-                time.sleep(wait)
+                # peticion_api ya abrió la penalización global; el próximo intento la respeta
+                print("   ⚠️ Rate limited en login, esperando...")
                 continue
 
             raise ConnectionError(f"Error de login: {response.status_code}")
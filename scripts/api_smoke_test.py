@@ -5,6 +5,7 @@ Smoke test for DeathGrind.club API endpoints.
 - Logs in using .env
 - Calls /posts/filter with the first genre in generos_activos.txt
 - Calls /bands/{id}/discography and /posts/{id}/links using the first post
+- All calls go through the shared API rate limiter (modules.utils)
 
 Prints only status codes and counts (no sensitive data).
 """
@@ -23,6 +24,7 @@ from modules.extraer_bandas import (  # noqa: E402
     cargar_generos,
     crear_sesion_autenticada,
 )
+from modules.utils import peticion_api  # noqa: E402
 
 
 def main() -> int:
@@ -40,7 +42,8 @@ def main() -> int:
 
     genre_id, genre_name = generos[0]
     try:
-        resp = session.get(
+        resp = peticion_api(
+            session,
             f"{API_URL}/posts/filter",
             params={"genres": genre_id},
             timeout=30,
@@ -69,7 +72,7 @@ def main() -> int:
 
     if band_id:
         try:
-            resp = session.get(f"{API_URL}/bands/{band_id}/discography", timeout=30)
+            resp = peticion_api(session, f"{API_URL}/bands/{band_id}/discography", timeout=30)
             print(f"/bands/{band_id}/discography status: {resp.status_code}")
             if resp.status_code == 200:
                 discography = resp.json()
@@ -82,7 +85,7 @@ def main() -> int:
 
     if post_id:
         try:
-            resp = session.get(f"{API_URL}/posts/{post_id}/links", timeout=30)
+            resp = peticion_api(session, f"{API_URL}/posts/{post_id}/links", timeout=30)
             print(f"/posts/{post_id}/links status: {resp.status_code}")
             if resp.status_code == 200:
                 links = resp.json().get("links") or []
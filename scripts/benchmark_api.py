@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the API stages against the local fake server.
+
+- Starts scripts/fake_api_server.py in-process (no network, no credentials)
+- Runs modules.extraer_bandas (extraction) and modules.extraer_links (links)
+  in a scratch directory, so nothing under data/ is touched
+- Reports requests/sec, pages/min, 429s, 304s and time lost to backoff
+
+Usage:
+    python scripts/benchmark_api.py --posts 300 --latency 80 --rate 20
+    python scripts/benchmark_api.py --client-rate 50 --prob-429 0.02 --runs 2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+SCRIPTS_DIR = os.path.join(REPO_ROOT, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from fake_api_server import build_server  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark API stages against the fake server")
+    parser.add_argument("--posts", type=int, default=200, help="Average posts per genre")
+    parser.add_argument("--genres", type=int, default=0, help="Only use the first N genres (0 = all)")
+    parser.add_argument("--latency", type=float, default=50, help="Server latency per request (ms)")
+    parser.add_argument("--jitter", type=float, default=20, help="Server latency jitter (ms)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Server-side limit (req/s, 0 = none)")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--prob-429", type=float, default=0.0, help="Random 429 probability")
+    parser.add_argument("--client-rate", type=float, default=None,
+                        help="Override API_RATE_POR_SEGUNDO for the client limiter")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="Extraction runs (runs after the first are incremental)")
+    parser.add_argument("--link-workers", type=int, default=None,
+                        help="Workers for link extraction (default: the module's own choice)")
+    parser.add_argument("--skip-links", action="store_true", help="Only benchmark extraction")
+    parser.add_argument("--verbose", action="store_true", help="Show the modules' own output")
+    return parser.parse_args(argv)
+
+
+def output(verbose):
+    """Module output passes through only with --verbose"""
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def report(label, before, after, elapsed, extra=None):
+    requests_made = after["requests"] - before["requests"]
+    pages = after["pages"] - before["pages"]
+    print(f"\n{label}")
+    print(f"  time:         {elapsed:.2f}s")
+    print(f"  requests:     {requests_made} ({requests_made / elapsed if elapsed else 0:.1f} req/s)")
+    print(f"  pages:        {pages} ({pages * 60 / elapsed if elapsed else 0:.0f} pages/min)")
+    print(f"  links calls:  {after['links'] - before['links']}")
+    print(f"  429s:         {after['status_429'] - before['status_429']}")
+    print(f"  304s:         {after['status_304'] - before['status_304']}")
+    for key, value in (extra or {}).items():
+        print(f"  {key + ':':<13} {value}")
+
+
+def main() -> int:
+    args = parse_args()
+
+    server, state = build_server(
+        posts_per_genre=args.posts, latency_ms=args.latency, jitter_ms=args.jitter,
+        rate=args.rate, burst=args.burst, prob_429=args.prob_429,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # The modules read these at import time
+    os.environ["DEATHGRIND_BASE_URL"] = base_url
+    os.environ["DEATHGRIND_EMAIL"] = "bench@example.invalid"
+    os.environ["DEATHGRIND_PASSWORD"] = "bench"
+    if args.client_rate is not None:
+        os.environ["API_RATE_POR_SEGUNDO"] = str(args.client_rate)
+
+    workdir = tempfile.mkdtemp(prefix="dg-bench-")
+    with open(os.path.join(REPO_ROOT, "generos_activos.txt"), "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    if args.genres:
+        lines = lines[:args.genres + 1]
+    with open(os.path.join(workdir, "generos_activos.txt"), "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    if os.path.exists(os.path.join(REPO_ROOT, "lista_sello.txt")):
+        shutil.copy(os.path.join(REPO_ROOT, "lista_sello.txt"), workdir)
+    os.makedirs(os.path.join(workdir, "data"))
+    os.chdir(workdir)
+
+    from modules import extraer_bandas, extraer_links
+    from modules.utils import limitador_api, cache_http
+
+    print(f"Fake API at {base_url} ({len(state.data.by_genre)} genres, {len(state.data.posts)} posts)")
+    print(f"Scratch dir: {workdir}")
+
+    try:
+        for run_idx in range(args.runs):
+            control = extraer_bandas.ControlAIMD()
+            espera_antes = limitador_api.tiempo_espera
+            before = state.snapshot()
+            start = time.monotonic()
+            with output(args.verbose):
+                extraer_bandas.run(verbose=args.verbose, completo=(run_idx == 0), control=control)
+            elapsed = time.monotonic() - start
+            report(
+                f"Extraction run {run_idx + 1} ({'full' if run_idx == 0 else 'incremental'})",
+                before, state.snapshot(), elapsed,
+                {
+                    "aimd peak": control.limite_pico,
+                    "backoff": f"{control.tiempo_backoff:.2f}s",
+                    "limiter wait": f"{limitador_api.tiempo_espera - espera_antes:.2f}s (summed over threads)",
+                },
+            )
+
+        if not args.skip_links:
+            espera_antes = limitador_api.tiempo_espera
+            before = state.snapshot()
+            start = time.monotonic()
+            with output(args.verbose):
+                extraer_links.run(verbose=args.verbose, num_workers=args.link_workers,
+                                  input_file="data/repertorio.json")
+            elapsed = time.monotonic() - start
+            report("Link extraction", before, state.snapshot(), elapsed,
+                   {"limiter wait": f"{limitador_api.tiempo_espera - espera_antes:.2f}s (summed over threads)"})
+
+        print(f"\n{cache_http.resumen()}")
+    finally:
+        os.chdir(REPO_ROOT)
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the YouTube title matcher (no network, no browser).
+
+- Builds synthetic result pages from data/repertorio.json and
+  data/releases_mainstream.txt (falls back to generated names): each page
+  mixes keyworded uploads, track uploads, covers/reviews and other bands
+- "before": the per-title loop the filter used to run (uncached
+  normalization with inline regexes, " {text} " substring token counts,
+  linear keyword scan)
+- "after": modules.filtrar_youtube.EmparejadorTitulos (compiled keyword
+  regex, LRU-memoized normalization and word sets, one call per page)
+- Checks both give the same verdict for every page, then reports titles/sec
+
+Usage:
+    python scripts/benchmark_emparejador.py --pages 20000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+from modules import filtrar_youtube  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the YouTube title matcher")
+    parser.add_argument("--pages", type=int, default=10000, help="Result pages to score")
+    parser.add_argument("--titles", type=int, default=10, help="Titles per page")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the same pages (best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args(argv)
+
+
+# --- Baseline: the matcher as it was before EmparejadorTitulos ---
+
+def normalizar_antes(texto):
+    texto = texto.lower()
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
+    texto = re.sub(r'[_]+', ' ', texto)
+    texto = re.sub(r'[^\w\s]', ' ', texto, flags=re.UNICODE)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return texto
+
+
+def tokenizar_antes(texto):
+    normal = normalizar_antes(texto)
+    return [t for t in normal.split() if len(t) >= 2 and t not in filtrar_youtube.STOPWORDS]
+
+
+def contar_antes(tokens, texto_normalizado):
+    if not tokens:
+        return 0
+    hay = f" {texto_normalizado} "
+    return sum(1 for t in tokens if f" {t} " in hay)
+
+
+def evaluar_antes(resultados, band, album, tipo, keywords, neg_words):
+    tipo_norm = str(tipo or '').lower()
+    band_tokens = tokenizar_antes(band)
+    album_tokens = tokenizar_antes(album)
+    band_req = 1 if len(band_tokens) <= 2 else 2
+    album_req = 1 if len(album_tokens) <= 2 else 2
+    estado = 'limpia'
+    for item in resultados:
+        titulo = item.get('title') or ''
+        titulo_norm = normalizar_antes(titulo)
+        canal_norm = normalizar_antes(item.get('channel') or '')
+        if tipo_norm != "live" and neg_words & set(titulo_norm.split()):
+            continue
+        band_hits = max(contar_antes(band_tokens, titulo_norm), contar_antes(band_tokens, canal_norm))
+        album_hits = contar_antes(album_tokens, titulo_norm)
+        if album_tokens:
+            if band_hits < band_req or album_hits < album_req:
+                continue
+        elif band_hits < band_req:
+            continue
+        if any(kw in titulo_norm for kw in keywords):
+            return 'mainstream', titulo
+        estado = 'ambigua'
+    return estado, None
+
+
+# --- Synthetic pages ---
+
+def cargar_releases():
+    releases = []
+    try:
+        with open(filtrar_youtube.INPUT_FILE, 'r', encoding='utf-8') as f:
+            releases = [(r['band'], r['album'], r.get('type', 'Album')) for r in json.load(f)]
+    except (OSError, ValueError, KeyError):
+        pass
+    try:
+        with open(filtrar_youtube.OUTPUT_RECHAZADOS, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith(('#', ' ')) or ' - ' not in line:
+                    continue
+                band, album = line.strip().split(' - ', 1)
+                releases.append((band, re.sub(r'\s*\(\d{4}\)$', '', album), 'Album'))
+    except OSError:
+        pass
+    if not releases:
+        silabas = ["gor", "ath", "necro", "vomit", "crypt", "mor", "tis", "carn", "ul", "grave"]
+        for i in range(2000):
+            band = "".join(random.choice(silabas) for _ in range(3)).title()
+            album = " ".join(random.choice(silabas).title() for _ in range(random.randint(1, 4)))
+            releases.append((band, album, 'Album'))
+    return releases
+
+
+def generar_paginas(releases, n_paginas, titulos, keywords):
+    decoraciones = ["(Full Album)", "- Full Album Stream", "[Official Audio]", "(Drum Cam)",
+                    "REVIEW", "guitar cover", "(Live 2019)", "HQ", "1993", ""]
+    paginas = []
+    for _ in range(n_paginas):
+        band, album, tipo = random.choice(releases)
+        resultados = []
+        for _ in range(titulos):
+            otra_band, otro_album, _ = random.choice(releases)
+            b = band if random.random() < 0.5 else otra_band
+            a = album if random.random() < 0.4 else otro_album
+            titulo = f"{b} - {a} {random.choice(decoraciones)}"
+            if random.random() < 0.05:
+                titulo += f" {random.choice(keywords)}"
+            canal = b if random.random() < 0.3 else f"{otra_band} Official"
+            resultados.append({'title': titulo, 'channel': canal})
+        paginas.append((resultados, band, album, tipo))
+    return paginas
+
+
+def main() -> int:
+    args = parse_args()
+    random.seed(args.seed)
+
+    keywords = filtrar_youtube.cargar_keywords()
+    neg_words = filtrar_youtube._build_neg_words()
+    paginas = generar_paginas(cargar_releases(), args.pages, args.titles, keywords)
+    total_titulos = sum(len(p[0]) for p in paginas)
+    emparejador = filtrar_youtube.EmparejadorTitulos(keywords, neg_words)
+
+    # Same verdict for every page
+    distintos = 0
+    for resultados, band, album, tipo in paginas:
+        antes = evaluar_antes(resultados, band, album, tipo, keywords, neg_words)
+        if antes != emparejador.evaluar(resultados, band, album, tipo):
+            distintos += 1
+    print(f"{len(paginas)} pages, {total_titulos} titles, {len(keywords)} keywords")
+    print(f"verdict mismatches: {distintos}")
+
+    def medir(fn):
+        mejor = None
+        for _ in range(args.repeat):
+            inicio = time.perf_counter()
+            for resultados, band, album, tipo in paginas:
+                fn(resultados, band, album, tipo)
+            transcurrido = time.perf_counter() - inicio
+            mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+        return total_titulos / mejor
+
+    antes = medir(lambda r, b, a, t: evaluar_antes(r, b, a, t, keywords, neg_words))
+    filtrar_youtube._normalizar_texto.cache_clear()
+    filtrar_youtube._tokenizar.cache_clear()
+    filtrar_youtube._palabras.cache_clear()
+    despues = medir(emparejador.evaluar)
+
+    print(f"\nbefore: {antes:>12,.0f} titles/s")
+    print(f"after:  {despues:>12,.0f} titles/s  ({despues / antes:.1f}x)")
+    info = filtrar_youtube._normalizar_texto.cache_info()
+    print(f"normalization LRU: {info.hits} hits, {info.misses} misses, {info.currsize}/{info.maxsize}")
+    return 1 if distintos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
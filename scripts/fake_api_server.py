@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the DeathGrind.club API, for offline benchmarking.
+
+- Seeded from captured traffic (api_requests.json, and requests.jsonl if it
+  holds captures): genre ids and the offset style of /posts/filter
+- Scaled up synthetically: posts per genre (skewed sizes), bands, labels
+  (some taken from lista_sello.txt), release types, links (some dead)
+- Implements /auth/sign-in, /api/auth/login, /api/posts/filter (offset,
+  hasMore, types, limit), /api/posts/{id}/links, /api/bands/{id}/discography
+- Configurable latency, server-side rate limit and random 429 injection,
+  ETag / If-None-Match, and optional session expiry (401)
+
+Usage:
+    python scripts/fake_api_server.py --port 8765 --posts 300 --latency 80
+    DEATHGRIND_BASE_URL=http://127.0.0.1:8765 python -m modules.extraer_bandas
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TYPE_WEIGHTS = {1: 40, 2: 20, 9: 5, 3: 10, 4: 10, 5: 8, 6: 4, 7: 3}
+LINK_HOSTS = [
+    "https://mega.nz/file/{id}",
+    "https://www.mediafire.com/file/{id}/release.zip",
+    "https://drive.google.com/file/d/{id}/view",
+    "https://workupload.com/file/{id}",
+    "https://www.zippyshare.com/v/{id}/file.html",
+]
+
+
+def load_captures(paths):
+    """Captured request dicts ({method, url, ...}) from JSON arrays or JSON lines"""
+    captures = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            data = json.loads(text)
+            items = data if isinstance(data, list) else [data]
+        except ValueError:
+            items = []
+            for line in text.splitlines():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    continue
+        captures.extend(c for c in items if isinstance(c, dict) and "url" in c)
+    return captures
+
+
+def seed_from_captures(captures):
+    """Genre ids and offset style observed in captured /posts/filter calls"""
+    genres = []
+    offsets = []
+    for c in captures:
+        parsed = urlparse(c["url"])
+        if not parsed.path.endswith("/posts/filter"):
+            continue
+        qs = parse_qs(parsed.query)
+        for g in qs.get("genres", []):
+            if g.isdigit() and int(g) not in genres:
+                genres.append(int(g))
+        offsets.extend(qs.get("offset", []))
+    style = "index" if all(o.isdigit() for o in offsets) else "token"
+    return genres, style
+
+
+def load_genres_file(path):
+    genres = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f.readlines()[1:]:
+                parts = line.strip().split("\t")
+                if len(parts) >= 3 and parts[0].isdigit():
+                    genres.append(int(parts[0]))
+    return genres
+
+
+def load_labels_file(path):
+    labels = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            labels = [line.strip() for line in f if line.strip()]
+    return labels
+
+
+class FakeData:
+    """Synthetic catalogue: posts per genre (newest first), links, discographies"""
+
+    def __init__(self, genres, posts_per_genre=200, page_size=20, blacklist_labels=None,
+                 offset_style="index", seed=1):
+        rng = random.Random(seed)
+        self.page_size = page_size
+        self.offset_style = offset_style
+        self.posts = {}
+        self.by_genre = {}
+        self.by_band = {}
+        self.links = {}
+
+        blacklist_labels = blacklist_labels or []
+        labels = [f"Label {i}" for i in range(200)]
+        total = max(1, posts_per_genre * len(genres))
+        bands = [{"bandId": 10000 + i, "name": f"Band {i}"} for i in range(max(10, total // 3))]
+        types = list(TYPE_WEIGHTS)
+        weights = list(TYPE_WEIGHTS.values())
+
+        next_id = 900000
+        for genre_id in genres:
+            # Skewed genre sizes so scheduling order matters
+            size = max(1, int(posts_per_genre * rng.lognormvariate(0, 0.8)))
+            ids = []
+            for _ in range(size):
+                # ~20% of posts are shared with a genre that was already generated
+                if self.posts and rng.random() < 0.2:
+                    post_id = rng.choice(list(self.posts))
+                    if post_id not in ids:
+                        ids.append(post_id)
+                    continue
+                next_id -= rng.randint(1, 7)
+                post_id = next_id
+                post_bands = rng.sample(bands, 2 if rng.random() < 0.1 else 1)
+                if blacklist_labels and rng.random() < 0.05:
+                    label = rng.choice(blacklist_labels)
+                else:
+                    label = rng.choice(labels)
+                post = {
+                    "postId": post_id,
+                    "album": f"Album {post_id}",
+                    "bands": post_bands,
+                    "type": [rng.choices(types, weights)[0]],
+                    "label": [label],
+                    "genres": [genre_id],
+                    "releaseDate": [rng.randint(1985, 2026), rng.randint(1, 12), rng.randint(1, 28)],
+                }
+                self.posts[post_id] = post
+                for b in post_bands:
+                    self.by_band.setdefault(b["bandId"], []).append(post_id)
+                n_links = rng.choices([0, 1, 2, 3], [25, 45, 20, 10])[0]
+                self.links[post_id] = [
+                    {
+                        "href": rng.choice(LINK_HOSTS).format(id=secrets.token_hex(6)),
+                        "text": "Download",
+                        "quality": rng.choice([0, 192, 320]),
+                        "password": "",
+                    }
+                    for _ in range(n_links)
+                ]
+                ids.append(post_id)
+            self.by_genre[genre_id] = sorted(ids, reverse=True)
+
+    def page(self, genre_id, offset, types=None, limit=None):
+        ids = self.by_genre.get(genre_id, [])
+        if types:
+            ids = [i for i in ids if set(self.posts[i]["type"]) & types]
+        size = limit or self.page_size
+        if offset in (None, ""):
+            index = 0
+        elif self.offset_style == "index":
+            index = int(offset) if str(offset).isdigit() else 0
+        else:
+            index = int(str(offset)[1:]) if str(offset)[1:].isdigit() else 0
+        chunk = ids[index * size:(index + 1) * size]
+        has_more = (index + 1) * size < len(ids)
+        next_offset = index + 1 if self.offset_style == "index" else f"t{index + 1}"
+        return {"posts": [self.posts[i] for i in chunk], "hasMore": has_more, "offset": next_offset}
+
+
+class FakeServerState:
+    """Counters and knobs shared by all handler threads"""
+
+    def __init__(self, data, latency_ms=50, jitter_ms=20, rate=0.0, burst=10,
+                 prob_429=0.0, retry_after=1, session_ttl=0.0):
+        self.data = data
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate = rate
+        self.burst = burst
+        self.prob_429 = prob_429
+        self.retry_after = retry_after
+        self.session_ttl = session_ttl
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        self.tokens_ts = time.monotonic()
+        self.sessions = {}
+        self.stats = {"requests": 0, "pages": 0, "links": 0, "discography": 0,
+                      "logins": 0, "status_429": 0, "status_304": 0, "status_401": 0}
+        self.started = time.monotonic()
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def throttled(self):
+        with self.lock:
+            if self.prob_429 and random.random() < self.prob_429:
+                return True
+            if self.rate <= 0:
+                return False
+            now = time.monotonic()
+            self.tokens = min(float(self.burst), self.tokens + (now - self.tokens_ts) * self.rate)
+            self.tokens_ts = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return False
+            return True
+
+    def new_session(self):
+        sid = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[sid] = time.monotonic()
+        return sid
+
+    def valid_session(self, sid):
+        with self.lock:
+            created = self.sessions.get(sid)
+        if created is None:
+            return False
+        return not self.session_ttl or time.monotonic() - created < self.session_ttl
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["elapsed"] = time.monotonic() - self.started
+        return stats
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _cookies(self):
+            cookies = {}
+            for part in (self.headers.get("Cookie") or "").split(";"):
+                if "=" in part:
+                    k, v = part.strip().split("=", 1)
+                    cookies[k] = v
+            return cookies
+
+        def _send(self, status, payload=None, headers=None):
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            if status == 200 and payload is not None:
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    state.count("status_304")
+                    status, body = 304, b""
+                headers = dict(headers or {}, ETag=etag)
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _pre(self):
+            state.count("requests")
+            delay = state.latency_ms + random.uniform(-state.jitter_ms, state.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000)
+            if state.throttled():
+                state.count("status_429")
+                self._send(429, {"error": "Too Many Requests"}, {"Retry-After": str(state.retry_after)})
+                return False
+            return True
+
+        def _authorized(self):
+            if state.valid_session(self._cookies().get("sid")):
+                return True
+            state.count("status_401")
+            self._send(401, {"error": "Unauthorized"})
+            return False
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            qs = parse_qs(parsed.query)
+            path = parsed.path.rstrip("/")
+
+            if path == "/__stats":
+                self._send(200, state.snapshot())
+                return
+            if not self._pre():
+                return
+
+            if path == "/auth/sign-in":
+                self._send(200, {}, {"Set-Cookie": f"csrfToken={secrets.token_hex(20)}; Path=/"})
+                return
+            if not self._authorized():
+                return
+
+            parts = path.split("/")
+            if path == "/api/posts/filter":
+                genre = qs.get("genres", ["0"])[0]
+                types = None
+                raw_types = qs.get("types")
+                if raw_types:
+                    types = {int(t) for v in raw_types for t in v.split(",") if t.isdigit()}
+                limit = qs.get("limit", [None])[0]
+                page = state.data.page(int(genre) if genre.isdigit() else 0, qs.get("offset", [None])[0],
+                                       types=types, limit=int(limit) if limit and limit.isdigit() else None)
+                state.count("pages")
+                self._send(200, page)
+            elif len(parts) == 5 and parts[2] == "posts" and parts[4] == "links":
+                post_id = int(parts[3]) if parts[3].isdigit() else -1
+                if post_id not in state.data.posts:
+                    self._send(404, {"error": "Not found"})
+                    return
+                state.count("links")
+                self._send(200, {"links": state.data.links.get(post_id, [])})
+            elif len(parts) == 5 and parts[2] == "bands" and parts[4] == "discography":
+                band_id = int(parts[3]) if parts[3].isdigit() else -1
+                state.count("discography")
+                ids = state.data.by_band.get(band_id, [])
+                self._send(200, {"posts": [state.data.posts[i] for i in ids]})
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            if not self._pre():
+                return
+            if urlparse(self.path).path.rstrip("/") == "/api/auth/login":
+                state.count("logins")
+                sid = state.new_session()
+                self._send(200, {"ok": True}, {"Set-Cookie": f"sid={sid}; Path=/"})
+            else:
+                self._send(404, {"error": "Not found"})
+
+    return Handler
+
+
+def build_server(host="127.0.0.1", port=0, posts_per_genre=200, page_size=20, latency_ms=50,
+                 jitter_ms=20, rate=0.0, burst=10, prob_429=0.0, session_ttl=0.0, seed=1):
+    """ThreadingHTTPServer seeded from the repo captures. Returns (server, state)."""
+    captures = load_captures([
+        os.path.join(REPO_ROOT, "api_requests.json"),
+        os.path.join(REPO_ROOT, "requests.jsonl"),
+    ])
+    captured_genres, offset_style = seed_from_captures(captures)
+    genres = load_genres_file(os.path.join(REPO_ROOT, "generos_activos.txt"))
+    genres += [g for g in captured_genres if g not in genres]
+    data = FakeData(
+        genres or [104],
+        posts_per_genre=posts_per_genre,
+        page_size=page_size,
+        blacklist_labels=load_labels_file(os.path.join(REPO_ROOT, "lista_sello.txt")),
+        offset_style=offset_style,
+        seed=seed,
+    )
+    state = FakeServerState(data, latency_ms=latency_ms, jitter_ms=jitter_ms, rate=rate, burst=burst,
+                            prob_429=prob_429, session_ttl=session_ttl)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    return server, state
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake DeathGrind.club API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", type=int, default=200, help="Average posts per genre")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=50, help="Base latency per request (ms)")
+    parser.add_argument("--jitter", type=float, default=20, help="Latency jitter (ms)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Server-side limit (req/s, 0 = none)")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--prob-429", type=float, default=0.0, help="Random 429 probability")
+    parser.add_argument("--session-ttl", type=float, default=0.0, help="Session expiry in seconds (0 = never)")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def main() -> int:
+    args = parse_args()
+    server, state = build_server(
+        args.host, args.port, posts_per_genre=args.posts, page_size=args.page_size,
+        latency_ms=args.latency, jitter_ms=args.jitter, rate=args.rate, burst=args.burst,
+        prob_429=args.prob_429, session_ttl=args.session_ttl, seed=args.seed,
+    )
+    print(f"Fake API on http://{args.host}:{server.server_port} "
+          f"({len(state.data.by_genre)} genres, {len(state.data.posts)} posts)")
+    print(f"Use: DEATHGRIND_BASE_URL=http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(state.snapshot(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())